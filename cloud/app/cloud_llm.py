@@ -4,8 +4,10 @@ Falls back to local Ollama if HF endpoint is not configured.
 """
 import json
 import asyncio
+import hashlib
 import httpx
 from app.config import cloud_settings
+from app.singleflight import SingleFlight
 
 
 class CloudLLM:
@@ -19,12 +21,22 @@ class CloudLLM:
         self.ollama_model = cloud_settings.cloud_model
         self.timeout = 60.0
         self.max_retries = 2
+        self.flights = SingleFlight()
 
     async def generate(self, prompt: str, system: str = "", model_type: str = "27b", image_data: str | None = None) -> dict:
         """
         Generate a structured response. 
         model_type: '27b', '4b', or 'vision'
+        Identical concurrent requests are coalesced into one upstream call.
         """
+        key = hashlib.sha256(
+            json.dumps([model_type, system, prompt, image_data]).encode("utf-8")
+        ).hexdigest()
+        return await self.flights.do(
+            key, lambda: self._generate(prompt, system, model_type, image_data)
+        )
+
+    async def _generate(self, prompt: str, system: str, model_type: str, image_data: str | None) -> dict:
         endpoint = self._get_endpoint(model_type)
         
         if endpoint:
@@ -104,13 +104,15 @@ async def get_forecast():
 
 @app.get("/health", tags=["Health"])
 async def health():
+    from app.cloud_llm import cloud_llm
     return {
         "status": "healthy",
         "models": {
             "executive_27b": cloud_settings.sm_27b_endpoint or "hf_endpoint",
             "redundancy_4b": cloud_settings.sm_4b_endpoint,
             "vision_3b": cloud_settings.sm_paligemma_endpoint
-        }
+        },
+        "single_flight": cloud_llm.flights.stats(),
     }
 
 
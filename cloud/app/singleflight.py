@@ -0,0 +1,55 @@
+"""
+Single-flight coalescing of identical in-flight cloud LLM calls.
+Concurrent callers with the same key share one upstream call; each gets a
+private copy of the result. If the caller running the call is cancelled
+(client disconnect), one waiter re-runs it rather than every waiter failing.
+"""
+from __future__ import annotations
+import asyncio
+import copy
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+class SingleFlight:
+    """Per-key coalescing of concurrent awaitables with savings counters."""
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn() once per key across concurrent callers."""
+        while (fut := self._inflight.get(key)) is not None:
+            try:
+                result = await asyncio.shield(fut)
+            except _LeaderCancelled:
+                continue
+            self.coalesced += 1
+            return copy.deepcopy(result)
+
+        fut = self._inflight[key] = asyncio.get_running_loop().create_future()
+        self.executions += 1
+        try:
+            result = await fn()
+        except BaseException as exc:
+            del self._inflight[key]
+            fut.set_exception(_LeaderCancelled() if isinstance(exc, asyncio.CancelledError) else exc)
+            fut.exception()  # mark retrieved: no waiters is not an error
+            raise
+        del self._inflight[key]
+        fut.set_result(copy.deepcopy(result))
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
@@ -3,9 +3,15 @@ Critique Agent — MaTriX-AI Edge System
 Reviews the output of the Guideline Agent to ensure clinical safety 
 and adherence to the retrieved WHO evidence.
 """
-from app.models.local_llm import local_llm
-
-import re
+from typing import Optional
+from pydantic import BaseModel, Field
+from app.config import settings
+from app.models.local_llm import local_llm, SchedulerOverloaded
+from app.models.generation_profile import GenerationProfile
+from app.agents.router import admission_priority
+from app.agents.dosage_safety import dosage_rules
+from app.agents.critique_cache import critique_cache
+from app.utils.metrics import FALLBACK_ACTIVATIONS
 
 CRITIQUE_SYSTEM_PROMPT = """You are a rigorous clinical safety lead.
 Your role is to review a proposed maternal management plan and identify
@@ -29,27 +35,34 @@ Proposed Plan: {stabilization_plan}
 Medication Guidance: {medication_guidance}
 
 CRITIQUE:
-Respond with ONLY this JSON structure:
-{{
+"""
+
+CRITIQUE_OUTPUT_FORMAT = """Respond with ONLY this JSON structure:
+{
   "safe": true|false,
   "safety_score": <int 0-100>,
   "critique_notes": "<summary of findings>",
   "revised_plan": "<if unsafe, provide the corrected version, else null>"
-}}
+}
 """
 
-def hard_heuristic_check(text: str) -> str | None:
-    text_lower = text.lower()
-    # E.g. restrict MgSO4 loading dose > 4g or infusion rates > 2g/hr
-    if re.search(r"magnesium sulphate.*? [5-9]g", text_lower) or re.search(r"mgso4.*? [5-9]g", text_lower):
-        return "CRITICAL: MgSO4 dose exceeds the standard 4g loading dose. Maximum loading dose is 4g."
-    # E.g. check for contraindicated drugs
-    if re.search(r"lisinopril|enalapril|losartan|valsartan", text_lower):
-        return "CRITICAL: ACE inhibitors / ARBs are strictly contraindicated in pregnancy."
-    # Check Labetalol overdose
-    if re.search(r"labetalol.*? ([4-9]\d{2}|[1-9]\d{3})mg", text_lower):
-        return "CRITICAL: Labetalol dose exceeds the safe maximum of 300mg."
-    return None
+class CritiqueVerdict(BaseModel):
+    """Typed critique agent output."""
+    safe: bool
+    safety_score: int = Field(..., ge=0, le=100)
+    critique_notes: str
+    revised_plan: Optional[str] = None
+
+
+CRITIQUE_PROFILE = GenerationProfile("critique", CritiqueVerdict, num_predict=600)
+
+
+def hard_heuristic_check(text: str | None) -> str | None:
+    """Every dosage-rule violation in a plan as one CRITICAL message, or None if it is clean."""
+    violations = dosage_rules.check(text or "")
+    if not violations:
+        return None
+    return " ".join(dict.fromkeys(f"CRITICAL: {v.message}" for v in violations))
 
 async def run_critique_agent(state: dict) -> dict:
     risk = state.get("risk_output", {})
@@ -71,20 +84,30 @@ async def run_critique_agent(state: dict) -> dict:
         state["guideline_output"]["stabilization_plan"] = state["critique_output"]["revised_plan"]
         return state
 
+    risk_level = risk.get("risk_level", "low")
+    plan = guide.get("stabilization_plan", "")
+    medication = guide.get("medication_guidance", "")
     prompt = CRITIQUE_PROMPT_TEMPLATE.format(
-        risk_level=risk.get("risk_level", "low"),
-        stabilization_plan=guide.get("stabilization_plan", ""),
-        medication_guidance=guide.get("medication_guidance", ""),
+        risk_level=risk_level, stabilization_plan=plan, medication_guidance=medication,
     )
 
     try:
-        result = await local_llm.generate(prompt=prompt, system=CRITIQUE_SYSTEM_PROMPT)
-        
-        # Post-LLM enforcement
-        if heuristic_error := hard_heuristic_check(result.get("revised_plan", "")):
-             result["safe"] = False
-             result["revised_plan"] = "PLAN BLOCKED: " + heuristic_error
-             
+        # Template plans and recently critiqued plans skip the LLM
+        result = critique_cache.get(risk_level, plan, medication, settings.local_model)
+        if result is None:
+            # Safety verdicts are never served from the generic response cache
+            result = await local_llm.generate(
+                prompt=prompt, system=CRITIQUE_SYSTEM_PROMPT, agent="critique",
+                instructions=CRITIQUE_OUTPUT_FORMAT, profile=CRITIQUE_PROFILE, cache=False,
+                priority=admission_priority(state),
+            )
+
+            # Post-LLM enforcement
+            if heuristic_error := hard_heuristic_check(result.get("revised_plan")):
+                 result["safe"] = False
+                 result["revised_plan"] = "PLAN BLOCKED: " + heuristic_error
+            critique_cache.put(risk_level, plan, medication, settings.local_model, result)
+
         state["critique_output"] = result
         
         # Self-correction: if unsafe, overwrite the stabilization plan with the revision
@@ -92,8 +115,11 @@ async def run_critique_agent(state: dict) -> dict:
             state["guideline_output"]["stabilization_plan"] = result["revised_plan"]
             state["guideline_output"]["medication_guidance"] += "\n(Note: Revised for safety by Critique Agent)"
             
+    except SchedulerOverloaded:
+        raise
     except Exception:
         # If critique fails, we continue with the original guide but log the failure
+        FALLBACK_ACTIVATIONS.labels(agent="critique").inc()
         state["critique_output"] = {"safe": True, "critique_notes": "Critique Agent bypass (LLM error)"}
 
     return state
@@ -0,0 +1,125 @@
+"""
+Critique verdict cache — MaTriX-AI Edge System
+The critique agent reviews a plan, not a patient: an identical (risk level,
+stabilization plan, medication guidance) under the same dosage rule set gets
+the same verdict. Two sources let it skip the MedGemma call:
+  1. Deterministic guideline templates (_rule_based_guideline) are static and
+     vetted; they are checked against the dosage rules once at startup and
+     pinned as safe.
+  2. LLM verdicts are kept in an in-process LRU with TTL, keyed by a hash that
+     includes the rule-set version, so editing dosage_rules.json never serves
+     a verdict given under the old limits. The model name is stored with each
+     entry, as in the LLM response cache.
+"""
+from __future__ import annotations
+import copy
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from app.config import settings
+from app.agents.dosage_safety import dosage_rules
+
+RISK_LEVELS = ("severe", "high", "moderate", "low")
+
+
+class CritiqueVerdictCache:
+    """Pinned verdicts for template plans plus an LRU of LLM critique verdicts."""
+
+    def __init__(self, max_entries: int, ttl_s: float, enabled: bool = True):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._templates: dict[str, dict] = {}
+        self._entries: OrderedDict[str, tuple[float, str, dict]] = OrderedDict()
+        self.template_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(risk_level: str, plan: str, medication: str) -> str:
+        blob = json.dumps([risk_level, plan, medication, dosage_rules.version], separators=(",", ":"))
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def preverify_templates(self) -> int:
+        """Pin a safe verdict for every deterministic template that passes the dosage rules."""
+        from app.agents.guideline_agent import _rule_based_guideline
+        self._templates.clear()
+        for level in RISK_LEVELS:
+            guide = _rule_based_guideline(level, [])
+            plan, medication = guide["stabilization_plan"], guide["medication_guidance"]
+            violations = dosage_rules.check(plan + " " + medication)
+            if violations:
+                # Left to the heuristic check / LLM critique like any other plan
+                if settings.debug:
+                    print(f"Guideline template '{level}' fails dosage rules: {violations}")
+                continue
+            self._templates[self.make_key(level, plan, medication)] = {
+                "safe": True,
+                "safety_score": 100,
+                "critique_notes": (
+                    f"Deterministic guideline template, pre-verified against dosage rules "
+                    f"{dosage_rules.version} — LLM critique skipped."
+                ),
+                "revised_plan": None,
+            }
+        return len(self._templates)
+
+    def get(self, risk_level: str, plan: str, medication: str, model: str) -> dict | None:
+        """A private copy of the cached verdict, or None."""
+        if not self.enabled:
+            return None
+        key = self.make_key(risk_level, plan, medication)
+        verdict = self._templates.get(key)
+        if verdict is not None:
+            self.template_hits += 1
+            return copy.deepcopy(verdict)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, entry_model, verdict = entry
+            if expires_at > time.time() and entry_model == model:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(verdict)
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, risk_level: str, plan: str, medication: str, model: str, verdict: dict) -> None:
+        if not self.enabled:
+            return
+        key = self.make_key(risk_level, plan, medication)
+        self._entries[key] = (time.time() + self.ttl_s, model, copy.deepcopy(verdict))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.template_hits + self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "rules_version": dosage_rules.version,
+            "pinned_templates": len(self._templates),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "template_hits": self.template_hits,
+            "hits": self.hits,
+            "misses": self.misses,
+            "llm_calls_avoided": self.template_hits + self.hits,
+            "hit_rate": round((self.template_hits + self.hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+# Module-level singleton
+critique_cache = CritiqueVerdictCache(
+    max_entries=settings.critique_cache_max_entries,
+    ttl_s=settings.critique_cache_ttl_s,
+    enabled=settings.critique_cache_enabled,
+)
@@ -0,0 +1,235 @@
+"""
+Dosage Safety Rules — MaTriX-AI Edge System
+Declarative medication limits (dosage_rules.json: drug names, maximum dose,
+maximum infusion rate, allowed routes, contraindications) compiled into one
+linear-time scanner over a plan:
+  - the plan is tokenised once with C-level string operations (clause breaks
+    become ";" tokens); a plan whose words share nothing with the drug-name
+    vocabulary is cleared by a single set test;
+  - otherwise one pass over the words drives an Aho-Corasick automaton over
+    drug names (names may span several words), so cost does not grow with the
+    number of rules; routes are a dict lookup and quantities are parsed with
+    units normalised to mg and mg/h ("4 g", "4000 mg" and "4g" are the same);
+  - each dose or route binds to the closest preceding drug in its clause.
+Every violation is reported, not only the first.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import re
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from app.config import settings
+
+DEFAULT_RULES_FILE = Path(__file__).with_name("dosage_rules.json")
+
+_MASS_MG = {
+    b"mg": 1.0, b"milligram": 1.0, b"milligrams": 1.0,
+    b"g": 1000.0, b"gm": 1000.0, b"gram": 1000.0, b"grams": 1000.0,
+    b"mcg": 0.001, b"ug": 0.001, b"microgram": 0.001, b"micrograms": 0.001,
+}
+_PER_HOUR = {
+    b"h": 1.0, b"hr": 1.0, b"hrs": 1.0, b"hour": 1.0, b"hours": 1.0,
+    b"min": 60.0, b"mins": 60.0, b"minute": 60.0, b"minutes": 60.0,
+}
+_ROUTES = {
+    b"iv": "iv", b"intravenous": "iv", b"intravenously": "iv",
+    b"im": "im", b"intramuscular": "im", b"intramuscularly": "im",
+    b"oral": "oral", b"orally": "oral", b"po": "oral",
+    b"sublingual": "sublingual", b"sublingually": "sublingual", b"sl": "sublingual",
+    b"sc": "subcutaneous", b"subcutaneous": "subcutaneous", b"subcutaneously": "subcutaneous",
+}
+
+_DIGITS = frozenset(b"0123456789")
+_PER = (b"/", b"per")
+# Keep ASCII letters/digits and ". , / ;" (newlines become ";"); everything else separates words
+_KEEP = bytes(
+    59 if c == 10 else c if c < 128 and (chr(c).isalnum() or chr(c) in ";.,/") else 32
+    for c in range(256)
+)
+# Clause breaks become ";" tokens, "/" a token of its own; a comma that is not a
+# thousands separator only separates words
+_SPLITS = ((b";", b" ; "), (b", ", b"  "), (b". ", b" ; "), (b"/", b" / "))
+_QUANTITY = re.compile(rb"(\d+(?:[.,]\d+)*)([a-z]*)")
+
+
+def _words(text: str) -> list[bytes]:
+    """Lower-cased word tokens of a plan, tokenised with C-level string operations."""
+    text = text.lower().replace("µ", "mc").replace("μ", "mc")
+    data = (text.encode("utf-8", "ignore") + b" ").translate(_KEEP)
+    for old, new in _SPLITS:
+        data = data.replace(old, new)
+    words = data.split()
+    if b"," in data:   # "4,000mg" stays whole; "labetalol,nifedipine" does not
+        words = [part for w in words for part in ((w,) if w[0] in _DIGITS else w.split(b",")) if part]
+    return words
+
+
+@dataclass(frozen=True)
+class Violation:
+    drug: str
+    kind: str      # max_dose | max_rate | route | contraindicated
+    message: str
+    found: str     # offending text, e.g. "5 g/hr"
+
+
+@dataclass(frozen=True)
+class _Rule:
+    drug: str
+    max_dose_mg: float | None = None
+    dose_message: str = ""
+    max_rate_mg_h: float | None = None
+    rate_message: str = ""
+    routes: frozenset | None = None
+    route_message: str = ""
+    contraindicated: str | None = None
+
+
+def _limit_mg(unit: str) -> float:
+    """Scale factor of a rule unit ("g", "mg", "g/h", "mg/min") to mg or mg/h."""
+    mass, _, per = unit.lower().encode().partition(b"/")
+    return _MASS_MG[mass] * (_PER_HOUR[per] if per else 1.0)
+
+
+class _Automaton:
+    """Aho-Corasick automaton whose alphabet is words; out[state] lists (length, value), longest first."""
+
+    def __init__(self, names: dict[tuple[bytes, ...], int]):
+        self.goto: list[dict[bytes, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.out: list[list[tuple[int, int]]] = [[]]
+        for name, value in names.items():
+            state = 0
+            for word in name:
+                nxt = self.goto[state].get(word)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[state][word] = nxt
+                state = nxt
+            self.out[state].append((len(name), value))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and word not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(word, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+
+class DosageRuleEngine:
+    """Compiled form of a dosage rule set; check() is safe to call concurrently."""
+
+    def __init__(self, spec: dict):
+        self.rules: list[_Rule] = []
+        names: dict[tuple[bytes, ...], int] = {}
+        for entry in spec["drugs"]:
+            dose, rate = entry.get("max_dose"), entry.get("max_rate")
+            routes = entry.get("routes")
+            self.rules.append(_Rule(
+                drug=entry["drug"],
+                max_dose_mg=dose["value"] * _limit_mg(dose["unit"]) if dose else None,
+                dose_message=dose.get("message", "") if dose else "",
+                max_rate_mg_h=rate["value"] * _limit_mg(rate["unit"]) if rate else None,
+                rate_message=rate.get("message", "") if rate else "",
+                routes=frozenset(_ROUTES.get(r.encode(), r) for r in routes) if routes else None,
+                route_message=entry.get("route_message", ""),
+                contraindicated=entry.get("contraindicated"),
+            ))
+            for name in entry["names"]:
+                names[tuple(_words(name))] = len(self.rules) - 1
+
+        canonical = json.dumps(spec, sort_keys=True).encode()
+        self.version = f"{spec.get('version', '0')}+{hashlib.sha256(canonical).hexdigest()[:8]}"
+        self._automaton = _Automaton(names)
+
+    @classmethod
+    def load(cls, path: str | Path | None = None) -> "DosageRuleEngine":
+        with open(path or DEFAULT_RULES_FILE, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def check(self, text: str) -> list[Violation]:
+        """Every rule violation in a plan, in text order."""
+        words = _words(text)
+        if self._automaton.goto[0].keys().isdisjoint(words):
+            return []   # no drug named anywhere
+        goto, fail, out = self._automaton.goto, self._automaton.fail, self._automaton.out
+        violations: list[Violation] = []
+        state, current = 0, None
+        i, n = 0, len(words)
+        while i < n:
+            word = words[i]
+            i += 1
+            if word == b";":
+                state, current = 0, None
+                continue
+            if word[0] in _DIGITS:
+                state = 0
+                if current is not None:
+                    i = self._check_quantity(words, i, word, current, violations)
+                continue
+
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if out[state]:
+                length, value = out[state][0]
+                current = self.rules[value]
+                if current.contraindicated:
+                    violations.append(Violation(current.drug, "contraindicated", current.contraindicated,
+                                                b" ".join(words[i - length:i]).decode()))
+                continue
+            route = _ROUTES.get(word)
+            if route and current is not None and current.routes is not None \
+                    and route not in current.routes:
+                violations.append(Violation(
+                    current.drug, "route",
+                    current.route_message or f"{current.drug} must not be given by the {route} route.",
+                    word.decode(),
+                ))
+        return violations
+
+    @staticmethod
+    def _check_quantity(words: list[bytes], i: int, word: bytes, rule: _Rule,
+                        violations: list[Violation]) -> int:
+        """Parse the dose or rate starting at `word` against `rule`; returns the next word index."""
+        m = _QUANTITY.fullmatch(word)
+        if m is None:
+            return i
+        number, unit = m.groups()
+        found = [word]
+        n = len(words)
+        if not unit and i < n and words[i] in _MASS_MG:
+            unit = words[i]
+            found.append(unit)
+            i += 1
+        if unit not in _MASS_MG:
+            return i
+        amount = float(number.replace(b",", b"")) * _MASS_MG[unit]
+        per = None
+        if i + 1 < n and words[i] in _PER:
+            per = words[i + 1]
+            found += words[i:i + 2]
+            i += 2
+            if per not in _PER_HOUR:
+                return i   # per kg, per dL, ...: no absolute limit
+            amount *= _PER_HOUR[per]
+
+        text = b" ".join(found).replace(b" / ", b"/").decode()
+        if per is not None:
+            if rule.max_rate_mg_h is not None and amount > rule.max_rate_mg_h:
+                violations.append(Violation(rule.drug, "max_rate", rule.rate_message, text))
+        elif rule.max_dose_mg is not None and amount > rule.max_dose_mg:
+            violations.append(Violation(rule.drug, "max_dose", rule.dose_message, text))
+        return i
+
+
+# Module-level singleton
+dosage_rules = DosageRuleEngine.load(settings.dosage_rules_file or None)
@@ -3,9 +3,19 @@ Guideline RAG Agent — MaTriX-AI Edge System
 Retrieves WHO maternal health guideline chunks from pgvector,
 then uses MedGemma (1.4B via Ollama) to produce an evidence-grounded
 clinical management plan.
+Retrieval can be started speculatively for the rule-predicted risk level
+while the risk agent is still running.
 """
-from app.models.local_llm import local_llm
+from typing import List
+from pydantic import BaseModel, Field
+from app.config import settings
+from app.models.local_llm import local_llm, SchedulerOverloaded
+from app.models.generation_profile import GenerationProfile
+from app.agents.router import admission_priority
+from app.agents.risk_agent import _rule_based_risk
 from app.rag.retrieve import retrieve_guideline_chunks
+from app.workflow.speculation import speculate, claim
+from app.utils.metrics import FALLBACK_ACTIVATIONS
 
 GUIDELINE_SYSTEM_PROMPT = """You are an evidence-based maternal health clinical advisor.
 Your role is to produce a clear, actionable clinical management plan grounded in
@@ -33,26 +43,62 @@ RETRIEVED WHO GUIDELINE EXCERPTS:
 {guideline_context}
 
 Based on the above risk level and guideline excerpts, produce a clinical management plan.
+"""
 
-Respond with ONLY this JSON structure:
-{{
+GUIDELINE_OUTPUT_FORMAT = """Respond with ONLY this JSON structure:
+{
   "stabilization_plan": "<step-by-step stabilization actions>",
   "monitoring_instructions": "<what to monitor and at what intervals>",
   "medication_guidance": "<recommended medications with doses based on guidelines>",
   "guideline_refs": ["<relevant guideline reference 1>", "<reference 2>"]
-}}
+}
 """
 
 
+class GuidelinePlan(BaseModel):
+    """Typed guideline agent output."""
+    stabilization_plan: str
+    monitoring_instructions: str
+    medication_guidance: str
+    guideline_refs: List[str] = Field(default_factory=list, max_length=6)
+
+
+GUIDELINE_PROFILE = GenerationProfile("guideline", GuidelinePlan, num_predict=700)
+
+
 async def run_guideline_agent(state: dict) -> dict:
     """
     Guideline RAG Agent node — retrieves relevant WHO guideline chunks,
     then calls MedGemma 1.4B to generate an evidence-grounded management plan.
+    Commits the retrieval launched by speculate_guideline() when the predicted
+    risk level matches the risk agent's.
     """
     risk = state.get("risk_output", {})
     p = state.get("patient_data", {})
     risk_level = risk.get("risk_level", "low")
 
+    hit, retrieved = await claim("guideline_retrieval", risk_level)
+    guideline_context, refs = retrieved if hit else await _retrieve_context(risk_level, p)
+    state["guideline_output"] = await _draft_plan(state, risk, guideline_context, refs)
+    return state
+
+
+def speculate_guideline(state: dict) -> None:
+    """
+    Start guideline retrieval for the rule-predicted risk level. Call before
+    the risk agent begins generating. Only retrieval is speculated: it depends
+    on nothing but the risk level, whereas a plan draft quotes the risk
+    agent's score and reasoning, which the rules cannot predict.
+    """
+    if not settings.speculative_retrieval:
+        return
+    p = state.get("patient_data", {})
+    level = _rule_based_risk(p)["risk_level"]
+    speculate("guideline_retrieval", level, lambda: _retrieve_context(level, p))
+
+
+async def _retrieve_context(risk_level: str, p: dict) -> tuple[str, list]:
+    """RAG query for the risk context; returns (guideline_context, refs)."""
     # Build RAG query from risk context
     rag_query = (
         f"maternal {risk_level} risk hypertension management "
@@ -72,9 +118,16 @@ async def run_guideline_agent(state: dict) -> dict:
         refs = [c["source"] for c in chunks]
     except Exception:
         # Fallback if pgvector not yet populated
+        FALLBACK_ACTIVATIONS.labels(agent="guideline_retrieval").inc()
         guideline_context = _hardcoded_fallback_context(risk_level)
         refs = ["WHO 2011 — Hypertensive Disorders of Pregnancy"]
+    return guideline_context, refs
 
+
+async def _draft_plan(state: dict, risk: dict, guideline_context: str, refs: list) -> dict:
+    """Generate the management plan from retrieved context (rule-based on LLM failure)."""
+    p = state.get("patient_data", {})
+    risk_level = risk.get("risk_level", "low")
     prompt = GUIDELINE_PROMPT_TEMPLATE.format(
         risk_level=risk_level,
         risk_score=risk.get("risk_score", 0),
@@ -87,14 +140,19 @@ async def run_guideline_agent(state: dict) -> dict:
     )
 
     try:
-        result = await local_llm.generate(prompt=prompt, system=GUIDELINE_SYSTEM_PROMPT)
+        result = await local_llm.generate(
+            prompt=prompt, system=GUIDELINE_SYSTEM_PROMPT, agent="guideline",
+            instructions=GUIDELINE_OUTPUT_FORMAT, profile=GUIDELINE_PROFILE,
+            priority=admission_priority(state),
+        )
         assert "stabilization_plan" in result
         result.setdefault("guideline_refs", refs)
+    except SchedulerOverloaded:
+        raise
     except Exception:
+        FALLBACK_ACTIVATIONS.labels(agent="guideline").inc()
         result = _rule_based_guideline(risk_level, refs)
-
-    state["guideline_output"] = result
-    return state
+    return result
 
 
 def _rule_based_guideline(risk_level: str, refs: list) -> dict:
@@ -1,8 +1,15 @@
 """
 Risk Agent — MaTriX-AI Edge System
 Uses MedGemma (1.4B via Ollama) to assess maternal risk from clinical vitals.
+A calibrated vitals classifier answers confident, symptom-free cases first.
 """
-from app.models.local_llm import local_llm
+from typing import List, Literal
+from pydantic import BaseModel, Field
+from app.models.local_llm import local_llm, SchedulerOverloaded
+from app.models.generation_profile import GenerationProfile
+from app.agents.router import admission_priority
+from app.agents.risk_classifier import risk_classifier
+from app.utils.metrics import FALLBACK_ACTIVATIONS
 
 RISK_SYSTEM_PROMPT = """You are an expert maternal-fetal medicine triage specialist.
 Your role is to assess maternal risk from clinical vitals and symptoms and output
@@ -48,25 +55,45 @@ VISION AGENT FINDINGS:
 {vision_findings}
 
 MEDICAL HISTORY: {medical_history}
+"""
 
-Respond with ONLY this JSON structure:
-{{
+# Static output contract — part of the reusable prompt prefix in chat mode
+RISK_OUTPUT_FORMAT = """Respond with ONLY this JSON structure:
+{
   "risk_level": "low|moderate|high|severe",
   "risk_score": <integer 0-100>,
   "confidence": <float 0.0-1.0>,
   "reasoning": "<one to three clear clinical sentences explaining your assessment>",
   "immediate_actions": ["<action 1>", "<action 2>"]
-}}
+}
 """
 
 
+class RiskAssessment(BaseModel):
+    """Typed risk agent output — its JSON Schema constrains MedGemma's decoding."""
+    risk_level: Literal["low", "moderate", "high", "severe"]
+    risk_score: int = Field(..., ge=0, le=100)
+    confidence: float = Field(..., ge=0.0, le=1.0)
+    reasoning: str
+    immediate_actions: List[str] = Field(default_factory=list, max_length=6)
+
+
+RISK_PROFILE = GenerationProfile("risk", RiskAssessment, num_predict=320)
+
+
 async def run_risk_agent(state: dict) -> dict:
     """
     Risk Agent node — invokes MedGemma 1.4B to produce a structured risk assessment.
+    Confident vitals-classifier answers skip the LLM call.
     Falls back to rule-based scoring if the LLM is unavailable.
     """
     p = state["patient_data"]
 
+    classified = risk_classifier.assess(state, _rule_based_risk(p)["risk_level"])
+    if classified is not None:
+        state["risk_output"] = classified
+        return state
+
     prompt = RISK_PROMPT_TEMPLATE.format(
         name=p.get("name", "Unknown"),
         age=p.get("age", "?"),
@@ -85,14 +112,21 @@ async def run_risk_agent(state: dict) -> dict:
     )
 
     try:
-        result = await local_llm.generate(prompt=prompt, system=RISK_SYSTEM_PROMPT)
+        result = await local_llm.generate(
+            prompt=prompt, system=RISK_SYSTEM_PROMPT, agent="risk",
+            instructions=RISK_OUTPUT_FORMAT, profile=RISK_PROFILE,
+            priority=admission_priority(state),
+        )
         # Validate required keys
         assert "risk_level" in result and "risk_score" in result
         result.setdefault("immediate_actions", [])
         result.setdefault("reasoning", "")
+    except SchedulerOverloaded:
+        raise
     except Exception as exc:
         # Rule-based fallback
         from app.config import settings
+        FALLBACK_ACTIVATIONS.labels(agent="risk").inc()
         result = _rule_based_risk(p)
         if settings.debug:
             result["reasoning"] += f" (Note: AI fallback active - {exc})"
@@ -0,0 +1,154 @@
+"""
+Risk Pre-Classifier — MaTriX-AI Edge System
+Multinomial logistic regression over intake vitals (age, BP, heart rate),
+trained on the bundled maternal datasets by scripts/train_risk_classifier.py
+and temperature-scaled so its probabilities are calibrated. Inference is a
+few dozen float operations in pure Python (microseconds).
+
+run_risk_agent consults it before MedGemma. The classifier only answers when
+the case is inside what it was trained on and it is confident:
+  - BP recorded; no symptoms, proteinuria, free text or imaging findings
+    (the datasets carry none of these);
+  - the rules do not call the case severe (the datasets have no severe class)
+    and the classifier does not rank it below the rules;
+  - calibrated probability ≥ settings.risk_classifier_min_confidence.
+Everything else goes to the LLM as before.
+"""
+from __future__ import annotations
+import json
+import math
+from pathlib import Path
+from app.config import settings
+
+DEFAULT_MODEL_FILE = Path(__file__).with_name("risk_classifier.json")
+CLASSES = ("low", "moderate", "high")
+FEATURES = ("age", "bp_systolic", "bp_diastolic", "heart_rate")
+# Piecewise-linear terms at the clinical BP thresholds
+HINGES = {"bp_systolic": [130, 140, 160], "bp_diastolic": [80, 90, 110]}
+
+_LEVEL_RANK = {"low": 0, "moderate": 1, "high": 2, "severe": 3}
+_SCORE_BANDS = {"low": (0, 24), "moderate": (25, 49), "high": (50, 74)}
+_ACTIONS = {
+    "low": ["Routine antenatal monitoring at next visit"],
+    "moderate": ["Repeat BP in 30 minutes", "Urine dipstick"],
+    "high": ["Monitor BP every 15 minutes", "Urine output monitoring",
+             "Blood tests: FBC, LFT, urate, creatinine"],
+}
+_OUT_OF_SCOPE_FLAGS = (
+    "proteinuria", "headache", "visual_disturbance", "epigastric_pain", "oedema",
+    "fetal_movement_reduced",
+)
+_FREE_TEXT = ("notes", "additional_symptoms", "medical_history")
+
+
+def expand(p: dict, medians: dict) -> list[float]:
+    """Feature vector: raw vitals (missing → training median) plus BP hinge terms."""
+    values = [float(p[k]) if p.get(k) is not None else medians[k] for k in FEATURES]
+    vitals = dict(zip(FEATURES, values))
+    for key, cuts in HINGES.items():
+        values += [max(0.0, vitals[key] - cut) for cut in cuts]
+    return values
+
+
+class RiskClassifier:
+    """Calibrated vitals classifier plus the policy deciding when its answer stands."""
+
+    def __init__(self, model: dict | None):
+        self.loaded = model is not None
+        self.consulted = 0
+        self.answered = 0
+        self.deferred: dict[str, int] = {}
+        if model is None:
+            return
+        self.classes = tuple(model["classes"])
+        self.medians = model["medians"]
+        self._mean = model["mean"]
+        self._std = model["std"]
+        self._weights = [tuple(col) for col in zip(*model["weights"])]   # one row per class
+        self._bias = model["bias"]
+        self._temperature = model["temperature"]
+        self.training = model.get("training", {})
+
+    @classmethod
+    def load(cls, path: str | Path | None = None) -> "RiskClassifier":
+        try:
+            with open(path or DEFAULT_MODEL_FILE, encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError) as exc:
+            if settings.debug:
+                print(f"Risk classifier not loaded: {exc}")
+            return cls(None)
+
+    def predict(self, p: dict) -> dict[str, float]:
+        """Calibrated class probabilities for a patient's vitals."""
+        z = [(x - m) / s for x, m, s in zip(expand(p, self.medians), self._mean, self._std)]
+        logits = [
+            (b + sum(zi * wi for zi, wi in zip(z, w))) / self._temperature
+            for w, b in zip(self._weights, self._bias)
+        ]
+        top = max(logits)
+        exps = [math.exp(v - top) for v in logits]
+        total = sum(exps)
+        return {c: e / total for c, e in zip(self.classes, exps)}
+
+    def _out_of_scope(self, state: dict, rule_level: str) -> str | None:
+        p = state.get("patient_data", {})
+        if p.get("bp_systolic") is None or p.get("bp_diastolic") is None:
+            return "missing_bp"
+        if any(p.get(flag) for flag in _OUT_OF_SCOPE_FLAGS):
+            return "symptoms"
+        if any(str(p.get(key) or "").strip() not in ("", "None") for key in _FREE_TEXT):
+            return "free_text"
+        if (state.get("vision_output") or {}).get("status", "skipped") != "skipped":
+            return "imaging"
+        if rule_level == "severe":
+            return "severe_rules"
+        return None
+
+    def assess(self, state: dict, rule_level: str) -> dict | None:
+        """A risk_output for the case, or None when MedGemma should assess it."""
+        if not (settings.risk_classifier_enabled and self.loaded):
+            return None
+        self.consulted += 1
+        reason = self._out_of_scope(state, rule_level)
+        if reason is None:
+            probs = self.predict(state["patient_data"])
+            level = max(probs, key=probs.get)
+            confidence = probs[level]
+            if _LEVEL_RANK[level] < _LEVEL_RANK[rule_level]:
+                reason = "below_rules"
+            elif confidence < settings.risk_classifier_min_confidence:
+                reason = "uncertain"
+        if reason is not None:
+            self.deferred[reason] = self.deferred.get(reason, 0) + 1
+            return None
+
+        self.answered += 1
+        p = state["patient_data"]
+        lo, hi = _SCORE_BANDS[level]
+        return {
+            "risk_level": level,
+            "risk_score": round(lo + (hi - lo) * confidence),
+            "confidence": round(confidence, 3),
+            "reasoning": (
+                f"Vitals classifier: BP {p['bp_systolic']}/{p['bp_diastolic']} mmHg with no "
+                f"symptoms reported indicates {level} risk (calibrated probability {confidence:.2f})."
+            ),
+            "immediate_actions": list(_ACTIONS[level]),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.risk_classifier_enabled,
+            "loaded": self.loaded,
+            "min_confidence": settings.risk_classifier_min_confidence,
+            "consulted": self.consulted,
+            "answered": self.answered,
+            "deferred": dict(self.deferred),
+            "llm_calls_avoided_fraction": round(self.answered / self.consulted, 3) if self.consulted else 0.0,
+            "training": getattr(self, "training", {}),
+        }
+
+
+# Module-level singleton
+risk_classifier = RiskClassifier.load(settings.risk_classifier_file or None)
@@ -3,14 +3,12 @@ Router Node — MaTriX-AI Edge System
 Pure rule-based escalation decision — no LLM involved.
 Escalates if any of the defined clinical triggers are met.
 """
+from app.models.local_llm import Priority
 
 
-def run_router(state: dict) -> dict:
-    """
-    Evaluate risk_output + patient_data and decide whether to escalate to cloud.
-    Sets state['escalation_triggered'] and state['escalation_reason'].
-    """
-    risk = state.get("risk_output", {})
+def escalation_reason(state: dict) -> str | None:
+    """Return the first escalation trigger met by the state, or None."""
+    risk = state.get("risk_output") or {}
     p = state.get("patient_data", {})
 
     risk_level = risk.get("risk_level", "low")
@@ -20,23 +18,50 @@ def run_router(state: dict) -> dict:
     headache = p.get("headache", False)
     visual = p.get("visual_disturbance", False)
 
-    escalation_reason = None
+    reason = None
 
     # ── Escalation Rules (ANY trigger = escalate) ──────────────────────────
     if risk_level == "severe":
-        escalation_reason = "Severe maternal risk classification."
+        reason = "Severe maternal risk classification."
     elif risk_level == "high" and confidence >= 0.60:
-        escalation_reason = f"High risk (score {risk_score}) with confidence {confidence:.2f}."
+        reason = f"High risk (score {risk_score}) with confidence {confidence:.2f}."
     elif bp_sys >= 160:
-        escalation_reason = f"Systolic BP critically elevated at {bp_sys} mmHg."
+        reason = f"Systolic BP critically elevated at {bp_sys} mmHg."
     elif headache and visual:
-        escalation_reason = "Combined neurological symptoms (headache + visual disturbance)."
+        reason = "Combined neurological symptoms (headache + visual disturbance)."
     elif risk_score >= 70:
-        escalation_reason = f"Risk score {risk_score} exceeds escalation threshold."
+        reason = f"Risk score {risk_score} exceeds escalation threshold."
+
+    return reason
+
+
+def admission_priority(state: dict) -> Priority:
+    """
+    Scheduling class for this case's local LLM calls: severe cases, and cases
+    that already trip the escalation rules (e.g. from vitals alone, before the
+    risk agent has run), jump ahead of routine work. Non-critical cases from a
+    bulk sync run behind every live submission.
+    """
+    risk_level = (state.get("risk_output") or {}).get("risk_level")
+    if risk_level == "severe" or escalation_reason(state):
+        return Priority.CRITICAL
+    if state.get("bulk"):
+        return Priority.BULK
+    if risk_level in ("high", "moderate"):
+        return Priority.URGENT
+    return Priority.ROUTINE
+
+
+def run_router(state: dict) -> dict:
+    """
+    Evaluate risk_output + patient_data and decide whether to escalate to cloud.
+    Sets state['escalation_triggered'] and state['escalation_reason'].
+    """
+    reason = escalation_reason(state)
 
-    if escalation_reason:
+    if reason:
         state["escalation_triggered"] = True
-        state["escalation_reason"] = escalation_reason
+        state["escalation_reason"] = reason
     else:
         state["escalation_triggered"] = False
         state["escalation_reason"] = ""
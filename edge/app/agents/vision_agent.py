@@ -2,8 +2,10 @@
 Vision Agent — MaTriX-AI Swarm Node
 Proxies to the cloud-hosted PaliGemma-3B model to analyze clinical imagery.
 """
-import httpx
 from app.config import settings
+from app.utils.http_pool import cloud_pool
+from app.utils.metrics import FALLBACK_ACTIVATIONS
+from app.utils.tracing import span
 
 async def run_vision_agent(state: dict) -> dict:
     """
@@ -23,21 +25,22 @@ async def run_vision_agent(state: dict) -> dict:
             "prompt": "Analyze this clinical image of a pregnant patient for visible symptoms like edema (swelling), jaundice, or rashes. Identify any clinical anomalies."
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(
+        with span("cloud.vision"):
+            resp = await cloud_pool.post(
                 f"{settings.cloud_api_url}/vision_analysis",
                 json=payload,
-                headers={"X-API-Key": settings.cloud_api_key}
+                timeout=30.0,
             )
             resp.raise_for_status()
             vision_result = resp.json()
-            
-            state["vision_output"] = {
-                "status": "success",
-                "findings": vision_result.get("analysis", "No findings returned."),
-                "model": "PaliGemma-3B"
-            }
+
+        state["vision_output"] = {
+            "status": "success",
+            "findings": vision_result.get("analysis", "No findings returned."),
+            "model": "PaliGemma-3B"
+        }
     except Exception as exc:
+        FALLBACK_ACTIVATIONS.labels(agent="vision").inc()
         state["vision_output"] = {
             "status": "failed",
             "findings": f"Vision service error: {exc}",
@@ -1,21 +1,31 @@
 """API routes — UUID visits, vitals/symptoms split, JWT auth, signup."""
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime
-import httpx
 
-from app.db.database import get_db
+from app.db.database import get_db, AsyncSessionLocal
 from app.db.schemas import (
-    CaseSubmission, CaseResult, HistoryItem, 
+    CaseSubmission, CaseResult, HistoryItem, JobAccepted, JobStatus,
+    BulkSubmission, BulkCaseResult, BulkResult,
     UserCreate, Token, User as UserSchema
 )
 from app.db import crud
 from app.db.user_crud import get_user_by_username, create_user, get_user_by_id
-from app.workflow.graph import run_workflow
+from app.workflow.graph import run_workflow, stream_workflow
+from app.models.local_llm import SchedulerOverloaded
+from app.agents.router import admission_priority
+from app.workflow.job_worker import job_workers
+from app.workflow.bulk import run_bulk
 from app.utils.auth import create_access_token, get_current_user, verify_password
 from app.config import settings
+from app.utils.http_pool import cloud_pool
 
 router = APIRouter(prefix="/api", tags=["MaTriX-AI"])
 
@@ -60,19 +70,9 @@ class VisionRequest(BaseModel):
     prompt: str = "Identify any clinical anomalies or signs of severe maternal risk."
 
 
-@router.post(
-    "/submit_case",
-    response_model=CaseResult,
-    summary="Submit a maternal case for AI triage",
-)
-async def submit_case(
-    payload: CaseSubmission,
-    db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
-):
-    """Run the full LangGraph triage workflow and persist all outputs."""
-    # Flatten for workflow
-    patient_dict = {
+def _patient_dict(payload: CaseSubmission) -> dict:
+    """Flatten a CaseSubmission into the patient_data shape the workflow expects."""
+    return {
         "name": payload.name,
         "age": payload.age,
         "gestational_age_weeks": payload.gestational_age_weeks,
@@ -89,33 +89,55 @@ async def submit_case(
         "image_data": payload.image_data,
     }
 
-    try:
-        state = await run_workflow(patient_dict)
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Workflow error: {exc}")
 
-    # Persist
+async def _create_visit(db: AsyncSession, payload: CaseSubmission, clinic_id: str):
+    """Patient (get-or-create), visit, vitals and symptom rows for a submission."""
     patient = await crud.get_or_create_patient(
-        db, clinic_id=current_user["sub"], name=payload.name, age=payload.age,
+        db, clinic_id=clinic_id, name=payload.name, age=payload.age,
         gestational_age_weeks=payload.gestational_age_weeks,
     )
-    visit = await crud.create_visit(
-        db, clinic_id=current_user["sub"], patient_id=patient.id,
+    return await crud.create_visit(
+        db, clinic_id=clinic_id, patient_id=patient.id,
         vitals_data=payload.vitals.model_dump(),
         symptoms_list=payload.symptoms,
         notes=payload.notes,
     )
-    await crud.save_risk_output(db, visit_id=visit.id, risk=state["risk_output"])
-    await crud.save_guideline_output(db, visit_id=visit.id, guide=state["guideline_output"])
-    await crud.save_escalation_log(db, visit_id=visit.id, state=state)
-    await db.commit()
 
+
+async def _persist_case(db: AsyncSession, payload: CaseSubmission, state: dict,
+                        clinic_id: str, thread_id: str | None = None) -> CaseResult:
+    """
+    Write all workflow outputs for one case and build the API result. A keyed
+    submission (thread_id) is persisted once: a retry after the first attempt
+    was saved returns the original visit instead of writing a second one.
+    """
+    if thread_id:
+        visit_id = await crud.get_submission_visit(db, thread_id)
+        if visit_id:
+            return _case_result(visit_id, payload, state)
+    visit = await _create_visit(db, payload, clinic_id)
+    await crud.save_case_outputs(db, visit.id, state)
+    try:
+        if thread_id:
+            await crud.record_submission_visit(db, thread_id, visit.id)
+        await db.commit()
+    except IntegrityError:
+        # A concurrent retry of the same submission committed first
+        await db.rollback()
+        visit_id = await crud.get_submission_visit(db, thread_id)
+        if not visit_id:
+            raise
+        return _case_result(visit_id, payload, state)
+    return _case_result(visit.id, payload, state)
+
+
+def _case_result(visit_id: str, payload: CaseSubmission, state: dict) -> CaseResult:
     risk = state["risk_output"]
     guide = state["guideline_output"]
     exec_out = state.get("executive_output")
 
     return CaseResult(
-        visit_id=visit.id,
+        visit_id=visit_id,
         patient_name=payload.name,
         submitted_at=datetime.utcnow(),
         vision_output=state.get("vision_output"),
@@ -132,18 +154,300 @@ async def submit_case(
     )
 
 
+@router.post(
+    "/submit_case",
+    response_model=CaseResult,
+    summary="Submit a maternal case for AI triage",
+)
+async def submit_case(
+    payload: CaseSubmission,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=100),
+):
+    """
+    Run the full LangGraph triage workflow and persist all outputs.
+    With an Idempotency-Key, a retried request resumes from the last completed
+    workflow node instead of repeating the LLM calls, and a retry of a finished
+    request returns the visit that was already saved.
+    """
+    thread_id = _thread_id(current_user["sub"], idempotency_key)
+    try:
+        state = await run_workflow(
+            _patient_dict(payload), clinic_id=current_user["sub"], thread_id=thread_id,
+        )
+    except SchedulerOverloaded as exc:
+        raise HTTPException(
+            status_code=429, detail=str(exc),
+            headers={"Retry-After": str(int(exc.retry_after) + 1)},
+        )
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Workflow error: {exc}")
+
+    return await _persist_case(db, payload, state, clinic_id=current_user["sub"], thread_id=thread_id)
+
+
+@router.post(
+    "/submit_case/bulk",
+    response_model=BulkResult,
+    summary="Triage a clinic's queued offline cases in one request",
+)
+async def submit_case_bulk(
+    payload: BulkSubmission,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=100),
+):
+    """
+    Replay an offline backlog: cases run with bounded concurrency, severest
+    first, behind live submissions, and are persisted with bulk inserts.
+    Every case gets its own result. With an Idempotency-Key, a retried batch
+    resumes each case from its workflow checkpoint, and cases already saved
+    return their original visit.
+    """
+    if len(payload.cases) > settings.bulk_max_cases:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.bulk_max_cases} cases per batch",
+        )
+    clinic_id = current_user["sub"]
+    started = time.monotonic()
+    outcomes = await run_bulk(
+        [_patient_dict(case) for case in payload.cases], clinic_id,
+        thread_prefix=_bulk_thread_prefix(clinic_id, idempotency_key),
+    )
+
+    results = [BulkCaseResult(index=i, status="error", error=error)
+               for i, (_, error) in enumerate(outcomes)]
+    done = [i for i, (state, _) in enumerate(outcomes) if state is not None]
+    if done:
+        try:
+            saved = await crud.bulk_save_cases(db, clinic_id, [
+                (payload.cases[i].model_dump(), outcomes[i][0],
+                 _bulk_thread_id(clinic_id, idempotency_key, i))
+                for i in done
+            ])
+            await db.commit()
+        except Exception as exc:
+            await db.rollback()
+            for i in done:
+                results[i].error = f"Persistence error: {exc}"
+        else:
+            for i, (visit_id, error) in zip(done, saved):
+                if error is not None:
+                    results[i].error = error
+                    continue
+                results[i] = BulkCaseResult(
+                    index=i, status="ok",
+                    result=_case_result(visit_id, payload.cases[i], outcomes[i][0]),
+                )
+
+    succeeded = sum(1 for r in results if r.status == "ok")
+    return BulkResult(
+        total=len(results), succeeded=succeeded, failed=len(results) - succeeded,
+        elapsed_s=round(time.monotonic() - started, 2), results=results,
+    )
+
+
+def _thread_id(clinic_id: str, idempotency_key: str | None) -> str | None:
+    """Checkpoint thread of a synchronous submission (None = not resumable)."""
+    return f"case:{clinic_id}:{idempotency_key}" if idempotency_key else None
+
+
+def _bulk_thread_prefix(clinic_id: str, idempotency_key: str | None) -> str | None:
+    """Checkpoint thread prefix of a bulk submission; case i runs as f"{prefix}:{i}"."""
+    return f"bulk:{clinic_id}:{idempotency_key}" if idempotency_key else None
+
+
+def _bulk_thread_id(clinic_id: str, idempotency_key: str | None, index: int) -> str | None:
+    prefix = _bulk_thread_prefix(clinic_id, idempotency_key)
+    return f"{prefix}:{index}" if prefix else None
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post(
+    "/submit_case/stream",
+    summary="Submit a maternal case and stream per-agent results (SSE)",
+)
+async def submit_case_stream(
+    payload: CaseSubmission,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=100),
+):
+    """
+    Same triage as /submit_case, streamed as Server-Sent Events:
+      partial — an agent's JSON field (e.g. risk_level) closed mid-generation
+      agent   — an agent node finished, with its full output
+      result  — the persisted CaseResult
+      error   — the workflow or persistence failed
+    """
+    clinic_id = current_user["sub"]
+    thread_id = _thread_id(clinic_id, idempotency_key)
+
+    async def _events():
+        async for kind, data in stream_workflow(_patient_dict(payload), clinic_id=clinic_id,
+                                                thread_id=thread_id):
+            if kind == "error":
+                yield _sse("error", data)
+                return
+            if kind != "final":
+                yield _sse(kind, data)
+                continue
+            # Request-scoped dependencies are closed before streaming starts,
+            # so persistence uses its own session.
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await _persist_case(db, payload, data, clinic_id=clinic_id,
+                                                 thread_id=thread_id)
+                yield _sse("result", result.model_dump(mode="json"))
+            except Exception as exc:
+                yield _sse("error", {"detail": f"Persistence error: {exc}"})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/submit_case/async",
+    response_model=JobAccepted,
+    status_code=202,
+    summary="Submit a maternal case for background triage (returns immediately)",
+)
+async def submit_case_async(
+    payload: CaseSubmission,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=100),
+):
+    """
+    Persist the case and queue its workflow run; poll /api/jobs/{visit_id} or
+    subscribe to /api/jobs/{visit_id}/events for the result. Resubmissions with
+    the same Idempotency-Key return the original job instead of a duplicate.
+    """
+    clinic_id = current_user["sub"]
+    job = None
+    if idempotency_key:
+        job = await crud.get_job_by_idempotency_key(db, clinic_id, idempotency_key)
+    if job is None:
+        patient_data = _patient_dict(payload)
+        try:
+            visit = await _create_visit(db, payload, clinic_id)
+            job = await crud.enqueue_job(
+                db, clinic_id=clinic_id, visit_id=visit.id, payload=patient_data,
+                priority=int(admission_priority({"patient_data": patient_data})),
+                max_attempts=settings.job_max_attempts, idempotency_key=idempotency_key,
+            )
+            await db.commit()
+        except IntegrityError:
+            # A concurrent submission with the same Idempotency-Key committed first
+            await db.rollback()
+            job = (await crud.get_job_by_idempotency_key(db, clinic_id, idempotency_key)
+                   if idempotency_key else None)
+            if job is None:
+                raise
+        else:
+            job_workers.notify()
+
+    return JobAccepted(
+        visit_id=job.visit_id,
+        job_id=job.id,
+        status=job.status,
+        status_url=f"/api/jobs/{job.visit_id}",
+        events_url=f"/api/jobs/{job.visit_id}/events",
+    )
+
+
+async def _job_status(db: AsyncSession, clinic_id: str, visit_id: str) -> JobStatus | None:
+    job = await crud.get_job(db, clinic_id=clinic_id, visit_id=visit_id)
+    if job is None:
+        return None
+    result = None
+    if job.status == "done":
+        row = await crud.get_case(db, clinic_id=clinic_id, visit_id=visit_id)
+        result = _case_dict(row) if row else None
+    return JobStatus(
+        visit_id=job.visit_id, job_id=job.id, status=job.status,
+        attempts=job.attempts, max_attempts=job.max_attempts, last_error=job.last_error,
+        created_at=job.created_at, started_at=job.started_at, finished_at=job.finished_at,
+        result=result,
+    )
+
+
+@router.get("/jobs/stats", summary="Triage job queue depth, job age and worker counters")
+async def job_stats(
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    return {**await crud.job_queue_stats(db), "local_workers": job_workers.stats()}
+
+
+@router.get("/jobs/{visit_id}", response_model=JobStatus, summary="Poll an async triage job")
+async def get_job(
+    visit_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    status = await _job_status(db, current_user["sub"], visit_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Job for case {visit_id} not found.")
+    return status
+
+
+@router.get("/jobs/{visit_id}/events", summary="Subscribe to an async triage job (SSE)")
+async def job_events(
+    visit_id: str,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Server-Sent Events for one job:
+      status — the job's status or attempt count changed
+      result — the job finished; data is the stored case
+      error  — the job was dead-lettered or does not exist
+    """
+    clinic_id = current_user["sub"]
+
+    async def _events():
+        last = None
+        while True:
+            async with AsyncSessionLocal() as db:
+                status = await _job_status(db, clinic_id, visit_id)
+            if status is None:
+                yield _sse("error", {"detail": f"Job for case {visit_id} not found."})
+                return
+            if (status.status, status.attempts) != last:
+                last = (status.status, status.attempts)
+                yield _sse("status", status.model_dump(mode="json", exclude={"result"}))
+            if status.status == "done":
+                yield _sse("result", status.result)
+                return
+            if status.status == "dead":
+                yield _sse("error", {"detail": status.last_error, "status": "dead"})
+                return
+            await asyncio.sleep(settings.job_poll_interval_s)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/triage/vision", summary="Analyze clinical imagery using cloud PaliGemma 3B")
 async def triage_vision(payload: VisionRequest, current_user: dict = Depends(get_current_user)):
     """Proxies the vision request to the Cloud Executive service."""
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(
-                f"{settings.cloud_api_url}/vision_analysis",
-                json=payload.model_dump(),
-                headers={"X-API-Key": settings.cloud_api_key}
-            )
-            resp.raise_for_status()
-            return resp.json()
+        resp = await cloud_pool.post(
+            f"{settings.cloud_api_url}/vision_analysis",
+            json=payload.model_dump(),
+            timeout=30.0,
+        )
+        resp.raise_for_status()
+        return resp.json()
     except Exception as exc:
         raise HTTPException(status_code=503, detail=f"Cloud Vision service unavailable: {exc}")
 
@@ -159,6 +463,11 @@ async def get_case(
     row = await crud.get_case(db, clinic_id=current_user["sub"], visit_id=visit_id)
     if not row:
         raise HTTPException(status_code=404, detail=f"Case {visit_id} not found.")
+    return _case_dict(row)
+
+
+def _case_dict(row: dict) -> dict:
+    """API shape of a stored case (crud.get_case row)."""
     visit, patient, risk, guide, esc = (
         row["visit"], row["patient"], row["risk"], row["guide"], row["esc"]
     )
@@ -2,8 +2,8 @@
 Topology Configuration API — MaTriX-AI
 Allows hospital admins to dynamically switch between OFFLINE, HYBRID, and FULL_CLOUD modes.
 Persists topology state in-memory (reloads from ENV on restart) and checks live service health.
+Each switch activates the matching precompiled workflow graph variant.
 """
-import httpx
 import asyncio
 import time
 from fastapi import APIRouter, Depends
@@ -11,7 +11,21 @@ from pydantic import BaseModel
 from typing import Literal, Optional
 from app.config import settings
 from app.models.local_llm import local_llm
+from app.models.llm_cache import llm_cache
+from app.models.generation_profile import PROFILES
+from app.utils.http_pool import cloud_pool, http_pool_stats
 from app.utils.auth import get_current_user
+from app.warmup import warmup
+from app.workflow.speculation import speculation_stats
+from app.workflow.fast_path import fast_path_stats
+from app.agents.critique_cache import critique_cache
+from app.agents.risk_classifier import risk_classifier
+from app.workflow.checkpoint import checkpointer
+from app.rag.index import guideline_index
+from app.db.vector_pool import vector_pool
+from app.rag.embed import embedder
+from app.rag.generations import index_generations
+from app.workflow.graph import activate_graph, active_variant, variant_for
 
 router = APIRouter(prefix="/api/config", tags=["System Configuration"])
 
@@ -49,10 +63,9 @@ async def _check_service(url: str, timeout: float = 3.0) -> dict:
     """Ping a service endpoint and return status dict."""
     start = time.time()
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            resp = await client.get(url)
-            latency_ms = int((time.time() - start) * 1000)
-            return {"online": resp.status_code < 500, "latency_ms": latency_ms, "status_code": resp.status_code}
+        resp = await cloud_pool.get(url, timeout=timeout)
+        latency_ms = int((time.time() - start) * 1000)
+        return {"online": resp.status_code < 500, "latency_ms": latency_ms, "status_code": resp.status_code}
     except Exception as exc:
         return {"online": False, "latency_ms": -1, "error": str(exc)[:100]}
 
@@ -70,6 +83,15 @@ async def _get_all_service_status() -> dict:
             "online": edge_online,
             "model": settings.local_model,
             "host": settings.ollama_base_url,
+            "hosts": local_llm.hosts.stats(),
+            "cache": llm_cache.stats(),
+            "single_flight": local_llm.flights.stats(),
+            "scheduler": local_llm.scheduler.stats(),
+            "circuit_breaker": local_llm.breaker.stats(),
+            "request_mode": local_llm.mode,
+            "keep_alive": settings.local_llm_keep_alive,
+            "prompt_eval": local_llm.prompt_eval_stats(),
+            "profiles": {name: p.stats() for name, p in PROFILES.items()},
         },
         "cloud_27b": {
             **cloud,
@@ -81,6 +103,16 @@ async def _get_all_service_status() -> dict:
             "model": "PaliGemma-3B",
             "host": f"{settings.cloud_api_url}/vision_analysis",
         },
+        "http_pools": http_pool_stats(),
+        "speculation": speculation_stats.stats(),
+        "fast_path": fast_path_stats.stats(),
+        "critique_cache": critique_cache.stats(),
+        "risk_classifier": risk_classifier.stats(),
+        "checkpoints": checkpointer.stats(),
+        "guideline_index": guideline_index.stats(),
+        "vector_pool": vector_pool.stats(),
+        "embedder": embedder.stats(),
+        "index_generations": index_generations.stats(),
     }
 
 
@@ -105,7 +137,7 @@ async def get_topology(
     if config_row:
         _topology_state["data_collection_enabled"] = config_row.value.get("enabled", False)
         
-    return {**_topology_state, "model_status": model_status}
+    return {**_topology_state, "model_status": model_status, "graph_variant": active_variant().key}
 
 
 # ── POST /api/config/topology ────────────────────────────────────────────────
@@ -129,6 +161,7 @@ async def set_topology(
     _topology_state["data_collection_enabled"] = config.data_collection_enabled
     _topology_state["updated_at"] = time.time()
     _topology_state["updated_by"] = current_user.get("sub", "unknown")
+    activate_graph(graph_variant())
 
     # Persist data_collection setting to database for GitHub Actions
     from sqlalchemy.dialects.postgresql import insert
@@ -143,14 +176,23 @@ async def set_topology(
     await db.commit()
 
     model_status = await _get_all_service_status()
-    return {**_topology_state, "model_status": model_status, "message": f"Topology switched to {config.mode}"}
+    return {
+        **_topology_state, "model_status": model_status,
+        "graph_variant": active_variant().key,
+        "message": f"Topology switched to {config.mode}",
+    }
 
 
 # ── GET /api/health ──────────────────────────────────────────────────────────
 
 @router.get("/health", tags=["System Configuration"], summary="Edge service health probe (no auth)")
 async def health():
-    return {"status": "ok", "service": "matrix-edge", "topology": _topology_state["mode"]}
+    return {
+        "status": "ok" if warmup.ready else "warming",
+        "service": "matrix-edge",
+        "topology": _topology_state["mode"],
+        "warmup": warmup.status,
+    }
 
 
 # ── Export topology_state getter for use in graph.py ─────────────────────────
@@ -170,3 +212,14 @@ def is_vision_allowed() -> bool:
 
 def is_fallback_enabled() -> bool:
     return _topology_state["fallback_enabled"]
+
+
+def graph_variant():
+    """The workflow graph variant for the current topology settings."""
+    return variant_for(
+        _topology_state["mode"], _topology_state["vision_enabled"],
+        _topology_state["executive_agent_enabled"],
+    )
+
+
+activate_graph(graph_variant())
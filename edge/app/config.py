@@ -12,17 +12,112 @@ class Settings(BaseSettings):
 
     # Local LLM (Ollama — MedGemma 4B)
     ollama_base_url: str = "http://localhost:11434"
+    ollama_base_urls: str = ""   # comma-separated Ollama hosts; empty = ollama_base_url only
+    ollama_host_eject_after: int = 2       # consecutive failures before a host is ejected
+    ollama_host_eject_s: float = 30.0      # base ejection time, doubles per repeat ejection
+    ollama_host_refresh_s: float = 30.0    # /api/tags health refresh interval
     local_model: str = "medgemma:4b"
     local_llm_context: int = 4096
     local_llm_temperature: float = 0.1
+    local_llm_prefix_reuse: bool = True   # /api/chat with static system+format prefix
+    local_llm_keep_alive: str = "-1"      # seconds or duration ("24h"); -1 = never unload
+    local_llm_structured_output: bool = True   # per-agent JSON Schema as Ollama `format`
+
+    # Admission scheduler in front of Ollama (concurrency is per host)
+    local_llm_max_concurrency: int = 2
+    local_llm_min_concurrency: int = 1
+    local_llm_adaptive_concurrency: bool = True
+    local_llm_queue_size: int = 32
+    local_llm_queue_deadline_s: float = 120.0
+
+    # Circuit breaker around Ollama
+    local_llm_breaker_window: int = 20
+    local_llm_breaker_min_calls: int = 5
+    local_llm_breaker_failure_rate: float = 0.5
+    local_llm_breaker_slow_call_s: float = 45.0
+    local_llm_breaker_slow_rate: float = 0.8
+    local_llm_breaker_consecutive_failures: int = 3
+    local_llm_breaker_open_s: float = 15.0
+    local_llm_breaker_probe_timeout_s: float = 10.0
+
+    # LLM response cache (memory LRU + Postgres tier)
+    llm_cache_enabled: bool = True
+    llm_cache_max_entries: int = 512
+    llm_cache_ttl_s: float = 7 * 24 * 3600
+    llm_cache_persistent: bool = True
+
+    # Async job mode (POST /api/submit_case/async → triage_jobs queue)
+    job_workers: int = 2                 # in-process workers; 0 = enqueue only
+    job_max_attempts: int = 3
+    job_retry_base_s: float = 5.0        # backoff doubles per attempt
+    job_lease_s: float = 900.0           # running jobs not renewed for this long are reclaimed (renewed every lease/3)
+    job_poll_interval_s: float = 1.0     # idle worker / SSE status poll interval
+
+    # Durable workflow checkpoints (resume retried submissions from the last completed node)
+    workflow_checkpointing: bool = True
+    workflow_checkpoint_ttl_s: float = 24 * 3600        # checkpoints older than this are deleted
+    workflow_checkpoint_gc_interval_s: float = 3600.0
+
+    # Bulk sync (POST /api/submit_case/bulk) for clinics replaying an offline backlog
+    bulk_max_cases: int = 200
+    bulk_concurrency: int = 2            # cases in flight per batch; LLM calls also run at BULK priority
+    bulk_overload_retries: int = 3       # load-shed cases back off for Retry-After this many times
+
+    # Medication safety rules checked on every plan (empty = bundled app/agents/dosage_rules.json)
+    dosage_rules_file: str = ""
+
+    # Critique verdict cache: template plans are pre-verified; repeated plans skip the LLM critique
+    critique_cache_enabled: bool = True
+    critique_cache_max_entries: int = 256
+    critique_cache_ttl_s: float = 3600.0
+
+    # Vitals risk pre-classifier consulted before the risk agent's LLM call
+    risk_classifier_enabled: bool = True
+    risk_classifier_file: str = ""                # empty = bundled app/agents/risk_classifier.json
+    risk_classifier_min_confidence: float = 0.9   # calibrated probability required to skip MedGemma
+
+    # Shared asyncpg pool for vector queries (binary pgvector codec)
+    vector_pool_min_size: int = 1
+    vector_pool_max_size: int = 5
+
+    # In-process guideline vector index (refreshed by NOTIFY; pgvector above the size limit)
+    guideline_index_enabled: bool = True
+    guideline_index_max_rows: int = 20000
+    guideline_index_poll_s: float = 300.0   # fingerprint check / reconnect delay for the listener
+
+    # Tiered triage: clear-cut cases skip the LLM agents (deterministic plans)
+    fast_path_enabled: bool = True
+    fast_path_min_confidence: float = 0.9   # _rule_based_risk confidence required
+
+    # Speculative guideline work while the risk agent generates (rule-predicted risk level)
+    speculative_retrieval: bool = True
+
+    # Startup warm-up (embedding model, MedGemma, pgvector); /health is 503 until done
+    warmup_enabled: bool = True
+    warmup_step_timeout_s: float = 300.0
 
     # Embeddings (768-dim per spec)
     embedding_model: str = "all-mpnet-base-v2"
+    embedding_backend: str = "torch"     # torch (sentence-transformers) | onnx (int8 ONNX Runtime, no PyTorch)
+    embedding_onnx_dir: str = ""         # ONNX export cache; empty = ~/.cache/matrix-ai/onnx/<model>
+    embedding_threads: int = 0           # ONNX Runtime intra-op threads; 0 = runtime default
+    embed_batch_window_ms: float = 5.0   # gather concurrent embed requests this long before encoding
+    embed_batch_max: int = 32
+    embed_queue_max: int = 256           # callers wait when this many texts are queued
+    reembed_on_startup: bool = True      # re-embed the guideline index in the background if its model differs
+    reembed_batch_size: int = 64         # chunks per encode/insert batch while building a generation
 
     # Cloud escalation service
     cloud_api_url: str = "http://localhost:9000"
     cloud_api_key: str = ""  # Must be set via CLOUD_API_KEY env var
 
+    # Outbound HTTP connection pools (edge → Ollama, edge → cloud)
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry: float = 30.0
+    http_connect_timeout: float = 5.0
+    cloud_http2: bool = True
+
     # JWT Auth (frontend ↔ edge)
     jwt_secret_key: str = ""  # Must be set via JWT_SECRET_KEY env var
     jwt_algorithm: str = "HS256"
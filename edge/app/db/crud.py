@@ -1,8 +1,12 @@
 """Updated CRUD operations for UUID-based schema with vitals/symptoms tables."""
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
-from app.db.models import Patient, Visit, Vital, Symptom, RiskOutput, GuidelineOutput, EscalationLog
+from sqlalchemy import select, insert, update, desc, func, or_, and_, tuple_
+from app.db.models import (
+    Patient, Visit, Vital, Symptom, RiskOutput, GuidelineOutput, EscalationLog, TriageJob,
+    SubmissionVisit,
+)
+from app.utils.tracing import traced
 import uuid
 
 
@@ -11,6 +15,7 @@ def _uid():
 
 # ── Patient ───────────────────────────────────────────────────────────────────
 
+@traced("db.get_or_create_patient")
 async def get_or_create_patient(db: AsyncSession, clinic_id: str, name: str, age: int,
                                 gestational_age_weeks: int) -> Patient:
     result = await db.execute(
@@ -31,6 +36,7 @@ async def get_or_create_patient(db: AsyncSession, clinic_id: str, name: str, age
 
 # ── Visit + Vitals + Symptoms ─────────────────────────────────────────────────
 
+@traced("db.create_visit")
 async def create_visit(db: AsyncSession, clinic_id: str, patient_id: str,
                        vitals_data: dict, symptoms_list: list[str],
                        notes: str | None) -> Visit:
@@ -59,8 +65,8 @@ async def create_visit(db: AsyncSession, clinic_id: str, patient_id: str,
 
 # ── Risk Output ───────────────────────────────────────────────────────────────
 
-async def save_risk_output(db: AsyncSession, visit_id: str, risk: dict) -> RiskOutput:
-    obj = RiskOutput(
+def _risk_row(visit_id: str, risk: dict) -> dict:
+    return dict(
         id=_uid(), visit_id=visit_id,
         risk_level=risk["risk_level"],
         risk_score=float(risk["risk_score"]),
@@ -68,6 +74,11 @@ async def save_risk_output(db: AsyncSession, visit_id: str, risk: dict) -> RiskO
         reasoning=risk.get("reasoning", ""),
         immediate_actions=risk.get("immediate_actions", []),
     )
+
+
+@traced("db.save_risk_output")
+async def save_risk_output(db: AsyncSession, visit_id: str, risk: dict) -> RiskOutput:
+    obj = RiskOutput(**_risk_row(visit_id, risk))
     db.add(obj)
     await db.flush()
     return obj
@@ -75,14 +86,19 @@ async def save_risk_output(db: AsyncSession, visit_id: str, risk: dict) -> RiskO
 
 # ── Guideline Output ──────────────────────────────────────────────────────────
 
-async def save_guideline_output(db: AsyncSession, visit_id: str, guide: dict) -> GuidelineOutput:
-    obj = GuidelineOutput(
+def _guideline_row(visit_id: str, guide: dict) -> dict:
+    return dict(
         id=_uid(), visit_id=visit_id,
         stabilization_plan=guide.get("stabilization_plan", ""),
         guideline_sources=", ".join(guide.get("guideline_refs", [])),
         monitoring_instructions=guide.get("monitoring_instructions", ""),
         medication_guidance=guide.get("medication_guidance", ""),
     )
+
+
+@traced("db.save_guideline_output")
+async def save_guideline_output(db: AsyncSession, visit_id: str, guide: dict) -> GuidelineOutput:
+    obj = GuidelineOutput(**_guideline_row(visit_id, guide))
     db.add(obj)
     await db.flush()
     return obj
@@ -90,18 +106,274 @@ async def save_guideline_output(db: AsyncSession, visit_id: str, guide: dict) ->
 
 # ── Escalation Log ────────────────────────────────────────────────────────────
 
-async def save_escalation_log(db: AsyncSession, visit_id: str, state: dict) -> EscalationLog:
-    obj = EscalationLog(
+def _escalation_row(visit_id: str, state: dict) -> dict:
+    return dict(
         id=_uid(), visit_id=visit_id,
         escalated=state.get("escalation_triggered", False),
         escalation_reason=state.get("escalation_reason", ""),
         cloud_response=state.get("executive_output"),
     )
+
+
+@traced("db.save_escalation_log")
+async def save_escalation_log(db: AsyncSession, visit_id: str, state: dict) -> EscalationLog:
+    obj = EscalationLog(**_escalation_row(visit_id, state))
     db.add(obj)
     await db.flush()
     return obj
 
 
+@traced("db.save_case_outputs")
+async def save_case_outputs(db: AsyncSession, visit_id: str, state: dict) -> None:
+    """Risk, guideline and escalation rows for one completed workflow run."""
+    await save_risk_output(db, visit_id=visit_id, risk=state["risk_output"])
+    await save_guideline_output(db, visit_id=visit_id, guide=state["guideline_output"])
+    await save_escalation_log(db, visit_id=visit_id, state=state)
+
+
+@traced("db.bulk_save_cases")
+async def bulk_save_cases(db: AsyncSession, clinic_id: str,
+                          cases: list[tuple[dict, dict, str | None]]) -> list[tuple[str | None, str | None]]:
+    """
+    Persist many completed cases — (CaseSubmission.model_dump(), final workflow
+    state, submission thread id or None) triples — with one patient lookup and
+    one multi-row INSERT per table instead of per-row flushes. Returns
+    (visit_id, None) or (None, error) per case, in input order.
+
+    A keyed case that was already persisted (a retried batch) keeps its
+    original visit. If the multi-row INSERT fails, each case is retried in its
+    own savepoint so one bad row does not lose the rest of the batch.
+    """
+    now = datetime.utcnow()
+    outcomes: list[tuple[str | None, str | None]] = [(None, None)] * len(cases)
+    thread_ids = [t for _, _, t in cases if t]
+    existing: dict[str, str] = {}
+    if thread_ids:
+        existing = dict((await db.execute(
+            select(SubmissionVisit.thread_id, SubmissionVisit.visit_id)
+            .where(SubmissionVisit.thread_id.in_(thread_ids))
+        )).all())
+    pending = []
+    for i, (sub, state, thread_id) in enumerate(cases):
+        if thread_id in existing:
+            outcomes[i] = (existing[thread_id], None)
+        else:
+            pending.append(i)
+    if not pending:
+        return outcomes
+
+    keys = list({(cases[i][0]["name"], cases[i][0]["age"]) for i in pending})
+    result = await db.execute(
+        select(Patient.id, Patient.name, Patient.age).where(
+            Patient.clinic_id == clinic_id,
+            tuple_(Patient.name, Patient.age).in_(keys),
+        )
+    )
+    patient_ids: dict[tuple, str] = {}
+    for pid, name, age in result.all():
+        patient_ids.setdefault((name, age), pid)
+
+    new_patients: dict[tuple, dict] = {}
+    case_rows: dict[int, dict[type, list[dict]]] = {}
+    for i in pending:
+        sub, state, thread_id = cases[i]
+        key = (sub["name"], sub["age"])
+        if key not in patient_ids:
+            patient_ids[key] = _uid()
+            new_patients[key] = dict(
+                id=patient_ids[key], clinic_id=clinic_id, name=sub["name"], age=sub["age"],
+                gestational_age_weeks=sub["gestational_age_weeks"], created_at=now,
+            )
+        visit_id = _uid()
+        vitals = sub["vitals"]
+        case_rows[i] = {
+            Visit: [dict(id=visit_id, clinic_id=clinic_id, patient_id=patient_ids[key],
+                         visit_date=now, notes=sub.get("notes"))],
+            Vital: [dict(
+                id=_uid(), visit_id=visit_id, systolic=vitals["systolic"],
+                diastolic=vitals["diastolic"], proteinuria=vitals.get("proteinuria"),
+                heart_rate=vitals.get("heart_rate"), created_at=now,
+            )],
+            Symptom: [dict(id=_uid(), visit_id=visit_id, symptom=sym) for sym in sub.get("symptoms", [])],
+            RiskOutput: [_risk_row(visit_id, state["risk_output"])],
+            GuidelineOutput: [_guideline_row(visit_id, state["guideline_output"])],
+            EscalationLog: [_escalation_row(visit_id, state)],
+            SubmissionVisit: [dict(thread_id=thread_id, visit_id=visit_id, created_at=now)] if thread_id else [],
+        }
+
+    async def _insert(rows: dict[type, list[dict]]) -> None:
+        # Dict order is foreign-key order (patients → visits → children)
+        for model, batch in rows.items():
+            if batch:
+                await db.execute(insert(model), batch)
+
+    merged: dict[type, list[dict]] = {Patient: list(new_patients.values())}
+    for rows in case_rows.values():
+        for model, batch in rows.items():
+            merged.setdefault(model, []).extend(batch)
+    try:
+        async with db.begin_nested():
+            await _insert(merged)
+        for i, rows in case_rows.items():
+            outcomes[i] = (rows[Visit][0]["id"], None)
+        return outcomes
+    except Exception:
+        pass
+
+    # Isolate the failing case(s); a new patient row goes with the first case that succeeds
+    for i, rows in case_rows.items():
+        sub, _, thread_id = cases[i]
+        key = (sub["name"], sub["age"])
+        patient = new_patients.get(key)
+        try:
+            async with db.begin_nested():
+                await _insert({Patient: [patient] if patient else [], **rows})
+        except Exception as exc:
+            visit_id = await get_submission_visit(db, thread_id) if thread_id else None
+            outcomes[i] = (visit_id, None) if visit_id else (None, f"Persistence error: {exc}")
+            continue
+        new_patients.pop(key, None)
+        outcomes[i] = (rows[Visit][0]["id"], None)
+    return outcomes
+
+
+# ── Keyed Submissions ─────────────────────────────────────────────────────────
+
+async def get_submission_visit(db: AsyncSession, thread_id: str) -> str | None:
+    """visit_id already persisted for a keyed submission, if any."""
+    result = await db.execute(
+        select(SubmissionVisit.visit_id).where(SubmissionVisit.thread_id == thread_id)
+    )
+    return result.scalars().first()
+
+
+async def record_submission_visit(db: AsyncSession, thread_id: str, visit_id: str) -> None:
+    """Tie a keyed submission to its visit (primary key: a racing retry fails to commit)."""
+    db.add(SubmissionVisit(thread_id=thread_id, visit_id=visit_id))
+    await db.flush()
+
+
+# ── Triage Job Queue ──────────────────────────────────────────────────────────
+
+@traced("db.enqueue_job")
+async def enqueue_job(db: AsyncSession, clinic_id: str, visit_id: str, payload: dict,
+                      priority: int, max_attempts: int,
+                      idempotency_key: str | None = None) -> TriageJob:
+    job = TriageJob(
+        id=_uid(), visit_id=visit_id, clinic_id=clinic_id, payload=payload,
+        priority=priority, max_attempts=max_attempts, idempotency_key=idempotency_key,
+        status="queued", available_at=datetime.utcnow(),
+    )
+    db.add(job)
+    await db.flush()
+    return job
+
+
+async def get_job_by_idempotency_key(db: AsyncSession, clinic_id: str, key: str) -> TriageJob | None:
+    result = await db.execute(
+        select(TriageJob).where(TriageJob.clinic_id == clinic_id, TriageJob.idempotency_key == key)
+    )
+    return result.scalars().first()
+
+
+async def get_job(db: AsyncSession, clinic_id: str, visit_id: str) -> TriageJob | None:
+    result = await db.execute(
+        select(TriageJob).where(TriageJob.visit_id == visit_id, TriageJob.clinic_id == clinic_id)
+    )
+    return result.scalars().first()
+
+
+@traced("db.claim_job")
+async def claim_job(db: AsyncSession, worker_id: str, lease_s: float) -> TriageJob | None:
+    """
+    Atomically claim the next runnable job (highest priority, oldest first).
+    SKIP LOCKED lets any number of workers, in any process, poll concurrently.
+    Running jobs whose lease expired (crashed worker) are reclaimed.
+    """
+    now = datetime.utcnow()
+    result = await db.execute(
+        select(TriageJob)
+        .where(or_(
+            and_(TriageJob.status == "queued", TriageJob.available_at <= now),
+            and_(TriageJob.status == "running", TriageJob.locked_at < now - timedelta(seconds=lease_s)),
+        ))
+        .order_by(TriageJob.priority, TriageJob.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalars().first()
+    if job is None:
+        return None
+    job.status = "running"
+    job.locked_by = worker_id
+    job.locked_at = now
+    job.started_at = job.started_at or now
+    job.attempts += 1
+    await db.flush()
+    return job
+
+
+async def renew_job_lease(db: AsyncSession, job_id: str, worker_id: str) -> bool:
+    """Extend a running job's lease; False if this worker no longer holds it."""
+    result = await db.execute(
+        update(TriageJob)
+        .where(TriageJob.id == job_id, TriageJob.status == "running",
+               TriageJob.locked_by == worker_id)
+        .values(locked_at=datetime.utcnow())
+    )
+    return result.rowcount == 1
+
+
+async def lock_owned_job(db: AsyncSession, job_id: str, worker_id: str) -> TriageJob | None:
+    """Re-lock a running job for completion, only if this worker still holds its lease."""
+    result = await db.execute(
+        select(TriageJob)
+        .where(TriageJob.id == job_id, TriageJob.status == "running",
+               TriageJob.locked_by == worker_id)
+        .with_for_update()
+    )
+    return result.scalars().first()
+
+
+def finish_job(job: TriageJob) -> None:
+    job.status = "done"
+    job.finished_at = datetime.utcnow()
+    job.locked_by = None
+    job.last_error = None
+
+
+def retry_or_dead_letter(job: TriageJob, error: str, delay_s: float) -> None:
+    """Requeue after delay_s, or move to the dead-letter state once attempts are exhausted."""
+    job.last_error = error[:2000]
+    job.locked_by = None
+    if job.attempts >= job.max_attempts:
+        job.status = "dead"
+        job.finished_at = datetime.utcnow()
+    else:
+        job.status = "queued"
+        job.available_at = datetime.utcnow() + timedelta(seconds=delay_s)
+
+
+async def job_queue_stats(db: AsyncSession) -> dict:
+    """Job counts by status plus the age of the oldest waiting job."""
+    now = datetime.utcnow()
+    counts = dict((await db.execute(
+        select(TriageJob.status, func.count()).group_by(TriageJob.status)
+    )).all())
+    oldest_queued = (await db.execute(
+        select(func.min(TriageJob.created_at)).where(TriageJob.status == "queued")
+    )).scalar()
+    oldest_running = (await db.execute(
+        select(func.min(TriageJob.locked_at)).where(TriageJob.status == "running")
+    )).scalar()
+    return {
+        "depth": counts.get("queued", 0),
+        "by_status": {s: counts.get(s, 0) for s in ("queued", "running", "done", "dead")},
+        "oldest_queued_age_s": round((now - oldest_queued).total_seconds(), 1) if oldest_queued else 0.0,
+        "oldest_running_age_s": round((now - oldest_running).total_seconds(), 1) if oldest_running else 0.0,
+    }
+
+
 # ── History ───────────────────────────────────────────────────────────────────
 
 async def list_history(db: AsyncSession, clinic_id: str, skip: int = 0, limit: int = 50) -> list:
@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from sqlalchemy import (
     Column, String, Integer, Float, Boolean,
-    DateTime, ForeignKey, Text, JSON, Index
+    DateTime, ForeignKey, Text, JSON, Index, LargeBinary
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -23,6 +23,17 @@ class SystemConfig(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class LLMCacheEntry(Base):
+    """Persistent tier of the content-addressed LLM response cache."""
+    __tablename__ = "llm_response_cache"
+
+    key = Column(String(64), primary_key=True)     # sha256 of model/system/prompt/options
+    model = Column(String(100), nullable=False, index=True)
+    response = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
 class Patient(Base):
     __tablename__ = "patients"
 
@@ -112,6 +123,53 @@ class GuidelineOutput(Base):
     visit = relationship("Visit", back_populates="guideline_output")
 
 
+class TriageJob(Base):
+    """Async submission work queue — claimed by workers with FOR UPDATE SKIP LOCKED."""
+    __tablename__ = "triage_jobs"
+
+    id = Column(UUID(as_uuid=False), primary_key=True, default=new_uuid)
+    visit_id = Column(UUID(as_uuid=False), ForeignKey("visits.id"), unique=True, nullable=False)
+    clinic_id = Column(String, nullable=True, index=True)
+    idempotency_key = Column(String(100), nullable=True)
+    status = Column(String(20), nullable=False, default="queued")   # queued | running | done | dead
+    priority = Column(Integer, nullable=False, default=2)            # Priority: 0 = critical
+    payload = Column(JSON, nullable=False)                           # workflow patient_data
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    last_error = Column(Text, nullable=True)
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+# Claim order: runnable jobs by priority, then age
+Index("idx_triage_jobs_claim", TriageJob.status, TriageJob.priority, TriageJob.created_at)
+Index("idx_triage_jobs_idempotency", TriageJob.clinic_id, TriageJob.idempotency_key, unique=True)
+
+
+class SubmissionVisit(Base):
+    """Visit persisted for a keyed (Idempotency-Key) submission, so a retry reuses it."""
+    __tablename__ = "submission_visits"
+
+    thread_id = Column(String(200), primary_key=True)   # case:<clinic>:<Idempotency-Key>
+    visit_id = Column(UUID(as_uuid=False), ForeignKey("visits.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class WorkflowCheckpoint(Base):
+    """Latest LangGraph checkpoint of a workflow run, keyed per submission (thread)."""
+    __tablename__ = "workflow_checkpoints"
+
+    thread_id = Column(String(200), primary_key=True)
+    thread_ts = Column(String(64), primary_key=True)    # checkpoint timestamp (LangGraph "ts")
+    parent_ts = Column(String(64), nullable=True)
+    checkpoint = Column(LargeBinary, nullable=False)    # JsonPlusSerializer bytes
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
 class EscalationLog(Base):
     __tablename__ = "escalation_logs"
 
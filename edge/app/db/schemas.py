@@ -86,6 +86,48 @@ class CaseResult(BaseModel):
     mode: str = "offline"
 
 
+class BulkSubmission(BaseModel):
+    """Queued cases replayed by a clinic reconnecting after being offline."""
+    cases: List[CaseSubmission] = Field(..., min_length=1)
+
+
+class BulkCaseResult(BaseModel):
+    index: int                      # position in BulkSubmission.cases
+    status: str                     # ok | error
+    result: Optional[CaseResult] = None
+    error: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    elapsed_s: float
+    results: List[BulkCaseResult]   # in submission order
+
+
+class JobAccepted(BaseModel):
+    """202 response for asynchronous case submission."""
+    visit_id: str
+    job_id: str
+    status: str
+    status_url: str
+    events_url: str
+
+
+class JobStatus(BaseModel):
+    visit_id: str
+    job_id: str
+    status: str                     # queued | running | done | dead
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[dict] = None   # stored case once status is done
+
+
 class HistoryItem(BaseModel):
     visit_id: str
     patient_name: str
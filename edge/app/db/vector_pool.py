@@ -0,0 +1,86 @@
+"""
+Shared asyncpg pool for vector queries — MaTriX-AI Edge System
+Similarity queries and ingestion go straight to asyncpg (the SQLAlchemy ORM
+has no use for them). Every connection registers pgvector's binary codec, so
+a `vector` parameter or column travels as a raw float32 buffer: NumPy arrays
+are sent as-is and results come back as NumPy arrays, with no decimal-string
+formatting or parsing. The pool is opened in the FastAPI lifespan (or lazily
+by scripts) and closed on shutdown.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+import asyncpg
+from pgvector.asyncpg import register_vector
+from app.config import settings
+
+
+def asyncpg_dsn(url: str | None = None) -> str:
+    """The SQLAlchemy database URL in the form asyncpg accepts."""
+    return (url or settings.database_url).replace("postgresql+asyncpg://", "postgresql://")
+
+
+async def connect(dsn: str | None = None) -> asyncpg.Connection:
+    """A dedicated connection with the vector codec (for LISTEN and other long-lived uses)."""
+    conn = await asyncpg.connect(dsn=asyncpg_dsn(dsn))
+    await register_vector(conn)
+    return conn
+
+
+class VectorPool:
+    """Lifecycle-managed asyncpg pool whose connections speak binary pgvector."""
+
+    def __init__(self):
+        self._pool: asyncpg.Pool | None = None
+        self._lock = asyncio.Lock()
+        self._opened_at: float | None = None
+        self._acquisitions = 0
+        self._errors = 0
+
+    async def open(self, dsn: str | None = None) -> None:
+        """Create the pool; requires the `vector` extension to exist in the database."""
+        async with self._lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(
+                    dsn=asyncpg_dsn(dsn),
+                    min_size=settings.vector_pool_min_size,
+                    max_size=settings.vector_pool_max_size,
+                    init=register_vector,
+                )
+                self._opened_at = time.time()
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._pool is not None:
+                await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        if self._pool is None:
+            await self.open()
+        self._acquisitions += 1
+        try:
+            async with self._pool.acquire() as conn:
+                yield conn
+        except Exception:
+            self._errors += 1
+            raise
+
+    def stats(self) -> dict:
+        pool = self._pool
+        return {
+            "open": pool is not None,
+            "opened_at": self._opened_at,
+            "size": pool.get_size() if pool else 0,
+            "idle": pool.get_idle_size() if pool else 0,
+            "max_size": settings.vector_pool_max_size,
+            "acquisitions": self._acquisitions,
+            "errors": self._errors,
+        }
+
+
+# Module-level singleton
+vector_pool = VectorPool()
@@ -1,21 +1,72 @@
 """FastAPI entrypoint for the MaTriX-AI edge clinic system."""
+import asyncio
+import logging
 import os
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 
 from app.api.routes import router
 from app.api.topology import router as topology_router
 from app.db.database import create_all_tables
+from app.utils.http_pool import open_http_pools, close_http_pools
+from app.models.llm_cache import llm_cache
+from app.models.local_llm import local_llm
+from app.agents.critique_cache import critique_cache
+from app.agents.risk_classifier import risk_classifier
+from app.warmup import warmup
+from app.workflow.job_worker import job_workers
+from app.workflow.checkpoint import checkpointer
+from app.rag.index import guideline_index
+from app.db.vector_pool import vector_pool
+from app.rag.embed import embedder
+from app.rag.generations import index_generations
+from app.utils.metrics import (
+    REGISTRY, HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS, JOB_QUEUE_JOBS, JOB_QUEUE_OLDEST_AGE,
+    METRICS_SCRAPE_ERRORS,
+)
+from app.db.database import AsyncSessionLocal
+from app.db import crud
+from app.utils.tracing import recent_traces
+from app.config import settings
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup: create DB tables. Shutdown: (future cleanup)."""
+    """
+    Startup: create DB tables, open outbound HTTP and vector pools, pre-verify the guideline
+    templates, migrate the guideline index schema, start the re-embed check and index listener, Ollama host refresh, the background
+    warm-up, checkpoint GC and the triage job workers. Shutdown: reverse.
+    """
     await create_all_tables()
-    yield
+    await open_http_pools()
+    await vector_pool.open()
+    await llm_cache.purge_stale(settings.local_model)
+    critique_cache.preverify_templates()
+    await index_generations.migrate()
+    index_generations.start()
+    guideline_index.start()
+    local_llm.hosts.start()
+    warmup.start()
+    checkpointer.start()
+    job_workers.start()
+    try:
+        yield
+    finally:
+        await job_workers.stop()
+        await checkpointer.stop()
+        await warmup.stop()
+        await local_llm.hosts.stop()
+        await guideline_index.stop()
+        await index_generations.stop()
+        await embedder.stop()
+        await vector_pool.close()
+        await close_http_pools()
 
 
 app = FastAPI(
@@ -39,6 +90,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """In-flight gauge and per-route latency histogram for /metrics."""
+    in_flight = HTTP_IN_FLIGHT.labels()
+    in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        in_flight.dec()
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        ).observe(time.perf_counter() - started)
+
+
+def _collect_runtime_metrics():
+    """Scrape-time gauges from the LLM client, cache and job workers."""
+    sched = local_llm.scheduler.stats()
+    cache = llm_cache.stats()
+    breaker = local_llm.breaker.stats()
+    yield ("matrix_llm_queue_depth", "gauge", "Generations waiting for admission",
+           [({}, sched["queued"])])
+    yield ("matrix_llm_active", "gauge", "Generations holding a scheduler slot",
+           [({}, sched["active"])])
+    yield ("matrix_llm_concurrency_limit", "gauge", "Current adaptive concurrency limit",
+           [({}, sched["concurrency_limit"])])
+    yield ("matrix_llm_rejected_total", "counter", "Generations rejected by admission control",
+           [({}, sched["rejected"])])
+    yield ("matrix_llm_breaker_open", "gauge", "1 if the local LLM circuit breaker is not closed",
+           [({}, int(breaker["state"] != "closed"))])
+    yield ("matrix_llm_cache_hits_total", "counter", "LLM response cache hits by tier",
+           [({"tier": "memory"}, cache["hits_memory"]), ({"tier": "db"}, cache["hits_db"])])
+    yield ("matrix_llm_cache_misses_total", "counter", "LLM response cache misses",
+           [({}, cache["misses"])])
+    critique = critique_cache.stats()
+    yield ("matrix_critique_cache_hits_total", "counter", "LLM critiques skipped by verdict source",
+           [({"source": "template"}, critique["template_hits"]), ({"source": "cache"}, critique["hits"])])
+    classifier = risk_classifier.stats()
+    yield ("matrix_risk_classifier_cases_total", "counter", "Risk agent cases by classifier outcome",
+           [({"outcome": "answered"}, classifier["answered"])]
+           + [({"outcome": f"deferred_{reason}"}, n) for reason, n in classifier["deferred"].items()])
+    yield ("matrix_ollama_host_outstanding", "gauge", "In-flight generations per Ollama host",
+           [({"host": h["url"]}, h["outstanding"]) for h in local_llm.hosts.stats()])
+    yield ("matrix_ollama_host_available", "gauge", "1 if the Ollama host is routable",
+           [({"host": h["url"]}, int(h["available"])) for h in local_llm.hosts.stats()])
+    jobs = job_workers.stats()
+    yield ("matrix_jobs_processed_total", "counter", "Triage jobs processed by this process",
+           [({"outcome": "done"}, jobs["completed"]), ({"outcome": "retried"}, jobs["retried"]),
+            ({"outcome": "dead"}, jobs["dead_lettered"])])
+
+
+REGISTRY.register_collector(_collect_runtime_metrics)
+
+
 # API routes
 app.include_router(router)
 app.include_router(topology_router)
@@ -46,8 +157,45 @@ app.include_router(topology_router)
 
 @app.get("/health", tags=["Health"])
 async def health_check():
-    """Simple health probe for Docker / load-balancers."""
-    return {"status": "healthy", "system": "MaTriX-AI Edge"}
+    """Readiness probe for Docker / load-balancers — 503 until startup warm-up finishes."""
+    body = {
+        "status": "healthy" if warmup.ready else "warming",
+        "system": "MaTriX-AI Edge",
+        "warmup": warmup.stats(),
+    }
+    return JSONResponse(body, status_code=200 if warmup.ready else 503)
+
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    try:
+        # Queue depth/age are shared across processes — read them from the queue table
+        async with AsyncSessionLocal() as db:
+            queue = await asyncio.wait_for(crud.job_queue_stats(db), timeout=2.0)
+        for status, count in queue["by_status"].items():
+            JOB_QUEUE_JOBS.labels(status=status).set(count)
+        JOB_QUEUE_OLDEST_AGE.labels(status="queued").set(queue["oldest_queued_age_s"])
+        JOB_QUEUE_OLDEST_AGE.labels(status="running").set(queue["oldest_running_age_s"])
+    except Exception as exc:
+        # Export no job-queue gauges rather than last scrape's stale values
+        JOB_QUEUE_JOBS.clear()
+        JOB_QUEUE_OLDEST_AGE.clear()
+        METRICS_SCRAPE_ERRORS.labels(source="job_queue").inc()
+        logger.warning("Job queue stats unavailable for /metrics: %r", exc)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/traces", tags=["Health"])
+async def traces(limit: int = 20):
+    """Most recent workflow traces with per-node / LLM / DB span timings."""
+    return recent_traces(limit)
+
+
+@app.get("/health/live", tags=["Health"])
+async def liveness_check():
+    """Liveness probe — the process is up, regardless of warm-up state."""
+    return {"status": "alive", "system": "MaTriX-AI Edge"}
 
 
 # Serve the frontend SPA from /frontend folder
@@ -0,0 +1,155 @@
+"""
+Circuit breaker for the local LLM — MaTriX-AI Edge System
+When Ollama is down or wedged, every agent call would otherwise wait out
+timeouts × retries before reaching its deterministic fallback. The breaker
+watches a sliding window of recent calls and trips OPEN on a high error
+rate, a high slow-call rate or a run of consecutive failures; while OPEN,
+calls are refused immediately so agents fall back in microseconds. A
+background probe closes it again once the upstream answers; without a probe
+it moves to HALF_OPEN, where a single trial call decides.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the upstream while the breaker is open."""
+
+
+class CircuitBreaker:
+    """Sliding-window error-rate / latency breaker with a background recovery probe."""
+
+    def __init__(self, name: str, *, window: int, min_calls: int, failure_rate: float,
+                 slow_call_s: float, slow_rate: float, consecutive_failures: int,
+                 open_s: float, probe: Callable[[], Awaitable[bool]] | None = None):
+        self.name = name
+        self.window = deque(maxlen=window)   # (ok: bool, slow: bool)
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_s = slow_call_s
+        self.slow_rate = slow_rate
+        self.consecutive_failures = consecutive_failures
+        self.open_s = open_s
+        self.probe = probe
+        self.state = CLOSED
+        self.opened_at: float | None = None
+        self.last_reason = ""
+        self._consecutive = 0
+        self._trial_in_flight = False
+        self._probe_task: asyncio.Task | None = None
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed (claims the trial slot when HALF_OPEN)."""
+        if self.state == CLOSED:
+            return True
+        if (self.state == OPEN and self._probe_task is None
+                and time.time() - (self.opened_at or 0) >= self.open_s):
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit open: {self.last_reason}")
+
+    def release_trial(self) -> None:
+        """Give back a HALF_OPEN trial slot whose call ended without a verdict."""
+        self._trial_in_flight = False
+
+    def record_success(self, latency_s: float) -> None:
+        self._consecutive = 0
+        if self.state == HALF_OPEN:
+            self._close()
+            return
+        self.window.append((True, latency_s >= self.slow_call_s))
+        self._evaluate()
+
+    def record_failure(self, reason: str = "") -> None:
+        self._consecutive += 1
+        if self.state == HALF_OPEN:
+            self._open(f"trial call failed: {reason}")
+            return
+        self.window.append((False, False))
+        self._evaluate(reason)
+
+    def _evaluate(self, reason: str = "") -> None:
+        if self.state != CLOSED:
+            return
+        if self._consecutive >= self.consecutive_failures:
+            self._open(f"{self._consecutive} consecutive failures ({reason})")
+            return
+        if len(self.window) < self.min_calls:
+            return
+        n = len(self.window)
+        failures = sum(1 for ok, _ in self.window if not ok)
+        slow = sum(1 for _, is_slow in self.window if is_slow)
+        if failures / n >= self.failure_rate:
+            self._open(f"error rate {failures}/{n}")
+        elif slow / n >= self.slow_rate:
+            self._open(f"slow-call rate {slow}/{n} (>= {self.slow_call_s:.0f}s)")
+
+    def _open(self, reason: str) -> None:
+        self.state = OPEN
+        self.opened_at = time.time()
+        self.last_reason = reason
+        self.times_opened += 1
+        self._trial_in_flight = False
+        self._start_probe()
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self.opened_at = None
+        self.window.clear()
+        self._consecutive = 0
+        self._trial_in_flight = False
+
+    def _start_probe(self) -> None:
+        if self._probe_task is not None and not self._probe_task.done():
+            return
+        try:
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+        except RuntimeError:
+            # No running loop (sync caller) — fall back to time-based half-open in allow()
+            self._probe_task = None
+
+    async def _probe_loop(self) -> None:
+        while self.state == OPEN:
+            await asyncio.sleep(self.open_s)
+            if self.state != OPEN:
+                return
+            if self.probe is None:
+                self.state = HALF_OPEN
+                return
+            try:
+                healthy = await self.probe()
+            except Exception:
+                healthy = False
+            if healthy:
+                self._close()
+                return
+            self.last_reason = "recovery probe failed"
+
+    def stats(self) -> dict:
+        n = len(self.window)
+        return {
+            "state": self.state,
+            "reason": self.last_reason if self.state != CLOSED else "",
+            "opened_at": self.opened_at,
+            "window_calls": n,
+            "window_failures": sum(1 for ok, _ in self.window if not ok),
+            "window_slow": sum(1 for _, s in self.window if s),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,61 @@
+"""
+Per-agent generation profiles for the local LLM.
+A profile pairs a typed pydantic output model with its decode budget. The
+model's JSON Schema is passed as Ollama's structured-output `format`, so the
+sampler can only emit schema-valid JSON. The response is validated back into
+the model, and actual token usage is recorded against the budget.
+"""
+from __future__ import annotations
+from typing import Type
+from pydantic import BaseModel
+
+# Models in JSON mode occasionally emit unbounded trailing whitespace; stop early.
+DEFAULT_STOP = ("\n\n\n\n",)
+
+# name -> profile, for status reporting
+PROFILES: dict[str, "GenerationProfile"] = {}
+
+
+class GenerationProfile:
+    """Schema, token budget and stop conditions for one agent's LLM calls."""
+
+    def __init__(self, name: str, output_model: Type[BaseModel], num_predict: int,
+                 stop: tuple[str, ...] = DEFAULT_STOP):
+        self.name = name
+        self.output_model = output_model
+        self.num_predict = num_predict
+        self.stop = stop
+        self.schema = output_model.model_json_schema()
+        self.calls = 0
+        self.tokens_total = 0
+        self.tokens_max = 0
+        self.truncated = 0
+        self.validation_failures = 0
+        PROFILES[name] = self
+
+    def validate(self, data: dict) -> dict:
+        """Coerce raw model JSON into the typed output (raises pydantic.ValidationError)."""
+        try:
+            return self.output_model.model_validate(data).model_dump()
+        except Exception:
+            self.validation_failures += 1
+            raise
+
+    def record(self, response: dict) -> None:
+        """Record decode usage from an Ollama final response/stream chunk."""
+        tokens = response.get("eval_count", 0)
+        self.calls += 1
+        self.tokens_total += tokens
+        self.tokens_max = max(self.tokens_max, tokens)
+        if response.get("done_reason") == "length":
+            self.truncated += 1
+
+    def stats(self) -> dict:
+        return {
+            "num_predict": self.num_predict,
+            "calls": self.calls,
+            "avg_tokens": round(self.tokens_total / self.calls, 1) if self.calls else 0.0,
+            "max_tokens": self.tokens_max,
+            "truncated": self.truncated,
+            "validation_failures": self.validation_failures,
+        }
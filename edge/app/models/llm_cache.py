@@ -0,0 +1,174 @@
+"""
+Content-addressed LLM response cache — MaTriX-AI Edge System
+All agents run at low temperature with fixed prompt templates, so an identical
+(model, system prompt, prompt, options) tuple yields the same answer. Responses
+are cached in two tiers:
+  1. In-process LRU with TTL (per worker, microseconds)
+  2. Postgres `llm_response_cache` table (shared by all workers, survives restarts)
+The model name is part of the key and stored with every entry, so switching
+settings.local_model never serves answers produced by a previous model.
+"""
+from __future__ import annotations
+import asyncio
+import copy
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from app.config import settings
+
+
+class LLMResponseCache:
+    """Two-tier (memory LRU + Postgres) cache for parsed LLM JSON responses."""
+
+    def __init__(self, max_entries: int, ttl_s: float, persistent: bool, enabled: bool = True):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.persistent = persistent
+        self._entries: OrderedDict[str, tuple[float, str, dict]] = OrderedDict()
+        self._pending_writes: set[asyncio.Task] = set()
+        self.hits_memory = 0
+        self.hits_db = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(model: str, system: str, prompt: str, options: dict) -> str:
+        blob = json.dumps(
+            {"model": model, "system": system, "prompt": prompt, "options": options},
+            sort_keys=True, separators=(",", ":"),
+        )
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str, model: str) -> dict | None:
+        """Look up memory, then Postgres. Returns a private copy or None."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, entry_model, value = entry
+            if expires_at > time.time() and entry_model == model:
+                self._entries.move_to_end(key)
+                self.hits_memory += 1
+                return copy.deepcopy(value)
+            del self._entries[key]
+            self.invalidations += 1
+
+        if self.persistent:
+            value = await self._db_get(key, model)
+            if value is not None:
+                self.hits_db += 1
+                self._remember(key, model, value, time.time() + self.ttl_s)
+                return copy.deepcopy(value)
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, model: str, value: dict) -> None:
+        """Store in memory immediately; write through to Postgres in the background."""
+        self._remember(key, model, copy.deepcopy(value), time.time() + self.ttl_s)
+        if self.persistent:
+            task = asyncio.create_task(self._db_put(key, model, value))
+            self._pending_writes.add(task)
+            task.add_done_callback(self._pending_writes.discard)
+
+    def _remember(self, key: str, model: str, value: dict, expires_at: float) -> None:
+        self._entries[key] = (expires_at, model, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    # ── Postgres tier ────────────────────────────────────────────────────────
+
+    async def _db_get(self, key: str, model: str) -> dict | None:
+        from sqlalchemy import select
+        from app.db.database import AsyncSessionLocal
+        from app.db.models import LLMCacheEntry
+        try:
+            async with AsyncSessionLocal() as db:
+                res = await db.execute(
+                    select(LLMCacheEntry.response).where(
+                        LLMCacheEntry.key == key,
+                        LLMCacheEntry.model == model,
+                        LLMCacheEntry.expires_at > datetime.utcnow(),
+                    )
+                )
+                return res.scalar()
+        except Exception as exc:
+            if settings.debug:
+                print(f"LLM cache DB read failed: {exc}")
+            return None
+
+    async def _db_put(self, key: str, model: str, value: dict) -> None:
+        from sqlalchemy.dialects.postgresql import insert
+        from app.db.database import AsyncSessionLocal
+        from app.db.models import LLMCacheEntry
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl_s)
+        try:
+            async with AsyncSessionLocal() as db:
+                stmt = insert(LLMCacheEntry).values(
+                    key=key, model=model, response=value, created_at=now, expires_at=expires_at,
+                ).on_conflict_do_update(
+                    index_elements=["key"],
+                    set_=dict(model=model, response=value, created_at=now, expires_at=expires_at),
+                )
+                await db.execute(stmt)
+                await db.commit()
+        except Exception as exc:
+            if settings.debug:
+                print(f"LLM cache DB write failed: {exc}")
+
+    async def purge_stale(self, current_model: str) -> int:
+        """Delete expired rows and rows produced by any model other than current_model."""
+        self._entries = OrderedDict(
+            (k, v) for k, v in self._entries.items() if v[1] == current_model
+        )
+        if not self.persistent:
+            return 0
+        from sqlalchemy import delete, or_
+        from app.db.database import AsyncSessionLocal
+        from app.db.models import LLMCacheEntry
+        try:
+            async with AsyncSessionLocal() as db:
+                res = await db.execute(
+                    delete(LLMCacheEntry).where(or_(
+                        LLMCacheEntry.model != current_model,
+                        LLMCacheEntry.expires_at <= datetime.utcnow(),
+                    ))
+                )
+                await db.commit()
+                self.invalidations += res.rowcount or 0
+                return res.rowcount or 0
+        except Exception as exc:
+            if settings.debug:
+                print(f"LLM cache purge failed: {exc}")
+            return 0
+
+    def stats(self) -> dict:
+        lookups = self.hits_memory + self.hits_db + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits_memory": self.hits_memory,
+            "hits_db": self.hits_db,
+            "misses": self.misses,
+            "hit_rate": round((self.hits_memory + self.hits_db) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# Module-level singleton
+llm_cache = LLMResponseCache(
+    max_entries=settings.llm_cache_max_entries,
+    ttl_s=settings.llm_cache_ttl_s,
+    persistent=settings.llm_cache_persistent,
+    enabled=settings.llm_cache_enabled,
+)
@@ -1,8 +1,186 @@
 """Local LLM client via Ollama REST API."""
 import json
 import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncIterator, Callable
 import httpx
+from pydantic import ValidationError
 from app.config import settings
+from app.models.generation_profile import GenerationProfile
+from app.models.circuit_breaker import CircuitBreaker
+from app.models.llm_cache import llm_cache
+from app.models.ollama_hosts import OllamaHostPool
+from app.utils.http_pool import ollama_pool
+from app.utils.json_stream import IncrementalJSONObjectParser
+from app.utils.metrics import LLM_PARSE_FAILURES, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS
+from app.utils.tracing import span
+from app.utils.singleflight import SingleFlight
+
+# When set (by the streaming workflow), generate() switches to Ollama's NDJSON
+# token stream and reports each top-level JSON field as soon as it closes.
+# Signature: sink(agent, key, value)
+partial_sink: ContextVar[Callable[[str, str, Any], None] | None] = ContextVar(
+    "partial_sink", default=None
+)
+
+
+class Priority(IntEnum):
+    """Admission classes for the local model — lower value is served first."""
+    CRITICAL = 0   # severe risk, or router escalation rules already tripped
+    URGENT = 1
+    ROUTINE = 2
+    BULK = 3       # offline-clinic backlog replay; yields to live submissions
+
+
+class SchedulerOverloaded(RuntimeError):
+    """A generation could not be admitted within the queue deadline (surfaced as HTTP 429)."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Slot:
+    """Handle for an admitted generation; callers record decoded tokens on it."""
+    tokens: int = 0
+
+
+class AdmissionScheduler:
+    """
+    Priority queue with a concurrency limit in front of Ollama.
+    Ollama serves one or two generations at a time on edge hardware, so
+    requests queue here (CRITICAL before URGENT before ROUTINE, FIFO within a
+    class) rather than contending inside Ollama. The concurrency limit
+    hill-climbs on observed aggregate tokens/s between min and max.
+    """
+
+    def __init__(self, max_concurrency: int, min_concurrency: int, max_queue: int,
+                 deadline_s: float, adaptive: bool):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.limit = max_concurrency
+        self.max_queue = max_queue
+        self.deadline_s = deadline_s
+        self.adaptive = adaptive
+        self._active = 0
+        self._waiting = 0
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._avg_service_s = 10.0   # EWMA seed until real generations are observed
+        self._window_tokens = 0
+        self._window_done = 0
+        self._window_start = time.monotonic()
+        self._last_throughput: float | None = None
+        self._direction = 1
+        self.admitted = {p.name: 0 for p in Priority}
+        self.rejected = 0
+        # Exported on /metrics as well as in the topology stats
+        self.queue_depth = LLM_QUEUE_DEPTH.labels()
+        self.wait_seconds = LLM_QUEUE_WAIT_SECONDS.labels()
+
+    def _estimate_wait(self, priority: Priority) -> float:
+        ahead = sum(1 for p, _, f in self._queue if p <= priority and not f.done())
+        return (ahead + 1) * self._avg_service_s / max(self.limit, 1)
+
+    def _reject(self, reason: str) -> SchedulerOverloaded:
+        self.rejected += 1
+        retry_after = round(self._estimate_wait(Priority.ROUTINE), 1)
+        return SchedulerOverloaded(f"Local model overloaded: {reason}", retry_after=retry_after)
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority) -> AsyncIterator[_Slot]:
+        """Wait for admission, then hold a concurrency slot for the body."""
+        queued_at = time.monotonic()
+        await self._admit(priority)
+        started = time.monotonic()
+        self.wait_seconds.observe(started - queued_at)
+        self.admitted[priority.name] += 1
+        slot = _Slot()
+        try:
+            yield slot
+        finally:
+            self._release(time.monotonic() - started, slot.tokens)
+
+    async def _admit(self, priority: Priority) -> None:
+        self.queue_depth.observe(self._waiting)
+        if self._active < self.limit and self._waiting == 0:
+            self._active += 1
+            return
+        if self._waiting >= self.max_queue:
+            raise self._reject(f"queue full ({self.max_queue} waiting)")
+        estimate = self._estimate_wait(priority)
+        if estimate > self.deadline_s:
+            raise self._reject(f"estimated wait {estimate:.0f}s exceeds {self.deadline_s:.0f}s deadline")
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (int(priority), next(self._seq), fut))
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=self.deadline_s)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                return   # granted in the same tick as the timeout
+            fut.cancel()
+            raise self._reject("queue deadline exceeded")
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release(None, 0)   # hand the granted slot to the next waiter
+            else:
+                fut.cancel()
+            raise
+        finally:
+            self._waiting -= 1
+
+    def _release(self, service_s: float | None, tokens: int) -> None:
+        self._active -= 1
+        if service_s is not None:
+            self._avg_service_s = 0.8 * self._avg_service_s + 0.2 * service_s
+            self._observe_throughput(tokens)
+        while self._active < self.limit and self._queue:
+            _, _, fut = heapq.heappop(self._queue)
+            if fut.done():
+                continue
+            self._active += 1
+            fut.set_result(None)
+
+    def _observe_throughput(self, tokens: int) -> None:
+        """Every few completions, step the limit toward higher aggregate tokens/s."""
+        self._window_tokens += tokens
+        self._window_done += 1
+        elapsed = time.monotonic() - self._window_start
+        if self._window_done < 4 or elapsed <= 0:
+            return
+        throughput = self._window_tokens / elapsed
+        if self.adaptive:
+            if self._last_throughput is not None and throughput < self._last_throughput * 0.9:
+                self._direction = -self._direction
+            if self._direction < 0 or self._waiting > 0:
+                self.limit = max(self.min_concurrency,
+                                 min(self.max_concurrency, self.limit + self._direction))
+            if self.limit in (self.min_concurrency, self.max_concurrency):
+                self._direction = 1 if self.limit == self.min_concurrency else -1
+        self._last_throughput = throughput
+        self._window_tokens = 0
+        self._window_done = 0
+        self._window_start = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": self.limit,
+            "active": self._active,
+            "queued": self._waiting,
+            "tokens_per_s": round(self._last_throughput, 2) if self._last_throughput else None,
+            "avg_service_s": round(self._avg_service_s, 2),
+            "admitted": dict(self.admitted),
+            "rejected": self.rejected,
+            "queue_depth": self.queue_depth.snapshot(),
+            "wait_seconds": self.wait_seconds.snapshot(),
+        }
 
 
 class LocalLLM:
@@ -11,39 +189,155 @@ class LocalLLM:
     def __init__(self):
         self.base_url = settings.ollama_base_url
         self.model = settings.local_model
+        self.hosts = OllamaHostPool(
+            [u.strip() for u in settings.ollama_base_urls.split(",") if u.strip()]
+            or [self.base_url],
+            model=self.model,
+            eject_after=settings.ollama_host_eject_after,
+            eject_s=settings.ollama_host_eject_s,
+            refresh_s=settings.ollama_host_refresh_s,
+        )
         self.timeout = 90.0
         self.max_retries = 3
+        self.flights = SingleFlight()
+        self.timings: dict[str, dict[str, dict]] = {}
+        self.breaker = CircuitBreaker(
+            "ollama",
+            window=settings.local_llm_breaker_window,
+            min_calls=settings.local_llm_breaker_min_calls,
+            failure_rate=settings.local_llm_breaker_failure_rate,
+            slow_call_s=settings.local_llm_breaker_slow_call_s,
+            slow_rate=settings.local_llm_breaker_slow_rate,
+            consecutive_failures=settings.local_llm_breaker_consecutive_failures,
+            open_s=settings.local_llm_breaker_open_s,
+            probe=self.probe,
+        )
+        self.scheduler = AdmissionScheduler(
+            max_concurrency=settings.local_llm_max_concurrency * len(self.hosts.hosts),
+            min_concurrency=settings.local_llm_min_concurrency,
+            max_queue=settings.local_llm_queue_size,
+            deadline_s=settings.local_llm_queue_deadline_s,
+            adaptive=settings.local_llm_adaptive_concurrency,
+        )
+
+    def _options(self, profile: GenerationProfile | None = None) -> dict:
+        options = {
+            "temperature": settings.local_llm_temperature,
+            "num_ctx": settings.local_llm_context,
+            "num_predict": 1200,
+        }
+        if profile is not None:
+            options["num_predict"] = profile.num_predict
+            options["stop"] = list(profile.stop)
+        return options
+
+    def _format(self, profile: GenerationProfile | None) -> dict | str:
+        """JSON Schema for structured output when a profile is given, else free JSON mode."""
+        if profile is not None and settings.local_llm_structured_output:
+            return profile.schema
+        return "json"
 
-    async def generate(self, prompt: str, system: str = "") -> dict:
+    @property
+    def mode(self) -> str:
+        return "chat" if settings.local_llm_prefix_reuse else "generate"
+
+    def _request(self, prompt: str, system: str, instructions: str, stream: bool,
+                 profile: GenerationProfile | None = None) -> tuple[str, dict]:
         """
-        Call Ollama /api/generate with JSON mode.
-        Returns parsed dict from model JSON output.
-        Retries up to max_retries times on failure.
+        Build the Ollama (path, payload) for one generation; the host is chosen per attempt.
+
+        generate mode: /api/generate with the case details followed by the output
+        instructions — the only stable prefix is the system prompt.
+        chat mode (prefix reuse): /api/chat with the static system prompt AND the
+        static output instructions as the leading system message, so every call
+        for an agent shares an identical token prefix whose KV cache Ollama reuses;
+        only the per-case user message needs prompt evaluation.
         """
-        payload = {
+        common = {
             "model": self.model,
-            "prompt": prompt,
-            "system": system,
-            "format": "json",
-            "stream": False,
-            "options": {
-                "temperature": settings.local_llm_temperature,
-                "num_ctx": settings.local_llm_context,
-                "num_predict": 1200,
-            },
+            "format": self._format(profile),
+            "stream": stream,
+            "keep_alive": _keep_alive(settings.local_llm_keep_alive),
+            "options": self._options(profile),
         }
+        if self.mode == "chat":
+            prefix = f"{system}\n{instructions}" if instructions else system
+            return "/api/chat", {
+                **common,
+                "messages": [
+                    {"role": "system", "content": prefix},
+                    {"role": "user", "content": prompt},
+                ],
+            }
+        full_prompt = f"{prompt}\n{instructions}" if instructions else prompt
+        return "/api/generate", {**common, "prompt": full_prompt, "system": system}
 
+    async def generate(self, prompt: str, system: str = "", agent: str = "",
+                       cache: bool = True, priority: Priority = Priority.ROUTINE,
+                       instructions: str = "", profile: GenerationProfile | None = None) -> dict:
+        """
+        Call Ollama with JSON mode.
+        Returns parsed dict from model JSON output.
+        Retries up to max_retries times on failure.
+        `instructions` is the agent's static output-format block; in prefix-reuse
+        mode it is moved into the cached prefix instead of trailing the prompt.
+        `profile` constrains decoding to the agent's JSON Schema and token budget,
+        and the result is validated into its typed output model.
+        If a partial_sink is active, streams tokens and reports fields as they close.
+        Pass cache=False for calls whose answers must never be served from llm_cache.
+        Identical concurrent calls with the same priority and cache flag are
+        coalesced into a single Ollama generation.
+        Uncached generations are admitted through the priority scheduler; raises
+        SchedulerOverloaded when the queue deadline cannot be met.
+        Raises CircuitOpenError immediately while the circuit breaker is open.
+        """
+        sink = partial_sink.get()
+        request_key = llm_cache.make_key(
+            self.model, f"{system}\n{instructions}", prompt,
+            {**self._options(profile), "format": self._format(profile)},
+        )
+        use_cache = cache and llm_cache.enabled
+
+        if use_cache:
+            cached = await llm_cache.get(request_key, self.model)
+            if cached is not None:
+                _replay(sink, agent, cached)
+                return cached
+
+        path, payload = self._request(prompt, system, instructions, stream=sink is not None,
+                                      profile=profile)
+        # A joiner waits in the leader's place in the admission queue, so only
+        # same-priority calls share a flight; cache=False never shares with cache=True
+        result, shared = await self.flights.do(
+            f"{request_key}:{int(priority)}:{int(use_cache)}",
+            lambda: self._generate_uncached(
+                path, payload, prompt, agent, sink, request_key if use_cache else None, priority,
+                profile,
+            ),
+        )
+        if shared:
+            _replay(sink, agent, result)
+        return result
+
+    async def _generate_uncached(self, path: str, payload: dict, prompt: str, agent: str,
+                                 sink, cache_key: str | None, priority: Priority,
+                                 profile: GenerationProfile | None = None) -> dict:
+        """Retry loop against Ollama; stores successful parses under cache_key."""
         for attempt in range(1, self.max_retries + 1):
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    resp = await client.post(
-                        f"{self.base_url}/api/generate",
-                        json=payload,
-                    )
-                    resp.raise_for_status()
-                    raw = resp.json().get("response", "{}")
-                    return json.loads(raw)
-            except (httpx.HTTPError, json.JSONDecodeError) as exc:
+                data, result = await self._call_once(path, payload, agent, sink, priority)
+                if profile is not None:
+                    profile.record(data)
+                    result = profile.validate(result)
+                if cache_key is not None:
+                    llm_cache.put(cache_key, self.model, result)
+                return result
+            except (httpx.HTTPError, json.JSONDecodeError, ValidationError) as exc:
+                if not isinstance(exc, httpx.HTTPError):
+                    LLM_PARSE_FAILURES.labels(
+                        agent=agent or "unknown",
+                        kind="schema" if isinstance(exc, ValidationError) else "json",
+                    ).inc()
                 if settings.debug:
                     print(f"Ollama Internal Error (Attempt {attempt}): {exc}")
                     # Special Case: Mock response for demo-ing when Ollama is acting up
@@ -71,17 +365,182 @@ class LocalLLM:
         # This point is unreachable due to the raise inside the loop for the last attempt
         return {}
 
-    async def health_check(self) -> bool:
-        """Return True if Ollama is reachable and model is available."""
+    async def _call_once(self, path: str, payload: dict, agent: str, sink,
+                         priority: Priority) -> tuple[dict, dict]:
+        """
+        One admitted Ollama round-trip on the least-loaded host, reported to the
+        host pool and the circuit breaker.
+        """
+        self.breaker.check()
+        host = None
+        try:
+            async with self.scheduler.slot(priority) as slot:
+                started = time.monotonic()
+                host = self.hosts.acquire()
+                url = f"{host.url}{path}"
+                with span("llm.local", agent=agent, host=host.url):
+                    if sink is not None:
+                        fields = _FieldStream(url, payload, self.timeout)
+                        async for key, value in fields:
+                            sink(agent, key, value)
+                        data = fields.final
+                        result = fields.result
+                    else:
+                        resp = await ollama_pool.post(url, json=payload, timeout=self.timeout)
+                        resp.raise_for_status()
+                        data = resp.json()
+                        result = json.loads(_response_text(data) or "{}")
+                slot.tokens = data.get("eval_count", 0)
+        except httpx.HTTPError as exc:
+            if host is not None:
+                self.hosts.release(host, ok=False)
+            self.breaker.record_failure(type(exc).__name__)
+            raise
+        except BaseException:
+            # Malformed output or cancellation says nothing about upstream health
+            if host is not None:
+                self.hosts.release(host, ok=True)
+            self.breaker.release_trial()
+            raise
+        self.hosts.release(host, ok=True, response=data)
+        self.breaker.record_success(time.monotonic() - started)
+        self._record_timings(agent, data)
+        return data, result
+
+    async def probe(self) -> bool:
+        """
+        Tiny one-token generation used by the circuit breaker to detect recovery.
+        Refreshes host health first so re-admitted hosts are eligible.
+        """
+        await self.hosts.refresh()
+        try:
+            host = self.hosts.acquire()
+        except httpx.HTTPError:
+            return False
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                resp = await client.get(f"{self.base_url}/api/tags")
-                models = [m["name"] for m in resp.json().get("models", [])]
-                found = any(self.model in m for m in models)
-                return found
+            resp = await ollama_pool.post(
+                f"{host.url}/api/generate",
+                json={
+                    "model": self.model, "prompt": "ok", "stream": False,
+                    "keep_alive": _keep_alive(settings.local_llm_keep_alive),
+                    "options": {"num_predict": 1},
+                },
+                timeout=settings.local_llm_breaker_probe_timeout_s,
+            )
+            resp.raise_for_status()
+            self.hosts.release(host, ok=True)
+            return True
         except Exception:
+            self.hosts.release(host, ok=False)
             return False
-        return False  # Extra explicit return for linters
+
+    async def warm_up(self) -> dict[str, bool]:
+        """Page the model into memory on every available host with a one-token generation."""
+        await self.hosts.refresh()
+
+        async def _one(url: str) -> bool:
+            try:
+                resp = await ollama_pool.post(
+                    f"{url}/api/generate",
+                    json={
+                        "model": self.model, "prompt": "ok", "stream": False,
+                        "keep_alive": _keep_alive(settings.local_llm_keep_alive),
+                        "options": {"num_predict": 1},
+                    },
+                    timeout=settings.warmup_step_timeout_s,
+                )
+                resp.raise_for_status()
+                return True
+            except Exception:
+                return False
+
+        urls = [h.url for h in self.hosts.hosts if h.available]
+        return dict(zip(urls, await asyncio.gather(*(_one(u) for u in urls))))
+
+    def _record_timings(self, agent: str, data: dict) -> None:
+        """Accumulate Ollama's prompt-eval / load timings per agent and request mode."""
+        t = self.timings.setdefault(agent or "unknown", {}).setdefault(self.mode, {
+            "calls": 0, "prompt_tokens": 0, "prompt_eval_ms": 0.0, "load_ms": 0.0,
+        })
+        t["calls"] += 1
+        t["prompt_tokens"] += data.get("prompt_eval_count", 0)
+        t["prompt_eval_ms"] += data.get("prompt_eval_duration", 0) / 1e6
+        t["load_ms"] += data.get("load_duration", 0) / 1e6
+
+    def prompt_eval_stats(self) -> dict:
+        """Average prompt-eval cost per agent, split by generate vs chat (prefix-reuse) mode."""
+        return {
+            agent: {
+                mode: {
+                    "calls": t["calls"],
+                    "avg_prompt_tokens": round(t["prompt_tokens"] / t["calls"], 1),
+                    "avg_prompt_eval_ms": round(t["prompt_eval_ms"] / t["calls"], 1),
+                    "avg_load_ms": round(t["load_ms"] / t["calls"], 1),
+                }
+                for mode, t in modes.items() if t["calls"]
+            }
+            for agent, modes in self.timings.items()
+        }
+
+    async def health_check(self) -> bool:
+        """Return True if at least one Ollama host is reachable with the model available."""
+        await self.hosts.refresh()
+        return self.hosts.any_available()
+
+
+def _replay(sink, agent: str, result: dict) -> None:
+    """Report an already-complete result to a streaming sink field by field."""
+    if sink is not None:
+        for key, value in result.items():
+            sink(agent, key, value)
+
+
+def _keep_alive(value: str) -> int | str:
+    """Ollama accepts a duration string ("24h") or a number of seconds (-1 = never unload)."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _response_text(data: dict) -> str:
+    """Generated text from an /api/generate or /api/chat response (or stream chunk)."""
+    if "message" in data:
+        return data["message"].get("content", "")
+    return data.get("response", "")
+
+
+class _FieldStream:
+    """Async iterator over Ollama's NDJSON token stream with incremental JSON parsing."""
+
+    def __init__(self, url: str, payload: dict, timeout: float):
+        self._url = url
+        self._payload = payload
+        self._timeout = timeout
+        self.result: dict | None = None
+        self.final: dict = {}
+
+    def __aiter__(self) -> AsyncIterator[tuple[str, Any]]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[tuple[str, Any]]:
+        parser = IncrementalJSONObjectParser()
+        async with ollama_pool.stream(
+            "POST", self._url, json=self._payload, timeout=self._timeout,
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise httpx.HTTPError(f"Ollama stream error: {chunk['error']}")
+                for key, value in parser.feed(_response_text(chunk)):
+                    yield key, value
+                if chunk.get("done"):
+                    self.final = chunk
+                    break
+        self.result = parser.result()
 
 
 # Module-level singleton
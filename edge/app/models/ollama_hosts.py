@@ -0,0 +1,149 @@
+"""
+Multi-host Ollama pool — MaTriX-AI Edge System
+Clinic workstations with spare CPU can each run an Ollama instance. Every
+generation is routed to the available host with the lowest expected wait:
+(outstanding requests + 1) / moving-average decode tokens per second.
+Hosts without settings.local_model are skipped; a host that fails
+repeatedly is ejected, and re-admitted only when a health refresh after its
+(exponentially growing) backoff finds it serving the model again.
+"""
+from __future__ import annotations
+import asyncio
+import time
+import httpx
+from app.utils.http_pool import ollama_pool
+
+# Assumed decode speed for hosts not yet measured (CPU-only 4B Q4 ballpark)
+DEFAULT_TOKENS_PER_S = 8.0
+
+
+class OllamaHost:
+    """Routing state for one Ollama backend."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.tokens_per_s: float | None = None
+        self.reachable = True
+        self.has_model = True        # optimistic until the first refresh
+        self.consecutive_failures = 0
+        self.ejected = False
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.requests = 0
+        self.failures = 0
+        self.last_refresh: float | None = None
+
+    @property
+    def available(self) -> bool:
+        return self.reachable and self.has_model and not self.ejected
+
+    def expected_wait(self) -> float:
+        return (self.outstanding + 1) / (self.tokens_per_s or DEFAULT_TOKENS_PER_S)
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "available": self.available,
+            "reachable": self.reachable,
+            "has_model": self.has_model,
+            "ejected": self.ejected,
+            "ejected_for_s": round(max(0.0, self.ejected_until - time.time()), 1),
+            "outstanding": self.outstanding,
+            "tokens_per_s": round(self.tokens_per_s, 2) if self.tokens_per_s else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "last_refresh": self.last_refresh,
+        }
+
+
+class OllamaHostPool:
+    """Least-expected-wait routing with ejection and periodic health refresh."""
+
+    def __init__(self, urls: list[str], model: str, eject_after: int, eject_s: float,
+                 refresh_s: float):
+        self.hosts = [OllamaHost(u) for u in urls]
+        self.model = model
+        self.eject_after = eject_after
+        self.eject_s = eject_s
+        self.refresh_s = refresh_s
+        self._refresh_task: asyncio.Task | None = None
+
+    def acquire(self) -> OllamaHost:
+        """Pick the available host with the lowest expected wait and mark it busy."""
+        candidates = [h for h in self.hosts if h.available]
+        if not candidates:
+            raise httpx.ConnectError(
+                f"No available Ollama host serving {self.model} "
+                f"({len(self.hosts)} configured)"
+            )
+        host = min(candidates, key=OllamaHost.expected_wait)
+        host.outstanding += 1
+        host.requests += 1
+        return host
+
+    def release(self, host: OllamaHost, ok: bool, response: dict | None = None) -> None:
+        """Return a host after a call, updating its speed estimate or failure count."""
+        host.outstanding -= 1
+        if not ok:
+            host.failures += 1
+            host.consecutive_failures += 1
+            if host.consecutive_failures >= self.eject_after:
+                self._eject(host)
+            return
+        host.consecutive_failures = 0
+        response = response or {}
+        tokens = response.get("eval_count", 0)
+        duration_s = response.get("eval_duration", 0) / 1e9
+        if tokens and duration_s > 0:
+            tps = tokens / duration_s
+            host.tokens_per_s = tps if host.tokens_per_s is None else 0.7 * host.tokens_per_s + 0.3 * tps
+
+    def _eject(self, host: OllamaHost) -> None:
+        host.ejected = True
+        host.ejections += 1
+        backoff = self.eject_s * (2 ** min(host.ejections - 1, 5))
+        host.ejected_until = time.time() + backoff
+        host.consecutive_failures = 0
+
+    async def _refresh_host(self, host: OllamaHost) -> None:
+        try:
+            resp = await ollama_pool.get(f"{host.url}/api/tags", timeout=5.0)
+            resp.raise_for_status()
+            models = [m["name"] for m in resp.json().get("models", [])]
+            host.reachable = True
+            host.has_model = any(self.model in m for m in models)
+            if host.ejected and host.has_model and time.time() >= host.ejected_until:
+                host.ejected = False   # re-admit: backoff served and model available again
+        except Exception:
+            host.reachable = False
+        host.last_refresh = time.time()
+
+    async def refresh(self) -> None:
+        """Check every host's reachability and model availability concurrently."""
+        await asyncio.gather(*(self._refresh_host(h) for h in self.hosts))
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_s)
+
+    def start(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def any_available(self) -> bool:
+        return any(h.available for h in self.hosts)
+
+    def stats(self) -> list[dict]:
+        return [h.stats() for h in self.hosts]
@@ -1,18 +1,35 @@
 """
-Embedding generation using sentence-transformers.
-Model: all-MiniLM-L6-v2 (384-dimensional, fast, accurate)
+Embedding generation for settings.embedding_model.
+Backends (settings.embedding_backend):
+  - torch: sentence-transformers on PyTorch
+  - onnx:  int8-quantised ONNX Runtime export (app/rag/onnx_embed.py) — no
+           PyTorch import, for CPU-only edge boxes that also host Ollama
+
+embed_text / embed_batch are synchronous (scripts, threads). Async callers use
+`await embedder.embed(text)`: requests wait in a bounded queue, concurrent ones
+are gathered for up to settings.embed_batch_window_ms and encoded as one batch
+on a dedicated worker thread, so a CPU forward pass never blocks the event loop.
 """
 from __future__ import annotations
-from sentence_transformers import SentenceTransformer
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from app.config import settings
+from app.utils.metrics import EMBED_BATCH_SIZE, EMBED_SECONDS
 
-_model: SentenceTransformer | None = None
+_model = None   # SentenceTransformer | OnnxEmbeddingModel
 
 
-def _get_model() -> SentenceTransformer:
+def _get_model():
     global _model
     if _model is None:
-        _model = SentenceTransformer(settings.embedding_model)
+        if settings.embedding_backend == "onnx":
+            from app.rag.onnx_embed import OnnxEmbeddingModel
+            _model = OnnxEmbeddingModel.load()
+        else:
+            from sentence_transformers import SentenceTransformer
+            _model = SentenceTransformer(settings.embedding_model)
     return _model
 
 
@@ -26,3 +43,104 @@ def embed_batch(texts: list[str]) -> list[list[float]]:
     """Generate embedding vectors for a list of texts."""
     model = _get_model()
     return model.encode(texts, normalize_embeddings=True).tolist()
+
+
+def embedding_dimension() -> int:
+    """Output dimension of the loaded embedding model."""
+    return _get_model().get_sentence_embedding_dimension()
+
+
+def _encode(texts: list[str]) -> np.ndarray:
+    return _get_model().encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+
+
+class EmbeddingBatcher:
+    """Bounded request queue drained in micro-batches by one encoder thread."""
+
+    def __init__(self):
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+        self.encode_s = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=settings.embed_queue_max)
+            self._executor = self._executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Normalised float32 embedding of one text (waits when the queue is full)."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + settings.embed_batch_window_ms / 1000
+            while len(batch) < settings.embed_batch_max:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [item for item in batch if not item[1].cancelled()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                EMBED_SECONDS.labels(phase="queue_wait").observe(started - enqueued)
+            try:
+                vectors = await loop.run_in_executor(self._executor, _encode, [t for t, _, _ in batch])
+            except Exception as exc:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            elapsed = time.perf_counter() - started
+            EMBED_SECONDS.labels(phase="encode").observe(elapsed)
+            EMBED_BATCH_SIZE.labels().observe(len(batch))
+            self.batches += 1
+            self.texts += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.encode_s += elapsed
+            for (_, future, _), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "queue_max": settings.embed_queue_max,
+            "window_ms": settings.embed_batch_window_ms,
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "avg_encode_ms": round(self.encode_s / self.batches * 1000, 2) if self.batches else None,
+        }
+
+
+# Module-level singleton
+embedder = EmbeddingBatcher()
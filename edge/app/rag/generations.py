@@ -0,0 +1,306 @@
+"""
+Guideline embedding index generations — MaTriX-AI Edge System
+Every set of guideline embeddings belongs to a generation that records the
+embedding model and dimension that produced it. Exactly one generation is
+active; retrieval only reads its rows and refuses to rank them with a query
+vector from a different model or dimension.
+
+Changing settings.embedding_model no longer means dropping the table: at
+startup a stale active generation is re-embedded in the background, in large
+batches, into a shadow generation. Once every chunk is present the shadow is
+activated and the old rows removed in one transaction, which also notifies
+the in-process index to reload. Retrieval keeps using the old generation
+until the swap; a mismatched one is refused rather than mis-ranked, and the
+guideline agent falls back to its built-in context meanwhile.
+
+`embedding` is an unconstrained `vector` column so generations of different
+dimensions can coexist; a generation of at least _IVFFLAT_MIN_ROWS chunks gets
+its own partial ivfflat index over `embedding::vector(dim)`, with
+lists = rows / 1000; smaller ones are scanned exactly.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from typing import NamedTuple
+import asyncpg
+import numpy as np
+from app.config import settings
+
+CHANNEL = "guideline_chunks_changed"
+_REBUILD_LOCK_KEY = 0x6D747278   # pg advisory locks: one re-embed / one migration at a time
+_SCHEMA_LOCK_KEY = _REBUILD_LOCK_KEY + 1
+# Below this many rows an exact scan is fast and always returns top_k; ivfflat
+# with few rows per list and probes=1 can return fewer
+_IVFFLAT_MIN_ROWS = 10_000
+
+_SCHEMA_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS vector",
+    """
+    CREATE TABLE IF NOT EXISTS guideline_index_generations (
+        id SERIAL PRIMARY KEY,
+        model TEXT NOT NULL,
+        dim INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'building',
+        rows INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        activated_at TIMESTAMPTZ
+    )
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS guideline_index_generations_one_active
+    ON guideline_index_generations (status) WHERE status = 'active'
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS guideline_chunks (
+        id SERIAL PRIMARY KEY,
+        source TEXT NOT NULL,
+        chunk_text TEXT NOT NULL,
+        embedding vector
+    )
+    """,
+    "ALTER TABLE guideline_chunks ADD COLUMN IF NOT EXISTS generation_id INTEGER "
+    "REFERENCES guideline_index_generations(id)",
+    "CREATE INDEX IF NOT EXISTS guideline_chunks_generation_idx ON guideline_chunks (generation_id)",
+    # Fixed-dimension index from the original single-model schema
+    "DROP INDEX IF EXISTS guideline_chunks_emb_idx",
+    f"""
+    CREATE OR REPLACE FUNCTION notify_guideline_chunks_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('{CHANNEL}', TG_OP);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS guideline_chunks_changed ON guideline_chunks",
+    """
+    CREATE TRIGGER guideline_chunks_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON guideline_chunks
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_guideline_chunks_changed()
+    """,
+)
+
+
+class EmbeddingIndexMismatch(RuntimeError):
+    """The active index generation was built by a different embedding model or dimension."""
+
+
+class Generation(NamedTuple):
+    id: int
+    model: str
+    dim: int
+
+
+def check_compatible(generation: Generation, dim: int) -> None:
+    """Raise unless `generation` can be ranked with a `dim`-d query from settings.embedding_model."""
+    if generation.dim != dim:
+        raise EmbeddingIndexMismatch(
+            f"guideline index generation {generation.id} is {generation.dim}-d "
+            f"({generation.model}); the loaded model produces {dim}-d vectors"
+        )
+    if generation.model != settings.embedding_model:
+        raise EmbeddingIndexMismatch(
+            f"guideline index generation {generation.id} was embedded with {generation.model}, "
+            f"not {settings.embedding_model}"
+        )
+
+
+async def ensure_schema(conn: asyncpg.Connection) -> None:
+    """Create or migrate the tables; rows from before generations become a generation of their own."""
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", _SCHEMA_LOCK_KEY)
+        for ddl in _SCHEMA_DDL:
+            await conn.execute(ddl)
+        column_type = await conn.fetchval(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = 'guideline_chunks'::regclass AND attname = 'embedding'"
+        )
+        if column_type != "vector":
+            await conn.execute("ALTER TABLE guideline_chunks ALTER COLUMN embedding TYPE vector")
+
+        legacy = await conn.fetchrow(
+            "SELECT count(*) AS n, max(vector_dims(embedding)) AS dim "
+            "FROM guideline_chunks WHERE generation_id IS NULL"
+        )
+        if legacy["n"]:
+            has_active = await conn.fetchval(
+                "SELECT EXISTS (SELECT 1 FROM guideline_index_generations WHERE status = 'active')"
+            )
+            # The producing model was never recorded, so this generation is always re-embedded
+            gen_id = await conn.fetchval(
+                "INSERT INTO guideline_index_generations (model, dim, status, rows, activated_at) "
+                "VALUES ('unknown', $1, $2, $3, now()) RETURNING id",
+                legacy["dim"] or 0, "retired" if has_active else "active", legacy["n"],
+            )
+            await conn.execute(
+                "UPDATE guideline_chunks SET generation_id = $1 WHERE generation_id IS NULL", gen_id,
+            )
+
+
+async def active_generation(conn: asyncpg.Connection) -> Generation | None:
+    if await conn.fetchval("SELECT to_regclass('guideline_index_generations')") is None:
+        return None
+    row = await conn.fetchrow(
+        "SELECT id, model, dim FROM guideline_index_generations WHERE status = 'active'"
+    )
+    return Generation(row["id"], row["model"], row["dim"]) if row else None
+
+
+async def build_generation(conn: asyncpg.Connection, chunks: list[tuple[str, str]],
+                           progress: dict | None = None) -> Generation:
+    """
+    Embed (source, chunk_text) pairs with the loaded model into a new shadow
+    generation, then activate it atomically and delete the rows it replaces.
+    """
+    from app.rag.embed import embed_batch
+
+    model = settings.embedding_model
+    batch_size = max(1, settings.reembed_batch_size)
+    gen_id = dim = None
+    try:
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            vectors = np.asarray(await asyncio.to_thread(embed_batch, [t for _, t in batch]), dtype=np.float32)
+            if gen_id is None:
+                dim = int(vectors.shape[1])
+                gen_id = await conn.fetchval(
+                    "INSERT INTO guideline_index_generations (model, dim) VALUES ($1, $2) RETURNING id",
+                    model, dim,
+                )
+            await conn.executemany(
+                "INSERT INTO guideline_chunks (source, chunk_text, embedding, generation_id) "
+                "VALUES ($1, $2, $3, $4)",
+                [(source, text, vec, gen_id) for (source, text), vec in zip(batch, vectors)],
+            )
+            if progress is not None:
+                progress.update(generation=gen_id, embedded=start + len(batch), total=len(chunks))
+        if gen_id is None:
+            raise ValueError("no guideline chunks to embed")
+
+        if len(chunks) >= _IVFFLAT_MIN_ROWS:
+            await conn.execute(
+                f"CREATE INDEX IF NOT EXISTS guideline_chunks_gen{gen_id}_emb_idx ON guideline_chunks "
+                f"USING ivfflat ((embedding::vector({dim})) vector_cosine_ops) "
+                f"WITH (lists = {max(1, len(chunks) // 1000)}) WHERE generation_id = {gen_id}"
+            )
+        async with conn.transaction():
+            await conn.execute("LOCK TABLE guideline_index_generations IN EXCLUSIVE MODE")
+            rows = await conn.fetchval("SELECT count(*) FROM guideline_chunks WHERE generation_id = $1", gen_id)
+            if rows != len(chunks):
+                raise RuntimeError(f"shadow generation {gen_id} has {rows} of {len(chunks)} chunks")
+            retired = await conn.fetch(
+                "UPDATE guideline_index_generations SET status = 'retired' "
+                "WHERE status IN ('active', 'building') AND id <> $1 RETURNING id", gen_id,
+            )
+            await conn.execute(
+                "UPDATE guideline_index_generations SET status = 'active', rows = $2, activated_at = now() "
+                "WHERE id = $1", gen_id, rows,
+            )
+            old_ids = [r["id"] for r in retired]
+            await conn.execute("DELETE FROM guideline_chunks WHERE generation_id = ANY($1::int[])", old_ids)
+            for old_id in old_ids:
+                await conn.execute(f"DROP INDEX IF EXISTS guideline_chunks_gen{old_id}_emb_idx")
+            await conn.execute("SELECT pg_notify($1, 'SWAP')", CHANNEL)
+    except BaseException:
+        if gen_id is not None and not conn.is_closed():
+            # Leave no half-built shadow behind; the active generation is untouched
+            try:
+                async with conn.transaction():
+                    if await conn.fetchval(
+                        "UPDATE guideline_index_generations SET status = 'retired' "
+                        "WHERE id = $1 AND status = 'building' RETURNING id", gen_id,
+                    ):
+                        await conn.execute("DELETE FROM guideline_chunks WHERE generation_id = $1", gen_id)
+            except Exception:
+                pass
+        raise
+    return Generation(gen_id, model, dim)
+
+
+class GenerationManager:
+    """Startup schema migration plus a background re-embed when the active generation is stale."""
+
+    def __init__(self):
+        self.rebuilds = 0
+        self.last_error: str | None = None
+        self.progress: dict = {}
+        self.active: Generation | None = None
+        self._task: asyncio.Task | None = None
+
+    async def migrate(self) -> None:
+        """Create or migrate the schema at startup, before the index listener or any retrieval runs."""
+        from app.db.vector_pool import vector_pool
+
+        async with vector_pool.acquire() as conn:
+            await ensure_schema(conn)
+            self.active = await active_generation(conn)
+
+    async def reembed_if_stale(self, force: bool = False) -> Generation | None:
+        """Re-embed the active generation's chunks if its model differs; returns the new generation."""
+        from app.db.vector_pool import vector_pool
+        from app.rag.embed import embedding_dimension
+
+        dim = await asyncio.to_thread(embedding_dimension)
+        async with vector_pool.acquire() as conn:
+            await ensure_schema(conn)
+            if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", _REBUILD_LOCK_KEY):
+                return None   # another worker is re-embedding
+            try:
+                self.active = await active_generation(conn)
+                if self.active is None:
+                    return None   # nothing ingested yet: scripts/ingest_guidelines.py
+                try:
+                    check_compatible(self.active, dim)
+                    if not force:
+                        return None
+                except EmbeddingIndexMismatch as exc:
+                    if settings.debug:
+                        print(f"Re-embedding guideline index: {exc}")
+                chunks = [
+                    (r["source"], r["chunk_text"]) for r in await conn.fetch(
+                        "SELECT source, chunk_text FROM guideline_chunks WHERE generation_id = $1 ORDER BY id",
+                        self.active.id,
+                    )
+                ]
+                started = time.time()
+                self.progress = {"started_at": started}
+                self.active = await build_generation(conn, chunks, self.progress)
+                self.progress["finished_s"] = round(time.time() - started, 2)
+                self.rebuilds += 1
+                return self.active
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", _REBUILD_LOCK_KEY)
+
+    async def _run(self) -> None:
+        try:
+            await self.reembed_if_stale()
+            self.last_error = None
+        except Exception as exc:
+            self.last_error = f"{exc.__class__.__name__}: {exc}"
+            if settings.debug:
+                print(f"Guideline re-embed failed: {exc}")
+
+    def start(self) -> None:
+        if settings.reembed_on_startup and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "model": settings.embedding_model,
+            "active": self.active._asdict() if self.active else None,
+            "rebuilds": self.rebuilds,
+            "progress": dict(self.progress),
+            "last_error": self.last_error,
+        }
+
+
+# Module-level singleton
+index_generations = GenerationManager()
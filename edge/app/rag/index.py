@@ -0,0 +1,168 @@
+"""
+In-process guideline vector index — MaTriX-AI Edge System
+The guideline corpus is a few dozen rows, so ranking it in Postgres costs a
+connection and a round trip for a handful of dot products. The index loads
+every `guideline_chunks` embedding into one contiguous, row-normalised
+float32 matrix and answers top-k with a single matrix-vector product.
+
+Only the active index generation (app/rag/generations.py) is loaded, and a
+query vector from a different embedding model or dimension is refused.
+
+Freshness: a statement-level trigger on `guideline_chunks` (and every
+generation swap) sends NOTIFY guideline_chunks_changed; a dedicated listener
+connection reloads the matrix when it fires. A periodic (generation, row
+count, max id) fingerprint check covers notifications lost while the listener
+was reconnecting.
+
+Above settings.guideline_index_max_rows the index stays empty and
+retrieve_guideline_chunks queries pgvector instead.
+"""
+from __future__ import annotations
+import asyncio
+import time
+import asyncpg
+import numpy as np
+from app.config import settings
+from app.db.vector_pool import connect
+from app.rag.generations import CHANNEL, Generation, active_generation, check_compatible
+
+class GuidelineIndex:
+    """Immutable (generation, matrix, chunks) snapshot swapped atomically on reload."""
+
+    def __init__(self):
+        self._snapshot: tuple[Generation, np.ndarray, list[tuple[str, str]]] | None = None
+        self.mode = "unloaded"          # memory | pgvector | unloaded
+        self.generation: Generation | None = None
+        self.fingerprint: tuple[int, int, int] | None = None
+        self.loaded_at: float | None = None
+        self.reloads = 0
+        self.notifications = 0
+        self.searches = 0
+        self.errors = 0
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    # ── Lookup ───────────────────────────────────────────────────────────────
+
+    def search(self, query_vec, top_k: int) -> list[dict] | None:
+        """Top-k chunks by cosine similarity, or None when pgvector must answer."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        generation, matrix, chunks = snapshot
+        q = np.asarray(query_vec, dtype=np.float32)
+        check_compatible(generation, q.size)
+        self.searches += 1
+        k = min(top_k, len(chunks))
+        if k <= 0:
+            return []
+        scores = matrix @ (q / (np.linalg.norm(q) or 1.0))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"chunk_text": chunks[i][0], "source": chunks[i][1], "similarity": round(float(scores[i]), 4)}
+            for i in top
+        ]
+
+    # ── Loading ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    async def _fingerprint(conn: asyncpg.Connection) -> tuple[Generation | None, tuple[int, int, int] | None]:
+        generation = await active_generation(conn)
+        if generation is None:
+            return None, None
+        row = await conn.fetchrow(
+            "SELECT count(*) AS n, coalesce(max(id), 0) AS max_id FROM guideline_chunks "
+            "WHERE generation_id = $1", generation.id,
+        )
+        return generation, (generation.id, row["n"], row["max_id"])
+
+    async def reload(self, conn: asyncpg.Connection) -> None:
+        generation, fingerprint = await self._fingerprint(conn)
+        if generation is None:
+            self._snapshot, self.mode = None, "unloaded"
+        elif fingerprint[1] > settings.guideline_index_max_rows:
+            self._snapshot, self.mode = None, "pgvector"
+        else:
+            # Binary vector codec: each embedding arrives as a float32 ndarray
+            rows = await conn.fetch(
+                "SELECT chunk_text, source, embedding FROM guideline_chunks "
+                "WHERE generation_id = $1 AND embedding IS NOT NULL ORDER BY id", generation.id,
+            )
+            matrix = (np.vstack([r["embedding"] for r in rows]).astype(np.float32, copy=False)
+                      if rows else np.zeros((0, generation.dim), dtype=np.float32))
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = np.ascontiguousarray(matrix / np.where(norms == 0, 1.0, norms))
+            self._snapshot = (generation, matrix, [(r["chunk_text"], r["source"]) for r in rows])
+            self.mode = "memory"
+        self.generation = generation
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+        self.reloads += 1
+
+    # ── Change notification ──────────────────────────────────────────────────
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        self.notifications += 1
+        self._changed.set()
+
+    async def _run(self) -> None:
+        while True:
+            conn = None
+            try:
+                # LISTEN needs a connection of its own, outside the shared pool
+                conn = await connect()
+                await conn.add_listener(CHANNEL, self._on_notify)
+                self._changed.clear()
+                await self.reload(conn)
+                while True:
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout=settings.guideline_index_poll_s)
+                    except asyncio.TimeoutError:
+                        if (await self._fingerprint(conn))[1] == self.fingerprint:
+                            continue
+                    self._changed.clear()
+                    await self.reload(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.errors += 1
+                if settings.debug:
+                    print(f"Guideline index listener error: {exc}")
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            # Keep serving the last snapshot while reconnecting
+            await asyncio.sleep(min(settings.guideline_index_poll_s, 30.0))
+
+    def start(self) -> None:
+        if settings.guideline_index_enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "enabled": settings.guideline_index_enabled,
+            "mode": self.mode,
+            "generation": self.generation._asdict() if self.generation else None,
+            "rows": len(snapshot[2]) if snapshot else 0,
+            "max_rows": settings.guideline_index_max_rows,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "notifications": self.notifications,
+            "searches": self.searches,
+            "errors": self.errors,
+        }
+
+
+# Module-level singleton
+guideline_index = GuidelineIndex()
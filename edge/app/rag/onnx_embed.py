@@ -0,0 +1,139 @@
+"""
+ONNX Runtime embedding backend — MaTriX-AI Edge System
+Runs settings.embedding_model without PyTorch: the transformer is exported
+once to ONNX, int8 dynamically quantised, and cached together with its fast
+tokenizer (tokenizer.json) and pooling config. At runtime only onnxruntime,
+tokenizers and NumPy are imported; they are optional dependencies
+(pip install -r requirements-onnx.txt), needed only with EMBEDDING_BACKEND=onnx.
+
+Export (needs sentence-transformers/PyTorch and onnx, once per model, e.g. on
+a build machine):
+    python scripts/export_onnx_embedding.py
+If the cache is missing when the backend loads, it is exported in-process.
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+import numpy as np
+from app.config import settings
+
+CONFIG_FILE = "embedding_config.json"
+MODEL_FILE = "model.int8.onnx"
+
+
+def onnx_model_dir(model_name: str | None = None) -> Path:
+    """Export cache for a model (settings.embedding_onnx_dir or ~/.cache/matrix-ai/onnx/<model>)."""
+    model_name = model_name or settings.embedding_model
+    if settings.embedding_onnx_dir:
+        return Path(settings.embedding_onnx_dir)
+    return Path.home() / ".cache" / "matrix-ai" / "onnx" / model_name.replace("/", "__")
+
+
+def _runtime():
+    """(onnxruntime, tokenizers.Tokenizer), or ImportError naming the optional requirements file."""
+    try:
+        import onnxruntime
+        from tokenizers import Tokenizer
+    except ImportError as exc:
+        raise ImportError(
+            f"EMBEDDING_BACKEND=onnx needs onnxruntime and tokenizers ({exc.name} is missing): "
+            "pip install -r requirements-onnx.txt"
+        ) from exc
+    return onnxruntime, Tokenizer
+
+
+def export_onnx_model(model_name: str, out_dir: Path) -> Path:
+    """Export the transformer to ONNX, quantise weights to int8 and save the tokenizer."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer, pooling = st[0], st[1]
+    if not getattr(pooling, "pooling_mode_mean_tokens", False):
+        raise ValueError(f"{model_name}: only mean-pooled sentence-transformers models are supported")
+    tokenizer = transformer.tokenizer
+    model = transformer.auto_model.eval()
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    dummy = tokenizer(["pre-eclampsia warm-up"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in dummy]
+    fp32_path = out_dir / "model.fp32.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            model, ({n: dummy[n] for n in input_names},), str(fp32_path),
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes={n: {0: "batch", 1: "tokens"} for n in input_names + ["last_hidden_state"]},
+            opset_version=14,
+        )
+    quantize_dynamic(str(fp32_path), str(out_dir / MODEL_FILE), weight_type=QuantType.QInt8)
+    fp32_path.unlink()
+
+    tokenizer.backend_tokenizer.save(str(out_dir / "tokenizer.json"))
+    config = {
+        "model": model_name,
+        "dim": st.get_sentence_embedding_dimension(),
+        "max_seq_length": st.max_seq_length,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+        "inputs": input_names,
+        "pooling": "mean",
+        "quantization": "int8-dynamic",
+    }
+    (out_dir / CONFIG_FILE).write_text(json.dumps(config, indent=2))
+    return out_dir
+
+
+class OnnxEmbeddingModel:
+    """Mean-pooled, L2-normalised sentence embeddings with SentenceTransformer.encode's call shape."""
+
+    def __init__(self, model_dir: Path):
+        ort, Tokenizer = _runtime()
+
+        self.config = json.loads((model_dir / CONFIG_FILE).read_text())
+        if self.config["model"] != settings.embedding_model:
+            raise ValueError(
+                f"ONNX cache {model_dir} holds {self.config['model']}, "
+                f"not {settings.embedding_model}"
+            )
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if settings.embedding_threads:
+            options.intra_op_num_threads = settings.embedding_threads
+        self.session = ort.InferenceSession(
+            str(model_dir / MODEL_FILE), options, providers=["CPUExecutionProvider"],
+        )
+        self.inputs = self.config["inputs"]
+
+    @classmethod
+    def load(cls, model_name: str | None = None) -> "OnnxEmbeddingModel":
+        _runtime()
+        model_dir = onnx_model_dir(model_name)
+        if not (model_dir / CONFIG_FILE).exists():
+            if settings.debug:
+                print(f"Exporting {model_name or settings.embedding_model} to ONNX in {model_dir}")
+            export_onnx_model(model_name or settings.embedding_model, model_dir)
+        return cls(model_dir)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dim"]
+
+    def encode(self, texts: str | list[str], normalize_embeddings: bool = True, **_) -> np.ndarray:
+        single = isinstance(texts, str)
+        encodings = self.tokenizer.encode_batch([texts] if single else list(texts))
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.inputs:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(["last_hidden_state"], feeds)[0]
+
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        if normalize_embeddings:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        pooled = pooled.astype(np.float32, copy=False)
+        return pooled[0] if single else pooled
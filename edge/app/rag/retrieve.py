@@ -1,41 +1,60 @@
 """
-RAG retrieval using pgvector cosine similarity search.
+RAG retrieval by cosine similarity: the in-process guideline index, or
+pgvector when the index is not loaded or the corpus exceeds its size limit.
+Both read only the active index generation and raise EmbeddingIndexMismatch
+rather than rank it with a query from another embedding model or dimension.
 """
 from __future__ import annotations
-import asyncpg
-from app.config import settings
-from app.rag.embed import embed_text
+import numpy as np
+from app.db.vector_pool import vector_pool
+from app.rag.embed import embedder
+from app.rag.generations import EmbeddingIndexMismatch, active_generation, check_compatible
+from app.rag.index import guideline_index
+from app.utils.tracing import span
 
 
 async def retrieve_guideline_chunks(query: str, top_k: int = 3) -> list[dict]:
     """
     Embed the query and retrieve the top-k most relevant WHO guideline chunks
-    from the pgvector-powered `guideline_chunks` table using cosine similarity.
+    from the `guideline_chunks` table using cosine similarity.
     """
-    query_vec = embed_text(query)
-    vec_str = "[" + ",".join(str(v) for v in query_vec) + "]"
+    with span("rag.embed"):
+        query_vec = await embedder.embed(query)
+    with span("rag.index_search"):
+        chunks = guideline_index.search(query_vec, top_k)
+    if chunks is not None:
+        return chunks
+    return await _pgvector_search(query_vec, top_k)
 
-    dsn = settings.database_url.replace("postgresql+asyncpg://", "postgresql://")
-    conn = await asyncpg.connect(dsn=dsn)
 
-    try:
-        rows = await conn.fetch(
-            """
-            SELECT chunk_text, source, 1 - (embedding <=> $1::vector) AS similarity
-            FROM guideline_chunks
-            ORDER BY embedding <=> $1::vector
-            LIMIT $2
-            """,
-            vec_str,
-            top_k,
-        )
-        return [
-            {
-                "chunk_text": r["chunk_text"],
-                "source": r["source"],
-                "similarity": round(float(r["similarity"]), 4),
-            }
-            for r in rows
-        ]
-    finally:
-        await conn.close()
+async def _pgvector_search(query_vec: np.ndarray, top_k: int) -> list[dict]:
+    q = np.asarray(query_vec, dtype=np.float32)
+    # The pool's binary codec sends the embedding as a float32 buffer
+    async with vector_pool.acquire() as conn:
+        generation = await active_generation(conn)
+        if generation is None:
+            # Raise so the guideline agent falls back to its built-in WHO context
+            raise EmbeddingIndexMismatch("no active guideline index generation (run scripts/ingest_guidelines.py)")
+        check_compatible(generation, q.size)
+        # The cast matches the partial ivfflat index expression of large generations
+        with span("rag.pgvector_query"):
+            rows = await conn.fetch(
+                f"""
+                SELECT chunk_text, source, 1 - (embedding::vector({generation.dim}) <=> $1) AS similarity
+                FROM guideline_chunks
+                WHERE generation_id = $3
+                ORDER BY embedding::vector({generation.dim}) <=> $1
+                LIMIT $2
+                """,
+                q,
+                top_k,
+                generation.id,
+            )
+    return [
+        {
+            "chunk_text": r["chunk_text"],
+            "source": r["source"],
+            "similarity": round(float(r["similarity"]), 4),
+        }
+        for r in rows
+    ]
@@ -0,0 +1,141 @@
+"""
+Shared outbound HTTP client pools — MaTriX-AI Edge System
+One long-lived httpx.AsyncClient per upstream (Ollama, cloud) so agent hops
+reuse keep-alive connections instead of paying a TCP/TLS handshake per call.
+Pools are opened in the FastAPI lifespan and closed on shutdown.
+"""
+from __future__ import annotations
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+import httpx
+from app.config import settings
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class UpstreamPool:
+    """Lifecycle-managed AsyncClient for a single upstream with request statistics."""
+
+    def __init__(self, name: str, *, http2: bool = False, headers: dict | None = None):
+        self.name = name
+        self.http2 = http2 and _http2_available()
+        self.headers = headers or {}
+        self._client: httpx.AsyncClient | None = None
+        self._transport: httpx.AsyncHTTPTransport | None = None
+        self._opened_at: float | None = None
+        self._requests = 0
+        self._errors = 0
+        self._in_flight = 0
+
+    def _build(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        self._transport = httpx.AsyncHTTPTransport(limits=limits, http2=self.http2)
+        self._opened_at = time.time()
+        return httpx.AsyncClient(
+            transport=self._transport,
+            headers=self.headers,
+            timeout=httpx.Timeout(30.0, connect=settings.http_connect_timeout),
+        )
+
+    async def open(self) -> None:
+        if self._client is None or self._client.is_closed:
+            self._client = self._build()
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._transport = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the shared client, opening it lazily (scripts run without a lifespan)."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build()
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        self._requests += 1
+        self._in_flight += 1
+        try:
+            return await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self._errors += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Streaming request (e.g. Ollama NDJSON) over the shared connection pool."""
+        self._requests += 1
+        self._in_flight += 1
+        try:
+            async with self.client.stream(method, url, **kwargs) as resp:
+                yield resp
+        except httpx.HTTPError:
+            self._errors += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+    def stats(self) -> dict:
+        """Pool statistics for the topology / status endpoints."""
+        connections = []
+        pool = getattr(self._transport, "_pool", None)
+        if pool is not None:
+            connections = list(getattr(pool, "connections", []))
+        return {
+            "open": self._client is not None and not self._client.is_closed,
+            "http2": self.http2,
+            "uptime_s": round(time.time() - self._opened_at, 1) if self._opened_at else 0.0,
+            "requests": self._requests,
+            "errors": self._errors,
+            "in_flight": self._in_flight,
+            "connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+            "max_connections": settings.http_max_connections,
+            "max_keepalive_connections": settings.http_max_keepalive_connections,
+        }
+
+
+# Module-level singletons (one per upstream)
+ollama_pool = UpstreamPool("ollama")
+cloud_pool = UpstreamPool(
+    "cloud",
+    http2=settings.cloud_http2,
+    headers={"X-API-Key": settings.cloud_api_key},
+)
+
+
+async def open_http_pools() -> None:
+    """Called from the FastAPI lifespan on startup."""
+    await ollama_pool.open()
+    await cloud_pool.open()
+
+
+async def close_http_pools() -> None:
+    """Called from the FastAPI lifespan on shutdown."""
+    await ollama_pool.aclose()
+    await cloud_pool.aclose()
+
+
+def http_pool_stats() -> dict:
+    return {"ollama": ollama_pool.stats(), "cloud": cloud_pool.stats()}
@@ -0,0 +1,97 @@
+"""
+Incremental JSON decoding for streamed LLM output.
+Feeds token fragments of a single top-level JSON object and emits each
+top-level field as soon as its value closes (e.g. "risk_level" is available
+long before "reasoning" and "immediate_actions" have been generated).
+"""
+from __future__ import annotations
+import json
+from typing import Any
+
+
+class IncrementalJSONObjectParser:
+    """Single-pass, resumable scanner over a streamed JSON object."""
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = True
+        self._key_start: int | None = None
+        self._key: str | None = None
+        self._value_start: int | None = None
+        self.fields: dict[str, Any] = {}
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        """Append a fragment and return the (key, value) pairs completed by it."""
+        self.buffer += chunk
+        completed: list[tuple[str, Any]] = []
+        buf = self.buffer
+
+        while self._pos < len(buf):
+            i = self._pos
+            ch = buf[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key and self._key_start is not None:
+                        self._key = json.loads(buf[self._key_start:i + 1])
+                        self._key_start = None
+                    elif self._depth == 1 and self._value_start is not None:
+                        self._emit(buf[self._value_start:i + 1], completed)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_start = i
+                elif self._depth == 1 and self._value_start is None:
+                    self._value_start = i
+            elif ch in "{[":
+                if self._depth == 1 and self._value_start is None and not self._expect_key:
+                    self._value_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    self._emit(buf[self._value_start:i + 1], completed)
+                elif self._depth == 0 and self._value_start is not None:
+                    # Scalar value terminated by the closing brace
+                    self._emit(buf[self._value_start:i], completed)
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect_key = False
+                elif ch == ",":
+                    if self._value_start is not None:
+                        self._emit(buf[self._value_start:i], completed)
+                    self._expect_key = True
+                elif not ch.isspace() and self._value_start is None and not self._expect_key:
+                    self._value_start = i
+
+        return completed
+
+    def _emit(self, raw: str, completed: list) -> None:
+        key = self._key
+        self._value_start = None
+        self._key = None
+        if key is None:
+            return
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        if key not in self.fields:
+            self.fields[key] = value
+            completed.append((key, value))
+
+    def result(self) -> dict:
+        """Full parse of everything fed so far (raises on malformed JSON)."""
+        return json.loads(self.buffer)
@@ -0,0 +1,209 @@
+"""
+Lightweight in-process metrics primitives for the edge service, plus labelled
+Prometheus-style families rendered by REGISTRY for the /metrics endpoint.
+"""
+from __future__ import annotations
+import bisect
+
+# Default latency buckets (seconds) — spans sub-ms cache hits to multi-minute CPU generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative (Prometheus-style) snapshots."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        out, running = [], 0
+        for bound, n in zip(self.buckets, self._counts):
+            running += n
+            out.append((repr(float(bound)), running))
+        out.append(("+Inf", self.count))
+        return out
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": dict(self.cumulative()),
+            "sum": round(self.sum, 4),
+            "count": self.count,
+        }
+
+
+# ── Prometheus families ──────────────────────────────────────────────────────
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _Family:
+    """A named metric with a fixed label set; children are created on first use."""
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 registry: "Registry | None" = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        (registry or REGISTRY).register(self)
+
+    def _new_child(self):
+        return _Value()
+
+    def clear(self) -> None:
+        """Drop every child, e.g. gauges whose source could not be read this scrape."""
+        self._children.clear()
+
+    def labels(self, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._children.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {child.value}")
+        return lines
+
+
+class CounterVec(_Family):
+    kind = "counter"
+
+
+class GaugeVec(_Family):
+    kind = "gauge"
+
+
+class HistogramVec(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS, registry: "Registry | None" = None):
+        self.buckets = buckets
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return Histogram(self.buckets)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, hist in self._children.items():
+            for le, count in hist.cumulative():
+                bucket_labels = _labels(self.labelnames, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {hist.sum}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {hist.count}")
+        return lines
+
+
+class Registry:
+    """Metric families plus scrape-time collectors, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._families: list[_Family] = []
+        self._collectors: list = []
+
+    def register(self, family: _Family) -> None:
+        self._families.append(family)
+
+    def register_collector(self, fn) -> None:
+        """fn() -> iterable of (name, kind, help, [(labels: dict, value)]) read at scrape time."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for family in self._families:
+            lines.extend(family.render())
+        for fn in self._collectors:
+            try:
+                samples = list(fn())
+            except Exception:
+                continue   # a broken collector must not take down the scrape
+            for name, kind, help, values in samples:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ── Edge service metrics ─────────────────────────────────────────────────────
+
+HTTP_REQUEST_SECONDS = HistogramVec(
+    "matrix_http_request_seconds", "HTTP request latency by route", ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = GaugeVec("matrix_http_requests_in_flight", "HTTP requests currently being served")
+SPAN_SECONDS = HistogramVec(
+    "matrix_span_seconds", "Duration of traced operations (workflow nodes, LLM calls, DB writes)",
+    ("span",),
+)
+SPAN_ERRORS = CounterVec("matrix_span_errors_total", "Traced operations that raised", ("span",))
+FALLBACK_ACTIVATIONS = CounterVec(
+    "matrix_fallback_activations_total", "Deterministic fallbacks used in place of a model", ("agent",),
+)
+LLM_PARSE_FAILURES = CounterVec(
+    "matrix_llm_parse_failures_total", "Local LLM outputs that failed JSON parsing or schema validation",
+    ("agent", "kind"),
+)
+JOB_QUEUE_JOBS = GaugeVec("matrix_job_queue_jobs", "Triage jobs by status", ("status",))
+JOB_QUEUE_OLDEST_AGE = GaugeVec(
+    "matrix_job_queue_oldest_age_seconds", "Age of the oldest job in a status", ("status",),
+)
+METRICS_SCRAPE_ERRORS = CounterVec(
+    "matrix_metrics_scrape_errors_total", "Scrape-time metric sources that failed to read", ("source",),
+)
+CASES_TOTAL = CounterVec(
+    "matrix_cases_total", "Triage workflow runs by path and escalation decision",
+    ("path", "escalated"),
+)
+LLM_QUEUE_WAIT_SECONDS = HistogramVec(
+    "matrix_llm_queue_wait_seconds", "Time a generation waited for a local LLM scheduler slot",
+)
+LLM_QUEUE_DEPTH = HistogramVec(
+    "matrix_llm_admission_queue_depth", "Generations already waiting when a request asked for admission",
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64),
+)
+EMBED_BATCH_SIZE = HistogramVec(
+    "matrix_embed_batch_size", "Texts encoded per embedding batch", buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+EMBED_SECONDS = HistogramVec(
+    "matrix_embed_seconds", "Embedding service time by phase (queue wait per text, encode per batch)",
+    ("phase",), buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
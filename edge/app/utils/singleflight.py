@@ -0,0 +1,82 @@
+"""
+Single-flight coalescing of identical in-flight async calls.
+Concurrent callers with the same key share one execution: the first caller
+(leader) runs the call, later callers (waiters) await its result. If the
+leader is cancelled, one waiter takes over and re-runs the call rather than
+every waiter failing.
+"""
+from __future__ import annotations
+import asyncio
+import copy
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """Signals waiters that the leader was cancelled and the call must be retried."""
+
+
+class SingleFlight:
+    """Per-key coalescing of concurrent awaitables with savings counters."""
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.takeovers = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """
+        Run fn() once per key across concurrent callers.
+        Returns (result, shared) — shared is True when this caller received
+        another caller's result (a private deep copy, safe to mutate).
+        """
+        took_over = False
+        while True:
+            fut = self._inflight.get(key)
+            if fut is None:
+                break
+            try:
+                result = await asyncio.shield(fut)
+            except _LeaderCancelled:
+                took_over = True
+                continue
+            self.coalesced += 1
+            return copy.deepcopy(result), True
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        self.executions += 1
+        if took_over:
+            self.takeovers += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._finish(key, fut, exc=_LeaderCancelled())
+            raise
+        except BaseException as exc:
+            self._finish(key, fut, exc=exc)
+            raise
+        self._finish(key, fut, result=result)
+        return result, False
+
+    def _finish(self, key: str, fut: asyncio.Future, result=None, exc: BaseException | None = None) -> None:
+        if self._inflight.get(key) is fut:
+            del self._inflight[key]
+        if fut.done():
+            return
+        if exc is None:
+            # Snapshot: the leader may mutate its result before waiters wake
+            fut.set_result(copy.deepcopy(result))
+        else:
+            fut.set_exception(exc)
+            fut.exception()  # mark retrieved: no waiters is not an error
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "takeovers": self.takeovers,
+        }
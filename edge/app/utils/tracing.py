@@ -0,0 +1,84 @@
+"""
+Lightweight tracing for the triage workflow.
+`span(name)` times a block (sync or async code) into the matrix_span_seconds
+histogram. Inside a `trace(...)` — one per workflow run — spans are also
+collected with their parent, so the slowest recent runs can be inspected
+span by span at /metrics/traces.
+"""
+from __future__ import annotations
+import functools
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+from app.utils.metrics import SPAN_SECONDS, SPAN_ERRORS
+
+# Spans of the trace active in this context, and the enclosing span id
+_trace: ContextVar[list | None] = ContextVar("trace", default=None)
+_parent: ContextVar[int | None] = ContextVar("trace_parent", default=None)
+_ids = itertools.count(1)
+
+RECENT_TRACES: deque = deque(maxlen=50)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[None]:
+    """Time a block; records errors and, inside a trace, the span tree."""
+    span_id = next(_ids)
+    parent = _parent.get()
+    token = _parent.set(span_id)
+    started = time.perf_counter()
+    offset = time.time()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = type(exc).__name__
+        SPAN_ERRORS.labels(span=name).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        _parent.reset(token)
+        SPAN_SECONDS.labels(span=name).observe(elapsed)
+        spans = _trace.get()
+        if spans is not None:
+            spans.append({
+                "id": span_id, "parent": parent, "name": name, "start": offset,
+                "duration_ms": round(elapsed * 1000, 2), "error": error, **attrs,
+            })
+
+
+def traced(name: str):
+    """Decorator: wrap an async function in span(name)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def trace(name: str, **attrs) -> Iterator[list]:
+    """Collect every span in this context (including child tasks) into one trace."""
+    spans: list = []
+    token = _trace.set(spans)
+    started = time.time()
+    try:
+        with span(name, **attrs):
+            yield spans
+    finally:
+        _trace.reset(token)
+        RECENT_TRACES.append({
+            "name": name, "start": started,
+            "duration_ms": round((time.time() - started) * 1000, 2),
+            **attrs,
+            "spans": sorted(spans, key=lambda s: s["start"]),
+        })
+
+
+def recent_traces(limit: int = 20) -> list[dict]:
+    return list(RECENT_TRACES)[-limit:][::-1]
@@ -0,0 +1,105 @@
+"""
+Startup warm-up — MaTriX-AI Edge System
+The first triage after a restart otherwise pays for loading the embedding
+model, paging MedGemma into memory and opening the first pgvector query.
+The lifespan runs these steps in the background; /health reports the node
+as not ready (503) until every step has been attempted, so load balancers
+keep real cases off a cold node.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from typing import Awaitable, Callable
+from app.config import settings
+
+
+async def _warm_embeddings() -> None:
+    from app.rag.embed import embedder
+    await embedder.embed("pre-eclampsia warm-up")
+
+
+async def _warm_llm() -> None:
+    from app.models.local_llm import local_llm
+    results = await local_llm.warm_up()
+    if not any(results.values()):
+        raise RuntimeError(f"no Ollama host answered: {results}")
+
+
+async def _warm_pgvector() -> None:
+    # Query pgvector itself: retrieve_guideline_chunks is normally answered by the
+    # in-process index and would leave the vector pool and ivfflat index cold.
+    from app.rag.embed import embedder
+    from app.rag.retrieve import _pgvector_search
+    await _pgvector_search(await embedder.embed("severe pre-eclampsia management"), top_k=1)
+
+
+class Warmup:
+    """Runs the warm-up steps once and tracks readiness."""
+
+    STEPS: tuple[tuple[str, Callable[[], Awaitable[None]]], ...] = (
+        ("embedding_model", _warm_embeddings),
+        ("local_llm", _warm_llm),
+        ("pgvector", _warm_pgvector),
+    )
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.steps: dict[str, dict] = {name: {"status": "pending"} for name, _ in self.STEPS}
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Launch warm-up in the background (or mark ready immediately if disabled)."""
+        if not settings.warmup_enabled:
+            self.ready = True
+            return
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self) -> None:
+        self.started_at = time.time()
+        for name, step in self.STEPS:
+            self.steps[name] = {"status": "running"}
+            t0 = time.monotonic()
+            try:
+                await asyncio.wait_for(step(), timeout=settings.warmup_step_timeout_s)
+                self.steps[name] = {"status": "ok"}
+            except Exception as exc:
+                # A failed step must not keep the node out of rotation forever —
+                # agents have deterministic fallbacks; report the node as degraded.
+                self.steps[name] = {"status": "failed", "error": str(exc) or type(exc).__name__}
+                if settings.debug:
+                    print(f"Warm-up step {name} failed: {exc}")
+            self.steps[name]["seconds"] = round(time.monotonic() - t0, 2)
+        self.finished_at = time.time()
+        self.ready = True
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def status(self) -> str:
+        if not self.ready:
+            return "warming"
+        if any(s.get("status") == "failed" for s in self.steps.values()):
+            return "degraded"
+        return "ready"
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": self.steps,
+        }
+
+
+# Module-level singleton
+warmup = Warmup()
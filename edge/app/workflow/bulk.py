@@ -0,0 +1,59 @@
+"""
+Bulk case replay — MaTriX-AI Edge System
+A clinic reconnecting after a day offline uploads its queued cases in one
+request. Cases run through run_workflow with bounded concurrency, severest
+first by rule-based pre-triage. Their LLM calls are admitted in the BULK class,
+so live submissions never wait behind the backlog. Load-shed cases back off
+for the scheduler's Retry-After instead of failing.
+"""
+from __future__ import annotations
+import asyncio
+from app.config import settings
+from app.agents.risk_agent import _rule_based_risk
+from app.agents.router import admission_priority
+from app.models.local_llm import SchedulerOverloaded
+from app.workflow.graph import run_workflow
+
+
+def triage_order(patients: list[dict]) -> list[int]:
+    """Indices of `patients`, severest first (submission order within equal rank)."""
+    def rank(i: int) -> tuple[int, int]:
+        rule = _rule_based_risk(patients[i])
+        priority = admission_priority({"patient_data": patients[i], "risk_output": rule})
+        return int(priority), -rule["risk_score"]
+    return sorted(range(len(patients)), key=rank)
+
+
+async def run_bulk(patients: list[dict], clinic_id: str | None,
+                   thread_prefix: str | None = None) -> list[tuple[dict | None, str | None]]:
+    """
+    Run every case and return (final_state, None) or (None, error) per case,
+    in input order. With a thread_prefix each case is checkpointed as
+    f"{thread_prefix}:{index}", so a retried batch resumes where it stopped.
+    """
+    results: list[tuple[dict | None, str | None]] = [(None, "Not run")] * len(patients)
+    gate = asyncio.Semaphore(max(1, settings.bulk_concurrency))
+
+    async def _one(i: int) -> None:
+        thread_id = f"{thread_prefix}:{i}" if thread_prefix else None
+        async with gate:
+            for attempt in range(settings.bulk_overload_retries + 1):
+                try:
+                    state = await run_workflow(
+                        patients[i], clinic_id=clinic_id, thread_id=thread_id, bulk=True,
+                    )
+                    results[i] = (state, None)
+                    return
+                except SchedulerOverloaded as exc:
+                    if attempt == settings.bulk_overload_retries:
+                        results[i] = (None, f"Scheduler overloaded: {exc}")
+                        return
+                    # Hold the slot while backing off: the whole batch slows down
+                    await asyncio.sleep(exc.retry_after)
+                except Exception as exc:
+                    results[i] = (None, f"Workflow error: {exc}")
+                    return
+
+    # Tasks start in triage order and the semaphore is FIFO, so severe cases run first
+    await asyncio.gather(*(_one(i) for i in triage_order(patients)))
+    return results
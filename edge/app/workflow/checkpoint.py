@@ -0,0 +1,139 @@
+"""
+Durable LangGraph checkpoints in Postgres — MaTriX-AI Edge System
+The checkpointed graph stores MaternalState after every node under a
+per-submission thread id. A retried or resumed submission continues from the
+last completed node instead of repeating LLM calls; a finished thread
+returns its final state. Only the latest checkpoint per thread is kept, and
+threads older than workflow_checkpoint_ttl_s are garbage-collected.
+"""
+from __future__ import annotations
+import asyncio
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint, CheckpointTuple
+from sqlalchemy import select, delete
+from app.config import settings
+
+
+class PostgresCheckpointSaver(BaseCheckpointSaver):
+    """Async-only LangGraph checkpoint saver on the edge database."""
+
+    def __init__(self):
+        super().__init__()
+        self._gc_task: asyncio.Task | None = None
+        self.saved = 0
+        self.resumed = 0
+        self.replayed = 0
+        self.collected = 0
+
+    def _tuple(self, row) -> CheckpointTuple:
+        return CheckpointTuple(
+            {"configurable": {"thread_id": row.thread_id, "thread_ts": row.thread_ts}},
+            self.serde.loads(row.checkpoint),
+            {"configurable": {"thread_id": row.thread_id, "thread_ts": row.parent_ts}}
+            if row.parent_ts else None,
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        from app.db.database import AsyncSessionLocal
+        from app.db.models import WorkflowCheckpoint
+        conf = config["configurable"]
+        query = select(WorkflowCheckpoint).where(
+            WorkflowCheckpoint.thread_id == str(conf["thread_id"])
+        )
+        if conf.get("thread_ts"):
+            query = query.where(WorkflowCheckpoint.thread_ts == str(conf["thread_ts"]))
+        else:
+            query = query.order_by(WorkflowCheckpoint.thread_ts.desc()).limit(1)
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(query)).scalars().first()
+        return self._tuple(row) if row else None
+
+    async def alist(self, config: RunnableConfig) -> AsyncIterator[CheckpointTuple]:
+        from app.db.database import AsyncSessionLocal
+        from app.db.models import WorkflowCheckpoint
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(WorkflowCheckpoint)
+                .where(WorkflowCheckpoint.thread_id == str(config["configurable"]["thread_id"]))
+                .order_by(WorkflowCheckpoint.thread_ts.desc())
+            )).scalars().all()
+        for row in rows:
+            yield self._tuple(row)
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint) -> RunnableConfig:
+        """Store the checkpoint and drop the thread's older ones (resume needs only the latest)."""
+        from app.db.database import AsyncSessionLocal
+        from app.db.models import WorkflowCheckpoint
+        thread_id = str(config["configurable"]["thread_id"])
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(WorkflowCheckpoint).where(WorkflowCheckpoint.thread_id == thread_id)
+            )
+            db.add(WorkflowCheckpoint(
+                thread_id=thread_id,
+                thread_ts=checkpoint["ts"],
+                parent_ts=config["configurable"].get("thread_ts"),
+                checkpoint=self.serde.dumps(checkpoint),
+            ))
+            await db.commit()
+        self.saved += 1
+        return {"configurable": {"thread_id": thread_id, "thread_ts": checkpoint["ts"]}}
+
+    async def delete_thread(self, thread_id: str) -> None:
+        from app.db.database import AsyncSessionLocal
+        from app.db.models import WorkflowCheckpoint
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(WorkflowCheckpoint).where(WorkflowCheckpoint.thread_id == thread_id))
+            await db.commit()
+
+    async def collect_garbage(self) -> int:
+        """Delete checkpoints older than the TTL; returns the number removed."""
+        from app.db.database import AsyncSessionLocal
+        from app.db.models import WorkflowCheckpoint
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.workflow_checkpoint_ttl_s)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(WorkflowCheckpoint).where(WorkflowCheckpoint.created_at < cutoff)
+            )
+            await db.commit()
+        removed = result.rowcount or 0
+        self.collected += removed
+        return removed
+
+    async def _gc_loop(self) -> None:
+        while True:
+            try:
+                await self.collect_garbage()
+            except Exception as exc:
+                if settings.debug:
+                    print(f"Checkpoint GC failed: {exc}")
+            await asyncio.sleep(settings.workflow_checkpoint_gc_interval_s)
+
+    def start(self) -> None:
+        if settings.workflow_checkpointing and (self._gc_task is None or self._gc_task.done()):
+            self._gc_task = asyncio.get_running_loop().create_task(self._gc_loop())
+
+    async def stop(self) -> None:
+        if self._gc_task is not None:
+            self._gc_task.cancel()
+            try:
+                await self._gc_task
+            except asyncio.CancelledError:
+                pass
+            self._gc_task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.workflow_checkpointing,
+            "saved": self.saved,
+            "resumed": self.resumed,
+            "replayed": self.replayed,
+            "collected": self.collected,
+            "ttl_s": settings.workflow_checkpoint_ttl_s,
+        }
+
+
+# Module-level singleton
+checkpointer = PostgresCheckpointSaver()
@@ -0,0 +1,125 @@
+"""
+Tiered triage fast path — MaTriX-AI Edge System
+Clear-cut cases (severe hypertension with neurological signs, or completely
+normal vitals with no symptoms) get an answer the deterministic rules already
+know. The triage tier classifies them with _rule_based_risk and the router's
+escalation criteria; those above the confidence threshold skip the three
+MedGemma calls and receive the deterministic guideline plan, while ambiguous
+cases keep the full agent chain.
+"""
+from __future__ import annotations
+from app.config import settings
+from app.agents.risk_agent import _rule_based_risk
+from app.agents.guideline_agent import _rule_based_guideline
+from app.agents.critique_agent import hard_heuristic_check
+from app.agents.router import escalation_reason
+
+FAST_PATH_REFS = ["WHO 2011 — Hypertensive Disorders of Pregnancy"]
+
+_SYMPTOM_FLAGS = (
+    "headache", "visual_disturbance", "epigastric_pain", "oedema", "fetal_movement_reduced",
+)
+
+
+def classify(state: dict) -> str | None:
+    """Return why a case is clear-cut enough for the fast path, or None for the full chain."""
+    if not settings.fast_path_enabled:
+        return None
+    if (state.get("vision_output") or {}).get("status", "skipped") != "skipped":
+        return None   # imagery findings need the risk agent
+    p = state.get("patient_data", {})
+    rule = _rule_based_risk(p)
+    if rule["confidence"] < settings.fast_path_min_confidence:
+        return None
+
+    sys_bp = p.get("bp_systolic") or 0
+    dia_bp = p.get("bp_diastolic") or 0
+    neuro = p.get("headache") or p.get("visual_disturbance")
+    if rule["risk_level"] == "severe":
+        if sys_bp >= 160 and neuro and escalation_reason({**state, "risk_output": rule}):
+            return f"Systolic {sys_bp} mmHg with neurological signs"
+        return None
+
+    if rule["risk_level"] == "low":
+        hr = p.get("heart_rate")
+        normal = (
+            sys_bp < 130 and dia_bp < 85
+            and not p.get("proteinuria")
+            and not any(p.get(flag) for flag in _SYMPTOM_FLAGS)
+            and not (p.get("notes") or "").strip()   # free text may describe symptoms
+            and (hr is None or 50 <= hr <= 110)
+        )
+        if normal:
+            return "Normal vitals with no symptoms"
+    return None
+
+
+def run_fast_path(state: dict) -> dict:
+    """Deterministic risk, guideline plan and safety check in place of the LLM agents."""
+    p = state["patient_data"]
+    risk = _rule_based_risk(p)
+    risk["reasoning"] += " (Fast-path triage: clear-cut case, deterministic assessment.)"
+    guide = _rule_based_guideline(risk["risk_level"], list(FAST_PATH_REFS))
+
+    plan_text = guide["stabilization_plan"] + " " + guide["medication_guidance"]
+    heuristic_error = hard_heuristic_check(plan_text)
+    state["risk_output"] = risk
+    state["guideline_output"] = guide
+    state["critique_output"] = {
+        "safe": heuristic_error is None,
+        "safety_score": 100 if heuristic_error is None else 0,
+        "critique_notes": heuristic_error or "Deterministic guideline template — LLM critique skipped.",
+        "revised_plan": None,
+    }
+    return state
+
+
+class FastPathStats:
+    """Per-clinic fraction of fast-pathed cases and estimated latency saved."""
+
+    def __init__(self):
+        self._clinics: dict[str, dict] = {}
+        self._full_s = 0.0
+        self._full_n = 0
+
+    def _entry(self, clinic_id: str) -> dict:
+        return self._clinics.setdefault(clinic_id, {
+            "cases": 0, "fast_path": 0, "full_s": 0.0, "fast_s": 0.0, "saved_s": 0.0,
+        })
+
+    def record(self, clinic_id: str | None, fast: bool, elapsed_s: float) -> None:
+        """Record the agent-tier latency of one case (risk → critique, or the fast path)."""
+        entry = self._entry(clinic_id or "unknown")
+        entry["cases"] += 1
+        if not fast:
+            entry["full_s"] += elapsed_s
+            self._full_s += elapsed_s
+            self._full_n += 1
+            return
+        entry["fast_path"] += 1
+        entry["fast_s"] += elapsed_s
+        if self._full_n:
+            # Saved vs. the observed average full agent chain
+            entry["saved_s"] += max(0.0, self._full_s / self._full_n - elapsed_s)
+
+    def stats(self) -> dict:
+        clinics = {}
+        for clinic_id, e in self._clinics.items():
+            full = e["cases"] - e["fast_path"]
+            clinics[clinic_id] = {
+                "cases": e["cases"],
+                "fast_path": e["fast_path"],
+                "fast_path_fraction": round(e["fast_path"] / e["cases"], 3) if e["cases"] else 0.0,
+                "avg_full_chain_s": round(e["full_s"] / full, 3) if full else None,
+                "avg_fast_path_s": round(e["fast_s"] / e["fast_path"], 4) if e["fast_path"] else None,
+                "latency_saved_s": round(e["saved_s"], 2),
+            }
+        return {
+            "enabled": settings.fast_path_enabled,
+            "min_confidence": settings.fast_path_min_confidence,
+            "avg_full_chain_s": round(self._full_s / self._full_n, 3) if self._full_n else None,
+            "clinics": clinics,
+        }
+
+
+fast_path_stats = FastPathStats()
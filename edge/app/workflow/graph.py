@@ -2,50 +2,121 @@
 LangGraph workflow for MaTriX-AI — full StateGraph with conditional escalation.
 
 Flow:
-  risk_node → guideline_node → router_node → [escalation_node | END]
+  vision_node → triage_node → [fast_path_node | risk_node → guideline_node → critique_node]
+              → router_node → [escalation_node | END]
+
+One graph is precompiled per topology variant (mode, vision, executive agent)
+with dead nodes removed: OFFLINE has no cloud nodes, vision_node is absent
+when imagery analysis is disabled, CLOUD escalates unconditionally. The
+topology API swaps the active variant; runs never consult the topology.
+
+Guideline retrieval is started speculatively when risk_node begins (see
+app/workflow/speculation.py) and committed if the predicted risk level holds.
+
+Submissions with a thread id (async jobs, Idempotency-Key requests) run on the
+checkpointed graph: state is saved to Postgres after every node, so a retry
+resumes from the last completed node (see app/workflow/checkpoint.py).
 """
-import httpx
+import asyncio
+import time
+from typing import AsyncIterator, NamedTuple
 from langgraph.graph import StateGraph, END
 from app.workflow.state import MaternalState
 from app.agents.vision_agent import run_vision_agent
 from app.agents.risk_agent import run_risk_agent
-from app.agents.guideline_agent import run_guideline_agent
+from app.agents.guideline_agent import run_guideline_agent, speculate_guideline
 from app.agents.critique_agent import run_critique_agent
 from app.agents.router import run_router
 from app.config import settings
+from app.models.local_llm import partial_sink, SchedulerOverloaded
+from app.utils.http_pool import cloud_pool
+from app.workflow.speculation import speculation_scope
+from app.workflow.checkpoint import checkpointer
+from app.workflow.fast_path import classify, run_fast_path, fast_path_stats
+from app.utils.metrics import CASES_TOTAL, FALLBACK_ACTIVATIONS
+from app.utils.tracing import span, trace, traced
 
 
-# ── Escalation Node ──────────────────────────────────────────────────────────
+# ── Triage tier ──────────────────────────────────────────────────────────────
 
-async def escalation_node(state: MaternalState) -> MaternalState:
-    """
-    Sends the full case summary to the cloud ExecutiveAgent.
-    Called only when router decides to escalate.
-    Respects the currently configured topology mode.
-    """
-    # Import here to avoid circular imports
-    from app.api.topology import get_topology_mode
+async def triage_node(state: MaternalState) -> MaternalState:
+    """Pre-classify the case: clear-cut cases take the deterministic fast path."""
+    reason = classify(state)
+    state["fast_path"] = reason is not None
+    state["fast_path_reason"] = reason or ""
+    state["agents_started"] = time.time()
+    return state
+
+
+async def fast_path_node(state: MaternalState) -> MaternalState:
+    return run_fast_path(state)
+
+
+def select_path(state: MaternalState) -> str:
+    return "fast" if state.get("fast_path") else "full"
+
+
+async def router_node(state: MaternalState) -> MaternalState:
+    """Record agent-tier latency for the fast-path metrics, then apply the router rules."""
+    if state.get("agents_started") is not None:
+        fast_path_stats.record(
+            state.get("clinic_id"), bool(state.get("fast_path")),
+            time.time() - state["agents_started"],
+        )
+    state = run_router(state)
+    CASES_TOTAL.labels(
+        path="fast" if state.get("fast_path") else "full",
+        escalated=str(bool(state.get("escalation_triggered"))).lower(),
+    ).inc()
+    return state
+
+
+# ── Risk Node ────────────────────────────────────────────────────────────────
+
+async def risk_node(state: MaternalState) -> MaternalState:
+    """Risk agent, with guideline work started for the rule-predicted risk level."""
+    speculate_guideline(state)
+    return await run_risk_agent(state)
 
-    current_mode = get_topology_mode()
 
-    # OFFLINE mode: block all cloud calls entirely
-    if current_mode == "OFFLINE":
+# ── Escalation Node ──────────────────────────────────────────────────────────
+
+def _local_escalation_node(summary: str, justification: str):
+    """Escalation node for variants without the cloud ExecutiveAgent: a fixed referral advisory."""
+    async def local_escalation_node(state: MaternalState) -> MaternalState:
         state["cloud_connected"] = False
         state["mode"] = "offline-forced"
         state["executive_output"] = {
-            "executive_summary": (
-                "System is in Strict Offline mode. "
-                "Cloud 27B escalation is disabled by administrator. "
-                "Please refer to the edge 4B guideline plan and escalate via standard hospital protocol."
-            ),
+            "executive_summary": summary,
             "care_plan": state.get("guideline_output", {}).get("stabilization_plan", "Unknown"),
             "referral_urgency": "urgent",
             "referral_priority": "urgent",
-            "justification": "Topology locked to OFFLINE — cloud routing blocked.",
+            "justification": justification,
             "time_to_transfer_hours": 1.0,
         }
         return state
+    return local_escalation_node
+
 
+offline_escalation_node = _local_escalation_node(
+    "System is in Strict Offline mode. "
+    "Cloud 27B escalation is disabled by administrator. "
+    "Please refer to the edge 4B guideline plan and escalate via standard hospital protocol.",
+    "Topology locked to OFFLINE — cloud routing blocked.",
+)
+executive_disabled_node = _local_escalation_node(
+    "Cloud executive agent is disabled by administrator. "
+    "Please refer to the edge 4B guideline plan and escalate via standard hospital protocol.",
+    "Executive agent disabled in topology settings — cloud routing skipped.",
+)
+
+
+async def escalation_node(state: MaternalState) -> MaternalState:
+    """
+    Sends the full case summary to the cloud ExecutiveAgent.
+    Called only when router decides to escalate, and only present in graph
+    variants whose topology allows the cloud executive agent.
+    """
     payload = {
         "patient_data": state["patient_data"],
         "vision_output": state.get("vision_output"),
@@ -54,18 +125,19 @@ async def escalation_node(state: MaternalState) -> MaternalState:
     }
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(
+        with span("cloud.executive_escalation"):
+            resp = await cloud_pool.post(
                 f"{settings.cloud_api_url}/executive_escalation",
                 json=payload,
-                headers={"X-API-Key": settings.cloud_api_key},
+                timeout=30.0,
             )
             resp.raise_for_status()
-            state["executive_output"] = resp.json()
-            state["cloud_connected"] = True
-            state["mode"] = "online"
+        state["executive_output"] = resp.json()
+        state["cloud_connected"] = True
+        state["mode"] = "online"
     except Exception as exc:
         # Cloud service unavailable — set fallback executive output
+        FALLBACK_ACTIVATIONS.labels(agent="executive").inc()
         state["cloud_connected"] = False
         state["mode"] = "offline"
         state["executive_output"] = {
@@ -87,14 +159,7 @@ async def escalation_node(state: MaternalState) -> MaternalState:
 # ── Conditional edge function ────────────────────────────────────────────────
 
 def should_escalate(state: MaternalState) -> str:
-    """Return 'escalate' or 'end' based on router decision AND topology mode."""
-    from app.api.topology import get_topology_mode
-    mode = get_topology_mode()
-    
-    # If topology is CLOUD, we bypass the risk threshold and always escalate to 27B
-    if mode == "CLOUD":
-        return "escalate"
-        
+    """Return 'escalate' or 'end' based on the router decision (CLOUD variants always escalate)."""
     # Smart Escalation: Escalate if Risk Agent manually triggered it,
     # OR if the Risk Agent has low confidence (< 0.7) despite a moderate risk score,
     # mimicking a nurse asking for a second opinion on an ambiguous case.
@@ -114,46 +179,126 @@ def should_escalate(state: MaternalState) -> str:
 
 # ── Build the graph ──────────────────────────────────────────────────────────
 
-def build_graph():
-    workflow = StateGraph(MaternalState)
+class GraphVariant(NamedTuple):
+    """Topology features that change the shape of the graph."""
+    mode: str = "HYBRID"      # OFFLINE | HYBRID | CLOUD
+    vision: bool = True       # cloud PaliGemma vision_node present
+    executive: bool = True    # escalations go to the cloud ExecutiveAgent
 
-    workflow.add_node("vision_node", run_vision_agent)
-    workflow.add_node("risk_node", run_risk_agent)
-    workflow.add_node("guideline_node", run_guideline_agent)
-    workflow.add_node("critique_node", run_critique_agent)
-    workflow.add_node("router_node", run_router)
-    workflow.add_node("escalation_node", escalation_node)
+    @property
+    def key(self) -> str:
+        return f"{self.mode.lower()}-{'v' if self.vision else 'nov'}-{'x' if self.executive else 'nox'}"
 
-    workflow.set_entry_point("vision_node")
-    workflow.add_edge("vision_node", "risk_node")
-    workflow.add_edge("risk_node", "guideline_node")
-    workflow.add_edge("guideline_node", "critique_node")
-    workflow.add_edge("critique_node", "router_node")
 
+def variant_for(mode: str, vision_enabled: bool, executive_agent_enabled: bool) -> GraphVariant:
+    """Normalise topology settings: OFFLINE never has cloud nodes."""
+    cloud = mode != "OFFLINE"
+    return GraphVariant(mode, vision_enabled and cloud, executive_agent_enabled and cloud)
+
+
+def build_graph(variant: GraphVariant = GraphVariant(), saver=None):
+    workflow = StateGraph(MaternalState)
+
+    if not variant.executive:
+        escalate = offline_escalation_node if variant.mode == "OFFLINE" else executive_disabled_node
+    else:
+        escalate = escalation_node
+    nodes = {
+        "vision_node": run_vision_agent if variant.vision else None,
+        "triage_node": triage_node,
+        "fast_path_node": fast_path_node,
+        "risk_node": risk_node,
+        "guideline_node": run_guideline_agent,
+        "critique_node": run_critique_agent,
+        "router_node": router_node,
+        "escalation_node": escalate,
+    }
+    for name, fn in nodes.items():
+        if fn is not None:
+            workflow.add_node(name, traced(f"node.{name}")(fn))
+
+    if variant.vision:
+        workflow.set_entry_point("vision_node")
+        workflow.add_edge("vision_node", "triage_node")
+    else:
+        workflow.set_entry_point("triage_node")
     workflow.add_conditional_edges(
-        "router_node",
-        should_escalate,
+        "triage_node",
+        select_path,
         {
-            "escalate": "escalation_node",
-            "end": END,
+            "fast": "fast_path_node",
+            "full": "risk_node",
         },
     )
+    workflow.add_edge("fast_path_node", "router_node")
+    workflow.add_edge("risk_node", "guideline_node")
+    workflow.add_edge("guideline_node", "critique_node")
+    workflow.add_edge("critique_node", "router_node")
+
+    if variant.mode == "CLOUD":
+        # CLOUD bypasses the risk threshold and always escalates to 27B
+        workflow.add_edge("router_node", "escalation_node")
+    else:
+        workflow.add_conditional_edges(
+            "router_node",
+            should_escalate,
+            {
+                "escalate": "escalation_node",
+                "end": END,
+            },
+        )
     workflow.add_edge("escalation_node", END)
 
-    return workflow.compile()
+    return workflow.compile(checkpointer=saver)
+
 
+# Every variant precompiled, plain and checkpointed
+VARIANTS = sorted({
+    variant_for(mode, vision, executive)
+    for mode in ("OFFLINE", "HYBRID", "CLOUD")
+    for vision in (True, False)
+    for executive in (True, False)
+})
+_graphs = {
+    (variant, durable): build_graph(variant, checkpointer if durable else None)
+    for variant in VARIANTS
+    for durable in (False, True)
+}
+_active_variant = GraphVariant()
 
-# Module-level compiled graph (import this)
-maternal_graph = build_graph()
+
+def activate_graph(variant: GraphVariant) -> None:
+    """Swap the graph used by new runs (a single reference assignment; in-flight runs keep theirs)."""
+    global _active_variant
+    if (variant, False) not in _graphs:
+        raise ValueError(f"Unknown graph variant {variant}")
+    _active_variant = variant
+
+
+def active_variant() -> GraphVariant:
+    return _active_variant
+
+
+def get_graph(variant: GraphVariant | None = None, durable: bool = False):
+    return _graphs[(variant or _active_variant, durable)]
+
+
+# Default (HYBRID, all features) graph
+maternal_graph = get_graph(GraphVariant())
 
 
 # ── Entrypoint ───────────────────────────────────────────────────────────────
 
-async def run_workflow(patient_data: dict) -> dict:
-    """Run the full MaTriX-AI workflow and return final state."""
-    initial_state: MaternalState = {
+def _initial_state(patient_data: dict, clinic_id: str | None = None,
+                   bulk: bool = False) -> MaternalState:
+    return {
         "patient_data": patient_data,
         "visit_id": None,
+        "clinic_id": clinic_id,
+        "bulk": bulk,
+        "fast_path": False,
+        "fast_path_reason": "",
+        "agents_started": None,
         "vision_output": None,
         "risk_output": None,
         "guideline_output": None,
@@ -165,4 +310,118 @@ async def run_workflow(patient_data: dict) -> dict:
         "mode": "offline",
         "error": None,
     }
-    return await maternal_graph.ainvoke(initial_state)
\ No newline at end of file
+
+
+async def _plan_run(patient_data: dict, clinic_id: str | None, thread_id: str | None,
+                    bulk: bool = False):
+    """
+    Choose how to run a submission: (graph, input, config, finished_state).
+    The active topology variant is captured once, so a concurrent swap never
+    changes the graph under a running case. A keyed submission with a saved
+    checkpoint resumes (input None) or, if it already reached END, returns its
+    final state without running anything.
+    """
+    variant = _active_variant
+    fresh = _initial_state(patient_data, clinic_id, bulk)
+    if not variant.vision:
+        fresh["vision_output"] = {"status": "skipped", "findings": "Vision analysis disabled."}
+    if not (thread_id and settings.workflow_checkpointing):
+        return get_graph(variant), fresh, None, None
+    # Checkpoints are per variant: a case resumed after a topology switch starts over
+    config = {"configurable": {"thread_id": f"{thread_id}@{variant.key}"}}
+    graph = get_graph(variant, durable=True)
+    try:
+        snapshot = await graph.aget_state(config)
+    except Exception as exc:
+        # Checkpoint store unreachable — run without durability rather than fail the case
+        if settings.debug:
+            print(f"Checkpoint lookup failed for {thread_id}: {exc}")
+        return get_graph(variant), fresh, None, None
+    if not snapshot.values:
+        return graph, fresh, config, None
+    if not snapshot.next:
+        checkpointer.replayed += 1
+        return graph, None, config, snapshot.values
+    checkpointer.resumed += 1
+    return graph, None, config, None
+
+
+async def run_workflow(patient_data: dict, clinic_id: str | None = None,
+                       thread_id: str | None = None, bulk: bool = False) -> dict:
+    """Run the full MaTriX-AI workflow and return final state (resuming `thread_id` if saved)."""
+    with speculation_scope(), trace("workflow", clinic_id=clinic_id, thread_id=thread_id):
+        graph, inputs, config, finished = await _plan_run(patient_data, clinic_id, thread_id, bulk)
+        if finished is not None:
+            return finished
+        return await graph.ainvoke(inputs, config)
+
+
+def _node_output(node: str, state: dict) -> dict | None:
+    """The slice of state a node is responsible for, as pushed to streaming clients."""
+    if node == "triage_node":
+        return {"fast_path": state.get("fast_path", False), "reason": state.get("fast_path_reason", "")}
+    if node == "fast_path_node":
+        return {
+            "risk_output": state.get("risk_output"),
+            "guideline_output": state.get("guideline_output"),
+            "critique_output": state.get("critique_output"),
+        }
+    if node == "router_node":
+        return {
+            "escalation_triggered": state.get("escalation_triggered", False),
+            "escalation_reason": state.get("escalation_reason", ""),
+        }
+    key = {
+        "vision_node": "vision_output",
+        "risk_node": "risk_output",
+        "guideline_node": "guideline_output",
+        "critique_node": "critique_output",
+        "escalation_node": "executive_output",
+    }.get(node)
+    return state.get(key) if key else None
+
+
+async def stream_workflow(patient_data: dict, clinic_id: str | None = None,
+                          thread_id: str | None = None) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Run the workflow while yielding progress events as (kind, data):
+      ("partial", {agent, field, value}) — an LLM output field closed mid-generation
+      ("agent", {node, output})          — a node finished
+      ("final", state)                   — the completed state
+      ("error", {detail})                — the workflow raised
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def _sink(agent: str, key: str, value) -> None:
+        queue.put_nowait(("partial", {"agent": agent, "field": key, "value": value}))
+
+    async def _run():
+        token = partial_sink.set(_sink)
+        try:
+            state = None
+            with speculation_scope(), trace("workflow", clinic_id=clinic_id, streamed=True):
+                graph, inputs, config, state = await _plan_run(patient_data, clinic_id, thread_id)
+                if state is not None:
+                    queue.put_nowait(("final", state))
+                    return
+                async for chunk in graph.astream(inputs, config):
+                    for node, node_state in chunk.items():
+                        state = node_state
+                        queue.put_nowait(("agent", {"node": node, "output": _node_output(node, node_state)}))
+            queue.put_nowait(("final", state))
+        except Exception as exc:
+            status = 429 if isinstance(exc, SchedulerOverloaded) else 500
+            queue.put_nowait(("error", {"status": status, "detail": f"Workflow error: {exc}"}))
+        finally:
+            partial_sink.reset(token)
+
+    task = asyncio.create_task(_run())
+    try:
+        while True:
+            kind, data = await queue.get()
+            yield kind, data
+            if kind in ("final", "error"):
+                break
+    finally:
+        if not task.done():
+            task.cancel()
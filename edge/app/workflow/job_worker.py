@@ -0,0 +1,172 @@
+"""
+Triage job workers — MaTriX-AI Edge System
+Asynchronous submissions are persisted with a `triage_jobs` row and processed
+here. Each worker claims one job at a time with FOR UPDATE SKIP LOCKED, so
+workers can run in any number of processes or machines against the same
+database. Failed jobs are retried with exponential backoff and dead-lettered
+after max_attempts; each retry resumes the job's checkpointed workflow from
+the last completed node. A running job's lease is renewed every
+job_lease_s / 3, so only a crashed worker's job is reclaimed; a worker that
+loses its lease anyway cancels its run.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import socket
+import time
+from app.config import settings
+from app.db import crud
+from app.db.database import AsyncSessionLocal
+from app.models.local_llm import SchedulerOverloaded
+from app.workflow.graph import run_workflow
+
+
+class _LeaseLost(Exception):
+    """Another worker reclaimed the job while this one was running it."""
+
+
+class JobWorkerPool:
+    """In-process pool of queue workers with local wake-up on enqueue."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: list[asyncio.Task] = []
+        self._wake = asyncio.Event()
+        self.completed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.leases_lost = 0
+        self.last_run_s: float | None = None
+
+    def notify(self) -> None:
+        """Wake idle local workers (jobs enqueued by other processes are found by polling)."""
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._tasks or self.workers <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._tasks = [
+            loop.create_task(self._run(f"{self.prefix}:{n}")) for n in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, worker_id: str) -> None:
+        while True:
+            try:
+                processed = await self.process_one(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Database unreachable etc. — back off and keep the worker alive
+                processed = False
+                if settings.debug:
+                    print(f"Job worker {worker_id} error: {exc}")
+            if not processed:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=settings.job_poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def process_one(self, worker_id: str) -> bool:
+        """Claim and run one job. Returns False if the queue had nothing runnable."""
+        async with AsyncSessionLocal() as db:
+            job = await crud.claim_job(db, worker_id, lease_s=settings.job_lease_s)
+            if job is None:
+                await db.commit()
+                return False
+            job_id, payload, clinic_id = job.id, job.payload, job.clinic_id
+            visit_id, attempts = job.visit_id, job.attempts
+            await db.commit()
+
+        started = time.monotonic()
+        error, delay = None, 0.0
+        try:
+            state = await self._run_leased(
+                job_id, worker_id,
+                run_workflow(payload, clinic_id=clinic_id, thread_id=f"job:{job_id}"),
+            )
+        except _LeaseLost:
+            return True   # the reclaiming worker owns the job now
+        except SchedulerOverloaded as exc:
+            # Load shedding is not the job's fault — retry without spending an attempt
+            state, error, delay = None, f"Scheduler overloaded: {exc}", exc.retry_after
+            attempts -= 1
+        except Exception as exc:
+            state, error = None, f"Workflow error: {exc}"
+            delay = settings.job_retry_base_s * (2 ** (attempts - 1))
+
+        async with AsyncSessionLocal() as db:
+            job = await crud.lock_owned_job(db, job_id, worker_id)
+            if job is None:
+                # Lease expired and another worker reclaimed the job; discard this run
+                await db.rollback()
+                return True
+            if state is not None:
+                try:
+                    await crud.save_case_outputs(db, visit_id, state)
+                    crud.finish_job(job)
+                    self.completed += 1
+                except Exception as exc:
+                    await db.rollback()
+                    job = await crud.lock_owned_job(db, job_id, worker_id)
+                    if job is None:
+                        return True
+                    error = f"Persistence error: {exc}"
+                    delay = settings.job_retry_base_s * (2 ** (attempts - 1))
+            if error is not None:
+                job.attempts = attempts
+                crud.retry_or_dead_letter(job, error, delay)
+                if job.status == "dead":
+                    self.dead_lettered += 1
+                else:
+                    self.retried += 1
+            await db.commit()
+        self.last_run_s = time.monotonic() - started
+        return True
+
+    async def _run_leased(self, job_id: str, worker_id: str, coro):
+        """Await coro while renewing the job's lease; raises _LeaseLost (and cancels it) if lost."""
+        work = asyncio.ensure_future(coro)
+        try:
+            while True:
+                done, _ = await asyncio.wait({work}, timeout=settings.job_lease_s / 3)
+                if done:
+                    return work.result()
+                try:
+                    async with AsyncSessionLocal() as db:
+                        held = await crud.renew_job_lease(db, job_id, worker_id)
+                        await db.commit()
+                except Exception as exc:
+                    # Transient DB error: keep running; completion re-checks ownership
+                    if settings.debug:
+                        print(f"Job {job_id} lease renewal failed: {exc}")
+                    continue
+                if not held:
+                    self.leases_lost += 1
+                    raise _LeaseLost(job_id)
+        finally:
+            if not work.done():
+                work.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "completed": self.completed,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "leases_lost": self.leases_lost,
+            "last_run_s": round(self.last_run_s, 2) if self.last_run_s is not None else None,
+        }
+
+
+# Module-level singleton
+job_workers = JobWorkerPool(settings.job_workers)
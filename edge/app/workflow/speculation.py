@@ -0,0 +1,117 @@
+"""
+Speculative execution within one workflow run — MaTriX-AI Edge System
+While the risk agent is still generating, downstream work (guideline
+retrieval) is started for the risk level the deterministic rules predict. When the downstream node runs it claims the
+speculation: on a matching risk level the result is committed, otherwise the
+task is cancelled and the node does the work itself.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator
+
+# name -> Speculation for the workflow run active in this context
+_scope: ContextVar[dict | None] = ContextVar("speculation_scope", default=None)
+
+
+class SpeculationStats:
+    """Per-name hit rate and latency saved (work already done when claimed)."""
+
+    def __init__(self):
+        self._by_name: dict[str, dict] = {}
+
+    def _entry(self, name: str) -> dict:
+        return self._by_name.setdefault(name, {
+            "launched": 0, "hits": 0, "misses": 0, "failed": 0, "saved_s": 0.0,
+        })
+
+    def record(self, name: str, outcome: str, saved_s: float = 0.0) -> None:
+        entry = self._entry(name)
+        entry[outcome] += 1
+        entry["saved_s"] += saved_s
+
+    def stats(self) -> dict:
+        out = {}
+        for name, e in self._by_name.items():
+            claimed = e["hits"] + e["misses"] + e["failed"]
+            out[name] = {
+                **e,
+                "saved_s": round(e["saved_s"], 2),
+                "hit_rate": round(e["hits"] / claimed, 3) if claimed else None,
+                "avg_saved_s": round(e["saved_s"] / e["hits"], 2) if e["hits"] else 0.0,
+            }
+        return out
+
+
+speculation_stats = SpeculationStats()
+
+
+class Speculation:
+    """A background task computed for a predicted value."""
+
+    def __init__(self, name: str, predicted: Any, coro: Awaitable):
+        self.name = name
+        self.predicted = predicted
+        self.started = time.monotonic()
+        self.finished: float | None = None
+        self.task = asyncio.get_running_loop().create_task(self._run(coro))
+
+    async def _run(self, coro: Awaitable):
+        try:
+            return await coro
+        finally:
+            self.finished = time.monotonic()
+
+    def cancel(self) -> None:
+        if not self.task.done():
+            self.task.cancel()
+        elif not self.task.cancelled():
+            self.task.exception()   # mark retrieved — a discarded failure is not an error
+
+
+@contextmanager
+def speculation_scope() -> Iterator[None]:
+    """Enable speculation for one workflow run; unclaimed work is cancelled on exit."""
+    token = _scope.set({})
+    try:
+        yield
+    finally:
+        for spec in _scope.get().values():
+            spec.cancel()
+        _scope.reset(token)
+
+
+def speculate(name: str, predicted: Any, coro_fn: Callable[[], Awaitable]) -> bool:
+    """Start coro_fn() in the background for `predicted`; no-op outside a speculation_scope."""
+    scope = _scope.get()
+    if scope is None or name in scope:
+        return False
+    scope[name] = Speculation(name, predicted, coro_fn())
+    speculation_stats.record(name, "launched")
+    return True
+
+
+async def claim(name: str, actual: Any) -> tuple[bool, Any]:
+    """
+    Return (True, result) if a speculation for `actual` exists and succeeded,
+    else (False, None) — a mispredicted speculation is cancelled.
+    """
+    scope = _scope.get()
+    spec = scope.pop(name, None) if scope is not None else None
+    if spec is None:
+        return False, None
+    if spec.predicted != actual:
+        spec.cancel()
+        speculation_stats.record(name, "misses")
+        return False, None
+    claimed_at = time.monotonic()
+    try:
+        result = await spec.task
+    except Exception:
+        speculation_stats.record(name, "failed")
+        return False, None
+    saved = min(spec.finished or claimed_at, claimed_at) - spec.started
+    speculation_stats.record(name, "hits", saved)
+    return True, result
@@ -10,6 +10,17 @@ class MaternalState(TypedDict):
     # Persisted visit ID (set after DB write in FastAPI)
     visit_id: Optional[int]
 
+    # Submitting clinic (for per-clinic metrics)
+    clinic_id: Optional[str]
+
+    # Replayed from a bulk sync (LLM calls admitted behind live submissions)
+    bulk: bool
+
+    # Triage tier: True if the case took the deterministic fast path
+    fast_path: bool
+    fast_path_reason: str
+    agents_started: Optional[float]   # wall-clock start of the agent tier (survives resume)
+
     # Agent outputs
     vision_output: Optional[dict]
     risk_output: Optional[dict]
@@ -0,0 +1,95 @@
+"""
+Benchmark: compiled dosage rule engine vs. the previous regex heuristics.
+
+Checks the deterministic guideline plans plus a few unsafe plans, then grows
+the rule set with synthetic drugs to show that scan time does not depend on
+the number of rules.
+
+Usage:
+    cd edge
+    python scripts/bench_dosage_rules.py
+"""
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.agents.dosage_safety import DEFAULT_RULES_FILE, DosageRuleEngine
+from app.agents.guideline_agent import _rule_based_guideline
+
+
+def legacy_check(text: str) -> str | None:
+    """hard_heuristic_check as it was before the rule engine."""
+    text_lower = text.lower()
+    if re.search(r"magnesium sulphate.*? [5-9]g", text_lower) or re.search(r"mgso4.*? [5-9]g", text_lower):
+        return "CRITICAL: MgSO4 dose exceeds the standard 4g loading dose. Maximum loading dose is 4g."
+    if re.search(r"lisinopril|enalapril|losartan|valsartan", text_lower):
+        return "CRITICAL: ACE inhibitors / ARBs are strictly contraindicated in pregnancy."
+    if re.search(r"labetalol.*? ([4-9]\d{2}|[1-9]\d{3})mg", text_lower):
+        return "CRITICAL: Labetalol dose exceeds the safe maximum of 300mg."
+    return None
+
+
+def legacy_style(drugs: list[dict]):
+    """The legacy approach extended to a rule set: one regex search per drug name."""
+    patterns = [re.compile(re.escape(name) + r".*? (\d+)mg") for d in drugs for name in d["names"]]
+
+    def check(text: str) -> str | None:
+        text_lower = text.lower()
+        for pattern in patterns:
+            if pattern.search(text_lower):
+                return "CRITICAL"
+        return None
+    return check
+
+
+def plans() -> list[str]:
+    texts = []
+    for level in ("severe", "high", "moderate", "low"):
+        g = _rule_based_guideline(level, [])
+        texts.append(g["stabilization_plan"] + " " + g["medication_guidance"])
+    texts += [
+        "Give MgSO4 4000 mg IV then 3 g/hr maintenance. Labetalol 400mg IV.",
+        "Start lisinopril 10mg oral and nifedipine 10mg sublingual.",
+    ]
+    return texts
+
+
+def per_call_us(fn, texts, number=2000) -> float:
+    total = timeit.timeit(lambda: [fn(t) for t in texts], number=number)
+    return total / (number * len(texts)) * 1e6
+
+
+def main():
+    texts = plans()
+    with open(DEFAULT_RULES_FILE, encoding="utf-8") as f:
+        spec = json.load(f)
+    engine = DosageRuleEngine(spec)
+
+    print(f"Plans: {len(texts)}, mean length {sum(map(len, texts)) // len(texts)} chars\n")
+    print(f"{'checker':<32}{'rules':>8}{'us/plan':>10}")
+    print(f"{'legacy regexes':<32}{3:>8}{per_call_us(legacy_check, texts):>10.1f}")
+    for extra in (0, 100, 1000, 5000):
+        grown = {**spec, "drugs": spec["drugs"] + [
+            {"drug": f"drug{i}", "names": [f"syntheticdrug{i}"],
+             "max_dose": {"value": 10, "unit": "mg", "message": "synthetic"}}
+            for i in range(extra)
+        ]}
+        eng = DosageRuleEngine(grown)
+        number = 2000 if extra < 1000 else 50
+        print(f"{'regex per drug name':<32}{len(grown['drugs']):>8}"
+              f"{per_call_us(legacy_style(grown['drugs']), texts, number):>10.1f}")
+        print(f"{'compiled engine':<32}{len(grown['drugs']):>8}{per_call_us(eng.check, texts):>10.1f}")
+
+    print("\nViolations found (legacy → engine):")
+    for text in texts:
+        legacy = legacy_check(text)
+        found = [f"{v.drug}:{v.kind}({v.found})" for v in engine.check(text)]
+        print(f"  {text[:48]!r:<52} {('1' if legacy else '0')} → {len(found)} {found}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark: PyTorch (sentence-transformers) vs. int8 ONNX Runtime embedding backends.
+
+Each backend runs in a fresh subprocess so startup time and peak RSS are
+measured from a cold interpreter. Reported per backend:
+  - startup: import + model load, and peak RSS after one encode;
+  - throughput: guideline corpus encoded as one batch, and single-query latency;
+and across backends:
+  - embedding agreement: cosine between the two backends' vectors;
+  - retrieval agreement: top-1 match and top-3 overlap for triage-style queries
+    ranked against the WHO guideline corpus.
+
+The ONNX export must exist (python scripts/export_onnx_embedding.py) or it is
+created on first load.
+
+Usage:
+    cd edge
+    python scripts/bench_embedding_backends.py
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+BACKENDS = ("torch", "onnx")
+QUERIES = [
+    "maternal severe risk hypertension management BP 170/115 gestational weeks 34 proteinuria preeclampsia",
+    "maternal high risk hypertension management BP 150/100 gestational weeks 30 proteinuria preeclampsia",
+    "maternal moderate risk hypertension management BP 135/88 gestational weeks 28 hypertension monitoring",
+    "maternal low risk hypertension management BP 118/76 gestational weeks 20 hypertension monitoring",
+    "magnesium sulphate loading dose and toxicity",
+    "antihypertensive choice labetalol nifedipine hydralazine",
+    "eclamptic seizure management",
+    "postpartum blood pressure monitoring",
+]
+
+
+def child(backend: str, out_path: str) -> None:
+    """Runs inside the subprocess with EMBEDDING_BACKEND set."""
+    started = time.perf_counter()
+    from app.rag.embed import _get_model
+    model = _get_model()
+    load_s = time.perf_counter() - started
+
+    from ingest_guidelines import WHO_GUIDELINE_CHUNKS
+    corpus = [c["text"] for c in WHO_GUIDELINE_CHUNKS]
+    model.encode(corpus[:2], normalize_embeddings=True)   # first-call allocations
+
+    started = time.perf_counter()
+    corpus_vecs = np.asarray(model.encode(corpus, normalize_embeddings=True), dtype=np.float32)
+    batch_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    query_vecs = np.stack([np.asarray(model.encode(q, normalize_embeddings=True)) for q in QUERIES])
+    single_ms = (time.perf_counter() - started) / len(QUERIES) * 1000
+
+    np.savez(out_path, corpus=corpus_vecs, queries=query_vecs.astype(np.float32))
+    print(json.dumps({
+        "backend": backend,
+        "startup_s": round(load_s, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "corpus_texts_per_s": round(len(corpus) / batch_s, 1),
+        "single_query_ms": round(single_ms, 1),
+        "dim": int(corpus_vecs.shape[1]),
+    }))
+
+
+def run_backend(backend: str, tmp: str) -> tuple[dict, dict] | None:
+    out_path = os.path.join(tmp, f"{backend}.npz")
+    env = {**os.environ, "EMBEDDING_BACKEND": backend}
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", backend, out_path],
+        env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        print(f"{backend}: failed\n{proc.stderr.strip().splitlines()[-1] if proc.stderr else ''}")
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1]), dict(np.load(out_path))
+
+
+def agreement(a: dict, b: dict, k: int = 3) -> dict:
+    cos = np.concatenate([(a["corpus"] * b["corpus"]).sum(axis=1), (a["queries"] * b["queries"]).sum(axis=1)])
+    top_a = np.argsort(-(a["queries"] @ a["corpus"].T), axis=1)[:, :k]
+    top_b = np.argsort(-(b["queries"] @ b["corpus"].T), axis=1)[:, :k]
+    return {
+        "mean_cosine": round(float(cos.mean()), 4),
+        "min_cosine": round(float(cos.min()), 4),
+        "top1_match": round(float((top_a[:, 0] == top_b[:, 0]).mean()), 3),
+        f"top{k}_overlap": round(float(np.mean([len(set(x) & set(y)) / k for x, y in zip(top_a, top_b)])), 3),
+    }
+
+
+def main():
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in BACKENDS:
+            result = run_backend(backend, tmp)
+            if result is not None:
+                results[backend] = result
+
+    print(f"{'backend':<8}{'startup s':>11}{'peak RSS MB':>13}{'corpus texts/s':>16}{'query ms':>10}{'dim':>6}")
+    for backend, (metrics, _) in results.items():
+        print(f"{backend:<8}{metrics['startup_s']:>11}{metrics['peak_rss_mb']:>13}"
+              f"{metrics['corpus_texts_per_s']:>16}{metrics['single_query_ms']:>10}{metrics['dim']:>6}")
+    if len(results) == 2:
+        print("\nAgreement (onnx vs torch):", agreement(results["torch"][1], results["onnx"][1]))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: pooled binary pgvector access vs. per-query connections with text vectors.
+
+1. Serialization — the old "[" + ",".join(str(v) ...) + "]" parameter and
+   text result parsing vs. pgvector's binary float32 codec, for 384- and
+   768-dimensional embeddings.
+2. Connection cost — asyncpg.connect per query (the old retrieval path) vs.
+   acquiring from the shared vector pool. Needs a reachable DATABASE_URL;
+   skipped otherwise.
+
+Usage:
+    cd edge
+    python scripts/bench_vector_codec.py
+"""
+import asyncio
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+from pgvector.utils import from_db, from_db_binary, to_db_binary
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.db.vector_pool import asyncpg_dsn, vector_pool
+
+
+def per_call_us(fn, number: int) -> float:
+    return timeit.timeit(fn, number=number) / number * 1e6
+
+
+def bench_serialization() -> None:
+    print(f"{'serialization':<34}{'dims':>6}{'text us':>10}{'binary us':>11}{'text B':>9}{'binary B':>10}")
+    rng = np.random.default_rng(0)
+    for dims in (384, 768):
+        vec = rng.normal(size=dims).astype(np.float32)
+        as_list = vec.tolist()
+        text = "[" + ",".join(str(v) for v in as_list) + "]"
+        binary = to_db_binary(vec)
+        encode_text = per_call_us(lambda: "[" + ",".join(str(v) for v in as_list) + "]", 2000)
+        encode_binary = per_call_us(lambda: to_db_binary(vec), 2000)
+        decode_text = per_call_us(lambda: from_db(text), 2000)
+        decode_binary = per_call_us(lambda: from_db_binary(binary), 2000)
+        print(f"{'  encode query parameter':<34}{dims:>6}{encode_text:>10.1f}{encode_binary:>11.1f}"
+              f"{len(text.encode()):>9}{len(binary):>10}")
+        print(f"{'  decode result column':<34}{dims:>6}{decode_text:>10.1f}{decode_binary:>11.1f}")
+
+
+async def bench_connections(queries: int = 50) -> None:
+    import asyncpg
+    dsn = asyncpg_dsn()
+    try:
+        conn = await asyncio.wait_for(asyncpg.connect(dsn=dsn), timeout=5)
+        await conn.close()
+    except Exception as exc:
+        print(f"\nconnection cost: skipped ({exc.__class__.__name__}: database not reachable)")
+        return
+
+    started = time.perf_counter()
+    for _ in range(queries):
+        conn = await asyncpg.connect(dsn=dsn)
+        try:
+            await conn.fetchval("SELECT 1")
+        finally:
+            await conn.close()
+    per_connect = (time.perf_counter() - started) / queries * 1e6
+
+    await vector_pool.open()
+    async with vector_pool.acquire() as conn:
+        await conn.fetchval("SELECT 1")   # warm the pool
+    started = time.perf_counter()
+    for _ in range(queries):
+        async with vector_pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
+    per_pooled = (time.perf_counter() - started) / queries * 1e6
+    await vector_pool.close()
+
+    print(f"\n{'connection cost (SELECT 1)':<34}{'us/query':>10}")
+    print(f"{'  asyncpg.connect per query':<34}{per_connect:>10.0f}")
+    print(f"{'  shared vector pool':<34}{per_pooled:>10.0f}")
+
+
+def main():
+    bench_serialization()
+    asyncio.run(bench_connections())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+One-time export of the embedding model for the ONNX Runtime backend.
+
+Exports settings.embedding_model (or --model) to ONNX, quantises the weights
+to int8 and caches it with its tokenizer where EMBEDDING_BACKEND=onnx looks
+for it. Needs sentence-transformers (PyTorch), onnx and requirements-onnx.txt on the
+machine running the export; the edge box itself then only needs
+requirements-onnx.txt (onnxruntime, tokenizers).
+
+Usage:
+    cd edge
+    python scripts/export_onnx_embedding.py [--model all-mpnet-base-v2] [--out DIR]
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import settings
+from app.rag.onnx_embed import export_onnx_model, onnx_model_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default=settings.embedding_model)
+    parser.add_argument("--out", default=None, help="cache directory (default: the backend's cache path)")
+    args = parser.parse_args()
+
+    out_dir = Path(args.out) if args.out else onnx_model_dir(args.model)
+    print(f"Exporting {args.model} → {out_dir} ...")
+    export_onnx_model(args.model, out_dir)
+    size_mb = sum(f.stat().st_size for f in out_dir.iterdir()) / 1e6
+    print(f"✅ Exported int8 ONNX model ({size_mb:.0f} MB). Set EMBEDDING_BACKEND=onnx to use it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 """
 WHO Maternal Guideline Ingestion Script
-Run once to populate the pgvector guideline_chunks table.
+Run once to populate the pgvector guideline_chunks table. Chunks are embedded
+with settings.embedding_model into a new index generation
+(app/rag/generations.py); a later model change is re-embedded by the edge
+service at startup, or by scripts/reembed_guidelines.py.
 
 Usage:
     cd edge
@@ -13,7 +16,8 @@ import sys
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from app.rag.embed import embed_batch
+from app.db.vector_pool import vector_pool
+from app.rag.generations import active_generation, build_generation, ensure_schema
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -217,45 +221,35 @@ WHO_GUIDELINE_CHUNKS = [
 
 async def ingest():
     print(f"Connecting to {DATABASE_URL}...")
+    # The vector codec needs the extension, so create it before opening the pool
     conn = await asyncpg.connect(dsn=DATABASE_URL)
-
-    # Create extension + table
     await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
-    await conn.execute("""
-        CREATE TABLE IF NOT EXISTS guideline_chunks (
-            id SERIAL PRIMARY KEY,
-            source TEXT NOT NULL,
-            chunk_text TEXT NOT NULL,
-            embedding vector(384)
-        )
-    """)
-    await conn.execute("CREATE INDEX IF NOT EXISTS guideline_chunks_emb_idx ON guideline_chunks USING ivfflat (embedding vector_cosine_ops)")
+    await conn.close()
+    await vector_pool.open(DATABASE_URL)
+    async with vector_pool.acquire() as conn:
+        await _ingest(conn)
+    await vector_pool.close()
+
+
+async def _ingest(conn):
+    # Create or migrate tables (legacy rows become their own generation)
+    await ensure_schema(conn)
 
     # Check if already populated
-    count = await conn.fetchval("SELECT COUNT(*) FROM guideline_chunks")
-    if count > 0:
-        print(f"⚠️  Table already has {count} rows. Skipping ingestion. (Delete rows to re-ingest.)")
-        await conn.close()
+    generation = await active_generation(conn)
+    if generation is not None:
+        print(f"⚠️  Generation {generation.id} ({generation.model}, {generation.dim}-d) is active. "
+              "Skipping ingestion. (Run scripts/reembed_guidelines.py --force to rebuild.)")
         return
 
-    # Generate embeddings
+    # Embed into a shadow generation and activate it; embeddings go over the wire as binary float32
     print(f"Generating embeddings for {len(WHO_GUIDELINE_CHUNKS)} guideline chunks...")
-    texts = [c["text"] for c in WHO_GUIDELINE_CHUNKS]
-    embeddings = embed_batch(texts)
-
-    # Insert
-    for i, (chunk, emb) in enumerate(zip(WHO_GUIDELINE_CHUNKS, embeddings)):
-        vec_str = "[" + ",".join(str(v) for v in emb) + "]"
-        await conn.execute(
-            "INSERT INTO guideline_chunks (source, chunk_text, embedding) VALUES ($1, $2, $3::vector)",
-            chunk["source"],
-            chunk["text"],
-            vec_str,
-        )
-        print(f"  [{i+1}/{len(WHO_GUIDELINE_CHUNKS)}] Inserted: {chunk['source'][:60]}")
-
-    await conn.close()
-    print(f"\n✅ Ingested {len(WHO_GUIDELINE_CHUNKS)} WHO guideline chunks into pgvector.")
+    progress = {}
+    generation = await build_generation(
+        conn, [(c["source"], c["text"]) for c in WHO_GUIDELINE_CHUNKS], progress,
+    )
+    print(f"\n✅ Ingested {progress['embedded']} WHO guideline chunks into pgvector "
+          f"(generation {generation.id}, {generation.model}, {generation.dim}-d).")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+"""
+Re-embed the guideline index with settings.embedding_model.
+
+Does what the edge service does at startup when the active index generation
+was built by another model: embeds every chunk into a shadow generation and
+swaps it in atomically, while running services keep serving the old one.
+--force rebuilds even when the active generation already matches.
+
+Usage:
+    cd edge
+    python scripts/reembed_guidelines.py [--force]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import settings
+from app.db.vector_pool import vector_pool
+from app.rag.generations import index_generations
+
+
+async def reembed(force: bool) -> None:
+    print(f"Checking guideline index against {settings.embedding_model}...")
+    await vector_pool.open()
+    try:
+        generation = await index_generations.reembed_if_stale(force=force)
+    finally:
+        await vector_pool.close()
+    if generation is None:
+        active = index_generations.active
+        print(f"Nothing to do (active generation: {active._asdict() if active else None}).")
+    else:
+        print(f"✅ Generation {generation.id} active: {generation.model}, {generation.dim}-d, "
+              f"{index_generations.progress.get('embedded', 0)} chunks "
+              f"in {index_generations.progress.get('finished_s')} s.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--force", action="store_true", help="rebuild even if the model is unchanged")
+    args = parser.parse_args()
+    asyncio.run(reembed(args.force))
+
+
+if __name__ == "__main__":
+    main()
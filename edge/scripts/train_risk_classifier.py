@@ -0,0 +1,162 @@
+"""
+Train the vitals risk pre-classifier shipped as app/agents/risk_classifier.json.
+
+Sources (notebooks/datasets):
+  - Maternal Health Risk Data Set (UCI): low / mid / high risk
+  - Preeclampsia in Pregnant Women: Low / High risk
+Only the vitals the edge intake form also records are used (age, systolic
+and diastolic BP, heart rate). The model is multinomial logistic regression
+over those vitals plus hinge features at the clinical BP thresholds, fitted
+with NumPy, then temperature-scaled on a held-out split so its probabilities
+are calibrated. The split and the fit are deterministic: re-running the
+script on the same CSVs reproduces the same file.
+
+Usage:
+    cd edge
+    python scripts/train_risk_classifier.py [--out app/agents/risk_classifier.json]
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.agents.risk_classifier import CLASSES, DEFAULT_MODEL_FILE, HINGES, expand
+
+DATASETS = os.path.join(os.path.dirname(__file__), "..", "..", "notebooks", "datasets")
+SOURCES = (
+    ("Maternal Health Risk Data Set/Maternal Health Risk Data Set.csv",
+     {"age": "Age", "bp_systolic": "SystolicBP", "bp_diastolic": "DiastolicBP",
+      "heart_rate": "HeartRate"},
+     "RiskLevel", {"low risk": "low", "mid risk": "moderate", "high risk": "high"}),
+    ("Preeclampsia in Pregnant Women/Dataset - Updated.csv",
+     {"age": "Age", "bp_systolic": "Systolic BP", "bp_diastolic": "Diastolic",
+      "heart_rate": "Heart Rate"},
+     "Risk Level", {"low": "low", "high": "high"}),
+)
+SEED = 20250101
+HOLDOUT = 0.2
+L2 = 1e-3
+EPOCHS = 4000
+LEARNING_RATE = 0.5
+
+
+def load_rows() -> tuple[list[dict], list[str], dict]:
+    rows, labels, digests = [], [], {}
+    for rel_path, columns, label_col, label_map in SOURCES:
+        path = os.path.join(DATASETS, rel_path)
+        with open(path, "rb") as f:
+            digests[rel_path] = hashlib.sha256(f.read()).hexdigest()[:16]
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for rec in csv.DictReader(f):
+                label = label_map.get((rec.get(label_col) or "").strip().lower())
+                if label is None:
+                    continue
+                try:
+                    p = {key: float(rec[col]) for key, col in columns.items()}
+                except (TypeError, ValueError):
+                    continue
+                rows.append(p)
+                labels.append(label)
+    return rows, labels, digests
+
+
+def softmax(z: np.ndarray) -> np.ndarray:
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def fit(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Full-batch gradient descent on L2-regularised cross-entropy."""
+    n, d = x.shape
+    onehot = np.eye(len(CLASSES))[y]
+    w = np.zeros((d, len(CLASSES)))
+    b = np.zeros(len(CLASSES))
+    for _ in range(EPOCHS):
+        grad = (softmax(x @ w + b) - onehot) / n
+        w -= LEARNING_RATE * (x.T @ grad + L2 * w)
+        b -= LEARNING_RATE * grad.sum(axis=0)
+    return w, b
+
+
+def nll(logits: np.ndarray, y: np.ndarray, temperature: float) -> float:
+    probs = softmax(logits / temperature)
+    return float(-np.log(probs[np.arange(len(y)), y] + 1e-12).mean())
+
+
+def ece(probs: np.ndarray, y: np.ndarray, bins: int = 10) -> float:
+    """Expected calibration error of the top-class probability."""
+    conf, pred = probs.max(axis=1), probs.argmax(axis=1)
+    total = 0.0
+    for lo in np.arange(0.0, 1.0, 1.0 / bins):
+        mask = (conf > lo) & (conf <= lo + 1.0 / bins)
+        if mask.any():
+            total += mask.mean() * abs((pred[mask] == y[mask]).mean() - conf[mask].mean())
+    return float(total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", default=str(DEFAULT_MODEL_FILE))
+    args = parser.parse_args()
+
+    rows, labels, digests = load_rows()
+    medians = {k: float(np.median([r[k] for r in rows])) for k in rows[0]}
+    raw = np.array([expand(r, medians) for r in rows])
+    y = np.array([CLASSES.index(label) for label in labels])
+
+    order = np.random.default_rng(SEED).permutation(len(y))
+    cut = int(len(y) * (1 - HOLDOUT))
+    train, hold = order[:cut], order[cut:]
+
+    mean, std = raw[train].mean(axis=0), raw[train].std(axis=0) + 1e-9
+    x = (raw - mean) / std
+    w, b = fit(x[train], y[train])
+
+    # Temperature scaling on the held-out split
+    logits = x[hold] @ w + b
+    temperature = min(np.arange(0.25, 4.0, 0.01), key=lambda t: nll(logits, y[hold], t))
+    raw_probs, probs = softmax(logits), softmax(logits / temperature)
+
+    model = {
+        "classes": list(CLASSES),
+        "hinges": HINGES,
+        "medians": medians,
+        "mean": mean.round(6).tolist(),
+        "std": std.round(6).tolist(),
+        "weights": w.round(6).tolist(),
+        "bias": b.round(6).tolist(),
+        "temperature": round(float(temperature), 3),
+        "training": {
+            "datasets": digests,
+            "rows": len(y),
+            "holdout_rows": len(hold),
+            "seed": SEED,
+            "holdout_accuracy": round(float((probs.argmax(axis=1) == y[hold]).mean()), 4),
+            "holdout_ece_uncalibrated": round(ece(raw_probs, y[hold]), 4),
+            "holdout_ece": round(ece(probs, y[hold]), 4),
+        },
+    }
+    conf = probs.max(axis=1)
+    for threshold in (0.8, 0.9, 0.95):
+        mask = conf >= threshold
+        model["training"][f"coverage_at_{threshold}"] = round(float(mask.mean()), 4)
+        model["training"][f"accuracy_at_{threshold}"] = (
+            round(float((probs.argmax(axis=1)[mask] == y[hold][mask]).mean()), 4) if mask.any() else None
+        )
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(model, f, indent=1)
+        f.write("\n")
+    print(json.dumps(model["training"], indent=2))
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
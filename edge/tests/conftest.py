@@ -0,0 +1,6 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# app.db.database creates its engine at import; tests that touch a database use their own
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/matrix_test")
@@ -0,0 +1,108 @@
+"""A retried keyed bulk submission must not persist its cases twice."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api import routes
+from app.agents.guideline_agent import _rule_based_guideline
+from app.agents.risk_agent import _rule_based_risk
+from app.db.database import Base
+from app.db.models import Patient, SubmissionVisit, Visit
+from app.db.schemas import BulkSubmission, CaseSubmission
+
+
+def _case(name: str, systolic: int) -> CaseSubmission:
+    return CaseSubmission(
+        name=name, age=28, gestational_age_weeks=33,
+        vitals={"systolic": systolic, "diastolic": 95, "proteinuria": "1+"},
+        symptoms=["headache"],
+    )
+
+
+def _state(case: CaseSubmission) -> dict:
+    risk = _rule_based_risk(routes._patient_dict(case))
+    return {
+        "risk_output": risk,
+        "guideline_output": _rule_based_guideline(risk["risk_level"], []),
+        "escalation_triggered": False,
+        "escalation_reason": "",
+    }
+
+
+async def _count(session, model) -> int:
+    return (await session.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+def _replay(monkeypatch, states: list[dict]) -> None:
+    async def fake_run_bulk(patients, clinic_id, thread_prefix=None):
+        # Stands in for the checkpoint replay of a finished batch
+        return [(state, None) for state in states]
+
+    monkeypatch.setattr(routes, "run_bulk", fake_run_bulk)
+
+
+async def _sessions():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def test_retried_bulk_batch_reuses_visits(monkeypatch):
+    batch = BulkSubmission(cases=[_case("A", 150), _case("B", 165), _case("A", 142)])
+    _replay(monkeypatch, [_state(case) for case in batch.cases])
+
+    async def run():
+        engine, Session = await _sessions()
+        user = {"sub": "clinic-1"}
+        async with Session() as db:
+            first = await routes.submit_case_bulk(batch, db=db, current_user=user, idempotency_key="k1")
+        async with Session() as db:
+            second = await routes.submit_case_bulk(batch, db=db, current_user=user, idempotency_key="k1")
+        async with Session() as db:
+            counts = (await _count(db, Visit), await _count(db, Patient), await _count(db, SubmissionVisit))
+        async with Session() as db:
+            third = await routes.submit_case_bulk(batch, db=db, current_user=user, idempotency_key="k2")
+        async with Session() as db:
+            visits_after_new_key = await _count(db, Visit)
+        await engine.dispose()
+        return first, second, counts, third, visits_after_new_key
+
+    first, second, counts, third, visits_after_new_key = asyncio.run(run())
+
+    assert first.succeeded == second.succeeded == 3
+    assert [r.result.visit_id for r in second.results] == [r.result.visit_id for r in first.results]
+    assert counts == (3, 2, 3)
+    assert third.succeeded == 3
+    assert visits_after_new_key == 6
+
+
+def test_failing_case_does_not_fail_the_batch(monkeypatch):
+    batch = BulkSubmission(cases=[_case("A", 150), _case("B", 165), _case("A", 142)])
+    states = [_state(case) for case in batch.cases]
+    states[0]["risk_output"] = {**states[0]["risk_output"], "risk_level": None}   # NOT NULL violation
+    _replay(monkeypatch, states)
+
+    async def run():
+        engine, Session = await _sessions()
+        async with Session() as db:
+            result = await routes.submit_case_bulk(
+                batch, db=db, current_user={"sub": "clinic-1"}, idempotency_key="k1",
+            )
+        async with Session() as db:
+            counts = (await _count(db, Visit), await _count(db, Patient))
+        await engine.dispose()
+        return result, counts
+
+    result, counts = asyncio.run(run())
+
+    assert [r.status for r in result.results] == ["error", "ok", "ok"]
+    assert result.results[0].error.startswith("Persistence error")
+    # Patient A is created with case 2 after case 0 rolled back
+    assert counts == (2, 2)
@@ -0,0 +1,71 @@
+"""Regression table for the dosage-safety rules applied to every stabilization plan."""
+import pytest
+
+from app.agents.critique_agent import hard_heuristic_check
+from app.agents.dosage_safety import dosage_rules
+from app.agents.guideline_agent import _rule_based_guideline
+
+# (plan text, expected [(kind, drug)] in text order)
+CASES = [
+    # MgSO4 loading dose: units normalised, 4 g is the limit
+    ("MgSO4 4 g IV loading dose", []),
+    ("magnesium sulphate 4g IV over 20 minutes", []),
+    ("MgSO4 4,000 mg IV", []),
+    ("magnesium sulphate 5g IV", [("max_dose", "MgSO4")]),          # legacy regex true positive
+    ("mgso4 loading dose 6g IM", [("max_dose", "MgSO4")]),          # legacy regex true positive
+    ("MgSO4 5,000 mg IV", [("max_dose", "MgSO4")]),
+    # MgSO4 maintenance rate: 2 g/h is the limit; per-kg doses carry no absolute limit
+    ("MgSO4 1 g per hour", []),
+    ("MgSO4 1 g/hr maintenance", []),
+    ("MgSO4 3 g/hr", [("max_rate", "MgSO4")]),
+    ("magnesium sulfate 50 mg/kg IV", []),
+    # Labetalol / hydralazine maxima
+    ("labetalol 200 mg oral", []),
+    ("labetalol 50 mg/kg", []),
+    ("labetalol 400mg IV", [("max_dose", "Labetalol")]),            # legacy regex true positive
+    ("labetalol 1000mg", [("max_dose", "Labetalol")]),              # legacy regex true positive
+    ("hydralazine 5 mg IV", []),
+    ("hydralazine 25 mg IV", [("max_dose", "Hydralazine")]),
+    # Routes
+    ("nifedipine 10 mg orally", []),
+    ("nifedipine 10 mg sublingual", [("route", "Nifedipine")]),
+    ("Give labetalol, nifedipine 10mg sublingual", [("route", "Nifedipine")]),
+    # ACE inhibitors / ARBs (legacy regex: lisinopril|enalapril|losartan|valsartan)
+    ("lisinopril 10 mg", [("contraindicated", "ACE inhibitor")]),
+    ("enalapril", [("contraindicated", "ACE inhibitor")]),
+    ("losartan 50mg", [("contraindicated", "ARB")]),
+    ("valsartan", [("contraindicated", "ARB")]),
+    ("captopril 25 mg", [("contraindicated", "ACE inhibitor")]),
+    # A dose binds only to a drug in its own clause
+    ("Labetalol 200 mg IV; paracetamol 1000 mg", []),
+    ("MgSO4 4 g IV. Then 6 g of something", []),
+    ("Magnesium sulphate 4g IV then 1g/hr, labetalol 20mg IV.", []),
+    # Every violation is reported, not only the first
+    ("MgSO4 6 g IV then 3 g/hr. Start lisinopril 10mg and nifedipine 10mg sublingual.",
+     [("max_dose", "MgSO4"), ("max_rate", "MgSO4"), ("contraindicated", "ACE inhibitor"),
+      ("route", "Nifedipine")]),
+]
+
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_dosage_rules(text, expected):
+    assert [(v.kind, v.drug) for v in dosage_rules.check(text)] == expected
+
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_hard_heuristic_check(text, expected):
+    message = hard_heuristic_check(text)
+    if expected:
+        assert message is not None and message.startswith("CRITICAL: ")
+    else:
+        assert message is None
+
+
+@pytest.mark.parametrize("risk_level", ["severe", "high", "moderate", "low"])
+def test_rule_based_plans_are_clean(risk_level):
+    guide = _rule_based_guideline(risk_level, [])
+    assert hard_heuristic_check(guide["stabilization_plan"] + " " + guide["medication_guidance"]) is None
+
+
+def test_missing_plan():
+    assert hard_heuristic_check(None) is None